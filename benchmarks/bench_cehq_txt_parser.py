@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:56:39 2026
+@author: jsgosselin
+
+A script to benchmark the bulk parser of the CEHQ daily data files
+against the line by line implementation it replaced, on synthetic
+streamflow and level files with a century of daily records.
+"""
+
+# ---- Standard library imports
+import datetime
+import timeit
+
+# ---- Third party imports
+import numpy as np
+from xlrd.xldate import xldate_from_date_tuple
+
+# ---- Local imports
+from data_readers.read_mddelcc_cehq import (
+    scrape_daily_series_from_txt, merge_dly_series)
+
+
+def create_synthetic_dly_file(sid, year_start, year_end, offset=0):
+    """
+    Create the lines of a synthetic CEHQ daily data file, with a few
+    missing values and notes.
+    """
+    lines = ['Station: {}'.format(sid)] + [''] * 21
+    date = datetime.date(year_start, 1, 1)
+    i = 0
+    while date.year <= year_end:
+        if i % 97 == 0:
+            lines.append('{} {}'.format(sid, date.strftime('%Y/%m/%d')))
+        else:
+            lines.append('{} {} {:>10.3f} {}'.format(
+                sid, date.strftime('%Y/%m/%d'),
+                offset + np.random.rand() * 100, 'MC' if i % 13 == 0 else ''))
+        date += datetime.timedelta(days=1)
+        i += 1
+    return lines
+
+
+def legacy_scrape_daily_series_from_txt(sid, data):
+    """
+    The line by line implementation that was used previously in
+    scrape_daily_series_from_txt.
+    """
+    df = {'Time': [], 'Year': [], 'Month': [], 'Day': [],
+          'Daily values': [], 'Note': []}
+    for row in data:
+        row = [s.strip() for s in row.split()]
+        try:
+            if row[0] == sid:
+                date = [int(s) for s in row[1].split("/")]
+                df['Time'].append(xldate_from_date_tuple(date, 0))
+                df['Year'].append(date[0])
+                df['Month'].append(date[1])
+                df['Day'].append(date[2])
+                try:
+                    df['Daily values'].append(float(row[2]))
+                except IndexError:
+                    df['Daily values'].append(np.nan)
+                try:
+                    df['Note'].append(row[3])
+                except IndexError:
+                    df['Note'].append('')
+        except IndexError:
+            pass
+    return df
+
+
+def legacy_merge_dly_series(df_Q, df_N):
+    """
+    The merge with np.unique and np.digitize that was used previously in
+    scrape_data_from_sid.
+    """
+    df_dly_hydat = {}
+    time = np.hstack([df_Q['Time'], df_N['Time']])
+    time = np.unique(time)
+    time = np.sort(time)
+
+    df_dly_hydat['Time'] = time
+    for field in ['Year', 'Month', 'Day']:
+        df_dly_hydat[field] = np.zeros(len(time)).astype(int)
+    for field in ['Flow', 'Level']:
+        df_dly_hydat[field] = np.zeros(len(time)).astype(float) * np.nan
+
+    indexes = np.digitize(df_Q['Time'], time, right=True)
+    for key in ['Year', 'Month', 'Day']:
+        df_dly_hydat[key][indexes] = df_Q[key]
+    df_dly_hydat['Flow'][indexes] = df_Q['Daily values']
+
+    indexes = np.digitize(df_N['Time'], time, right=True)
+    for key in ['Year', 'Month', 'Day']:
+        df_dly_hydat[key][indexes] = df_N[key]
+    df_dly_hydat['Level'][indexes] = df_N['Daily values']
+    return df_dly_hydat
+
+
+def legacy_parse(sid, data_Q, data_N):
+    return legacy_merge_dly_series(
+        legacy_scrape_daily_series_from_txt(sid, data_Q),
+        legacy_scrape_daily_series_from_txt(sid, data_N))
+
+
+def bulk_parse(sid, data_Q, data_N):
+    return merge_dly_series(
+        scrape_daily_series_from_txt(sid, data_Q),
+        scrape_daily_series_from_txt(sid, data_N))
+
+
+if __name__ == "__main__":
+    sid = '022704'
+    data_Q = create_synthetic_dly_file(sid, 1915, 2019)
+    data_N = create_synthetic_dly_file(sid, 1950, 2019, offset=100)
+    print("Synthetic files: {} and {} lines".format(len(data_Q), len(data_N)))
+
+    legacy = legacy_parse(sid, data_Q, data_N)
+    bulk = bulk_parse(sid, data_Q, data_N)
+    for key in ['Time', 'Year', 'Month', 'Day', 'Flow', 'Level']:
+        assert np.allclose(legacy[key], bulk[key], equal_nan=True)
+
+    number = 5
+    t_legacy = timeit.timeit(
+        lambda: legacy_parse(sid, data_Q, data_N), number=number)
+    t_bulk = timeit.timeit(
+        lambda: bulk_parse(sid, data_Q, data_N), number=number)
+    print("Line by line: {:0.2f} ms".format(t_legacy / number * 1000))
+    print("Bulk: {:0.2f} ms".format(t_bulk / number * 1000))
+    print("Speedup: {:0.1f}x".format(t_legacy / t_bulk))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:11:53 2026
+@author: jsgosselin
+
+A script to benchmark the single-pass station csv writer against the
+implementation it replaced in correct_waterlevels.py, which wrote the
+dataframe with to_csv, read the whole file back with the csv module and
+wrote it again with the metadata header, on 20 years of hourly readings.
+"""
+
+# ---- Standard library imports
+import csv
+import os
+import os.path as osp
+import tempfile
+import timeit
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+# ---- Local imports
+from data_readers.utils import save_series_to_csv
+
+
+HEADER = [["Well Name", 'Synthetic well'],
+          ["Well ID", '00000000'],
+          ["Latitude", 45.5],
+          ["Longitude", -72.5],
+          ["Altitude", 123.45],
+          ["Province", 'Qc'],
+          []]
+
+
+def create_synthetic_wldata(years):
+    """Create a synthetic dataframe of hourly water levels and temperature."""
+    index = pd.date_range('2000-01-01', periods=years * 365 * 24, freq='h')
+    data = pd.DataFrame(
+        {'WL(masl)': 100 + np.random.rand(len(index)),
+         'WT(degC)': 8 + np.random.rand(len(index))},
+        index=index)
+    data.index.name = 'Date'
+    data.iloc[::50, 1] = np.nan
+    return data
+
+
+def legacy_save_to_csv(data, filename):
+    """
+    The three pass implementation that was used previously in
+    correct_waterlevels.py.
+    """
+    data.to_csv(filename)
+
+    with open(filename, 'r', encoding='utf8') as csvfile:
+        reader = list(csv.reader(csvfile, delimiter=','))
+
+    fcontent = list(HEADER)
+    fcontent.extend(reader)
+
+    with open(filename, 'w', encoding='utf8') as csvfile:
+        writer = csv.writer(csvfile, delimiter=',', lineterminator='\n')
+        writer.writerows(fcontent)
+
+
+def save_to_csv(data, filename):
+    """The single pass implementation now used in correct_waterlevels.py."""
+    save_series_to_csv(
+        filename, HEADER, [data.index.name] + list(data.columns),
+        [data.index.values] + [data[col].values for col in data.columns],
+        fmt='%r')
+
+
+if __name__ == "__main__":
+    data = create_synthetic_wldata(20)
+    print("Synthetic series: {} rows".format(len(data)))
+
+    tmpdir = tempfile.mkdtemp()
+    legacy_filename = osp.join(tmpdir, 'legacy.csv')
+    filename = osp.join(tmpdir, 'single_pass.csv')
+    legacy_save_to_csv(data, legacy_filename)
+    save_to_csv(data, filename)
+    legacy = pd.read_csv(legacy_filename, skiprows=7, index_col=0,
+                         parse_dates=True)
+    single_pass = pd.read_csv(filename, skiprows=7, index_col=0,
+                              parse_dates=True)
+    assert (legacy.index == single_pass.index).all()
+    assert np.array_equal(legacy.values, single_pass.values,
+                          equal_nan=True)
+
+    number = 3
+    t_legacy = timeit.timeit(
+        lambda: legacy_save_to_csv(data, legacy_filename), number=number)
+    t_single_pass = timeit.timeit(
+        lambda: save_to_csv(data, filename), number=number)
+    print("Three passes: {:0.2f} ms".format(t_legacy / number * 1000))
+    print("Single pass: {:0.2f} ms".format(t_single_pass / number * 1000))
+    print("Speedup: {:0.1f}x".format(t_legacy / t_single_pass))
+
+    for filename in os.listdir(tmpdir):
+        os.remove(osp.join(tmpdir, filename))
+    os.rmdir(tmpdir)
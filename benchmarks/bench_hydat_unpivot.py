@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:50:08 2026
+@author: jsgosselin
+
+A script to benchmark the vectorized unpivot of the HYDAT daily tables
+against the row by row implementation it replaced, on a synthetic
+DLY_FLOWS table with 80 years of data.
+"""
+
+# ---- Standard library imports
+from calendar import monthrange
+import timeit
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+from xlrd.xldate import xldate_from_date_tuple
+
+# ---- Local imports
+from data_readers.read_ec_hydat import unpivot_dly_series
+
+
+def create_synthetic_dly_table(dtype, year_start, year_end):
+    """
+    Create a synthetic HYDAT daily table with one row per month and the
+    daily values stored in the columns <dtype>1 to <dtype>31.
+    """
+    rows = []
+    for year in range(year_start, year_end + 1):
+        for month in range(1, 13):
+            no_days = monthrange(year, month)[1]
+            values = np.random.rand(31) * 100
+            values[no_days:] = np.nan
+            rows.append([year, month, no_days] + list(values))
+    columns = (['YEAR', 'MONTH', 'NO_DAYS'] +
+               [dtype + str(day) for day in range(1, 32)])
+    return pd.DataFrame(rows, columns=columns)
+
+
+def legacy_dly_series_tolist(df_dly, dtype):
+    """
+    The row by row implementation that was used previously in
+    HYDAT_Reader._dly_series_tolist, with its day range corrected to
+    1..NO_DAYS so that its results can be compared with the new one.
+    """
+    columns = df_dly.columns.values.tolist()
+    data = {'Time': [], 'Year': [], 'Month': [], 'Day': [],
+            dtype.title(): []}
+    for row in df_dly.itertuples(index=False):
+        year = row.YEAR
+        mth = row.MONTH
+        day = 1
+        while day <= row.NO_DAYS:
+            try:
+                index = columns.index(dtype+str(day))
+            except ValueError:
+                pass
+            else:
+                time = xldate_from_date_tuple((year, mth, day), 0)
+                data['Time'].append(time)
+                data['Year'].append(year)
+                data['Month'].append(mth)
+                data['Day'].append(day)
+                data[dtype.title()].append(row[index])
+            finally:
+                day += 1
+    return data
+
+
+if __name__ == "__main__":
+    df_dly = create_synthetic_dly_table('FLOW', 1940, 2019)
+    print("Synthetic table: {} rows".format(len(df_dly)))
+
+    legacy = legacy_dly_series_tolist(df_dly, 'FLOW')
+    vectorized = unpivot_dly_series(df_dly, 'FLOW')
+    for key in ['Time', 'Year', 'Month', 'Day', 'Flow']:
+        assert np.array_equal(legacy[key], vectorized[key])
+    print("Daily values: {}".format(len(vectorized['Time'])))
+
+    number = 5
+    t_legacy = timeit.timeit(
+        lambda: legacy_dly_series_tolist(df_dly, 'FLOW'), number=number)
+    t_vectorized = timeit.timeit(
+        lambda: unpivot_dly_series(df_dly, 'FLOW'), number=number)
+    print("Row by row: {:0.2f} ms".format(t_legacy / number * 1000))
+    print("Vectorized: {:0.2f} ms".format(t_vectorized / number * 1000))
+    print("Speedup: {:0.1f}x".format(t_legacy / t_vectorized))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:06:37 2026
+@author: jsgosselin
+
+A script to benchmark the cold-start import cost of the data_readers
+package and of each of its readers.
+
+Each statement is run in a fresh interpreter with -X importtime and the
+cumulative import time of the modules it imports is reported, along with the
+heavy third party packages that were pulled in. The results can be appended
+to a csv file, so that regressions are visible over time:
+
+    python benchmarks/bench_import_time.py [output.csv]
+"""
+
+# ---- Standard library imports
+import csv
+import datetime
+import os.path as osp
+import statistics
+import subprocess
+import sys
+
+
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+
+STATEMENTS = [
+    ('package', "import data_readers"),
+    ('utils', "import data_readers.utils"),
+    ('HYDAT_Reader', "from data_readers import HYDAT_Reader"),
+    ('MDDELCC_CEHQ_Reader', "from data_readers import MDDELCC_CEHQ_Reader"),
+    ('MDDELCC_RSESQ_Reader', "from data_readers import MDDELCC_RSESQ_Reader"),
+]
+HEAVY_PACKAGES = ['numpy', 'pandas', 'requests', 'bs4', 'xlrd', 'h5py',
+                  'scipy', 'aiohttp']
+
+
+def measure_import_time(statement):
+    """
+    Run the statement in a fresh interpreter with -X importtime and return
+    the cumulative import time in ms of the modules it imported and the list
+    of the top level packages that were imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+
+    # The modules imported at the startup of the interpreter are listed
+    # before the ones imported by the statement, which are all nested
+    # under the data_readers package.
+    total = 0
+    packages = set()
+    started = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not cumulative_us.strip().isdigit():
+            continue
+        packages.add(name.strip().split('.')[0])
+        if name.strip().startswith('data_readers'):
+            started = True
+        if started and not name.startswith('  '):
+            # Only the top level modules are summed, since their cumulative
+            # time includes the time of the modules they imported.
+            total += int(cumulative_us)
+    return total / 1000, sorted(packages.intersection(HEAVY_PACKAGES))
+
+
+if __name__ == "__main__":
+    repeat = 5
+    results = []
+    for label, statement in STATEMENTS:
+        times = []
+        for i in range(repeat):
+            time_ms, packages = measure_import_time(statement)
+            times.append(time_ms)
+        results.append((label, statement, statistics.median(times),
+                        ' '.join(packages)))
+        print("{:<22} {:>8.1f} ms   {}".format(
+            label, statistics.median(times), ', '.join(packages) or '-'))
+
+    if len(sys.argv) > 1:
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        new_file = not osp.exists(sys.argv[1])
+        with open(sys.argv[1], 'a', newline='', encoding='utf8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['Date', 'Label', 'Statement',
+                                 'Import time (ms)', 'Heavy packages'])
+            for label, statement, time_ms, packages in results:
+                writer.writerow(
+                    [now, label, statement, '%0.1f' % time_ms, packages])
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:57:45 2026
+@author: jsgosselin
+
+A script to benchmark the streaming parser of the RSESQ xml data table
+against the BeautifulSoup implementation it replaced, on a large synthetic
+catalog of stations.
+"""
+
+# ---- Standard library imports
+from io import BytesIO
+import timeit
+
+# ---- Third party imports
+from bs4 import BeautifulSoup, CData
+
+# ---- Local imports
+from data_readers.read_mddelcc_rses import parse_xml_datatable
+from data_readers.utils import find_unique
+
+
+ROOT = 'http://www.mddelcc.gouv.qc.ca/eau/piezo/'
+
+
+def create_synthetic_xml_datatable(nplaces, nwells=2):
+    """
+    Create the content of a synthetic kml data table with nplaces placemarks
+    that each contains the description of nwells stations.
+    """
+    places = []
+    for i in range(nplaces):
+        blocks = []
+        for j in range(nwells):
+            sid = '{:06d}{:02d}'.format(i, j)
+            blocks.append(
+                'Station ={0}<br/>'
+                'Longitude =-{1:0.5f}<br/>'
+                'Latitude ={2:0.5f}<br/>'
+                'Nappe =Libre<br/>'
+                'Influencé =Non<br/>'
+                'Dernière lecture =2017-06-{3:02d}<br/>'
+                '<a href="{4}donnees/{0}.xls">Données</a><br/>'
+                '<a href="{4}schema/{0}.pdf">Schéma</a><br/>'
+                '<a href="{4}graph/{0}.gif">Graphique</a>'
+                .format(sid, 70 + i / nplaces, 45 + i / nplaces,
+                        j % 28 + 1, ROOT))
+        places.append(
+            '<Placemark><name>Puits {}</name>'
+            '<description><![CDATA[{}]]></description>'
+            '<Point><coordinates>-70,45,0</coordinates></Point>'
+            '</Placemark>'.format(i, '<br/>--<br/>'.join(blocks)))
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>' +
+            ''.join(places) +
+            '</Document></kml>').encode('utf-8')
+
+
+def legacy_read_xml_datatable(xml):
+    """
+    The BeautifulSoup implementation that was used previously in
+    read_xml_datatable.
+    """
+    soup = BeautifulSoup(xml, 'html.parser')
+    places = soup.find_all('placemark')
+
+    db = {}
+    for place in places:
+        desc = place.find('description')
+        name = place.find('name').text
+        for cd in desc.findAll(text=True):
+            if isinstance(cd, CData):
+                for i, cdi in enumerate(cd.split('<br/>--<br/>')):
+                    pid = find_unique('Station =(.*?)<br/>', cdi)
+
+                    db[pid] = {}
+                    db[pid]['ID'] = pid
+                    db[pid]['Name'] = name
+                    db[pid]['Longitude'] = find_unique(
+                        'Longitude =(.*?)<br/>', cdi)
+                    db[pid]['Latitude'] = find_unique(
+                        'Latitude =(.*?)<br/>', cdi)
+                    db[pid]['Nappe'] = find_unique(
+                        'Nappe =(.*?)<br/>', cdi)
+                    db[pid]['Influenced'] = find_unique(
+                        'Influencé =(.*?)<br/>', cdi)
+                    db[pid]['Last'] = find_unique(
+                        'Dernière lecture =(.*?)<br/>', cdi)
+
+                    keys = ['url data', 'url drilllog', 'url graph']
+                    ss = ['<br/><a href="(.*?)">Données',
+                          'Données</a><br/><a href="(.*?)">Schéma',
+                          'Schéma</a><br/><a href="(.*?)">Graphique']
+                    for key, s in zip(keys, ss):
+                        db[pid][key] = find_unique(s, cdi)
+    return db
+
+
+if __name__ == "__main__":
+    content = create_synthetic_xml_datatable(5000)
+    print("Synthetic catalog: {:0.1f} MB".format(len(content) / 1024**2))
+
+    legacy = legacy_read_xml_datatable(BytesIO(content))
+    streaming = parse_xml_datatable(BytesIO(content))
+    assert legacy == streaming
+
+    number = 3
+    t_legacy = timeit.timeit(
+        lambda: legacy_read_xml_datatable(BytesIO(content)), number=number)
+    t_streaming = timeit.timeit(
+        lambda: parse_xml_datatable(BytesIO(content)), number=number)
+    print("BeautifulSoup: {:0.2f} s".format(t_legacy / number))
+    print("Streaming: {:0.2f} s".format(t_streaming / number))
+    print("Speedup: {:0.1f}x".format(t_legacy / t_streaming))
@@ -28,29 +28,12 @@ from matplotlib.backends.backend_pdf import PdfPages
 
 # ---- Local imports
 from data_readers import MDDELCC_RSESQ_Reader
+from data_readers.spatial import calc_dist_from_coord
 
 matplotlib.rcParams['axes.unicode_minus'] = False
 plt.close('all')
 
 
-def calc_dist_from_coord(lat1, lon1, lat2, lon2):
-    """
-    Compute the  horizontal distance in km between a location given in
-    decimal degrees and a set of locations also given in decimal degrees.
-    """
-    lat1, lon1 = np.radians(lat1), np.radians(lon1)
-    lat2, lon2 = np.radians(lat2), np.radians(lon2)
-
-    r = 6373  # r is the Earth radius in km
-
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-
-    return r * c
-
-
 def plot_cross_correllation(x1, x2, station='', dist=0):
     crosscorr = np.correlate(x1, x2, mode='full')
     lags = np.arange(-len(x1) + 1, len(x1)) * 3
@@ -20,27 +20,11 @@ import os.path as osp
 # ---- Third party imports
 import netCDF4
 import numpy as np
+import pandas as pd
 
 # ---- Local imports
 from data_readers import MDDELCC_RSESQ_Reader
-
-
-def calc_dist_from_coord(lat1, lon1, lat2, lon2):
-    """
-    Compute the  horizontal distance in km between a location given in
-    decimal degrees and a set of locations also given in decimal degrees.
-    """
-    lat1, lon1 = np.radians(lat1), np.radians(lon1)
-    lat2, lon2 = np.radians(lat2), np.radians(lon2)
-
-    r = 6373  # r is the Earth radius in km
-
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-
-    return r * c
+from data_readers.spatial import SpatialIndex
 
 
 # %% Get RSESQ station locations
@@ -65,15 +49,13 @@ dset.close()
 # Get the daily barometric data from the NARR grid for the nodes that are
 # nearest to the stations of the RSESQ.
 
-latlon_idx = []
-latlon_jdx = []
-for lat_sta, lon_sta in zip(lat_rsesq, lon_rsesq):
-    dist = calc_dist_from_coord(lat_grid, lon_grid, lat_sta, lon_sta)
-    idx = np.argmin(np.min(dist, axis=1))
-    jdx = np.argmin(dist[idx, :])
-
-    latlon_idx.append(idx)
-    latlon_jdx.append(jdx)
+narr_index = SpatialIndex({'narr': pd.DataFrame(
+    {'Latitude': lat_grid.ravel(), 'Longitude': lon_grid.ravel()})})
+dist, nodes = narr_index.query('narr', lat_rsesq, lon_rsesq)
+latlon_idx, latlon_jdx = np.unravel_index(
+    nodes[:, 0].astype(int), lat_grid.shape)
+latlon_idx = list(latlon_idx)
+latlon_jdx = list(latlon_jdx)
 
 
 # %% Extract baro data from NARR grid
@@ -13,7 +13,9 @@ import re
 
 # ---- Third party imports
 import hydsensread as hsr
-import pandas as pd
+
+# ---- Local imports
+from data_readers.align import align_series
 
 
 region = ['Monteregie',
@@ -58,56 +60,39 @@ for file in os.listdir(dirname):
             rsesq_levelfiles[stn_id] = solinst_file
 
 print("Concatenating the level data... ")
-leveldata_stack = None
+leveldata_series = {}
 for stn_id in rsesq_levelfiles.keys():
     for column in rsesq_levelfiles[stn_id].records:
         if column.lower().startswith('level'):
-            level_data_stn = rsesq_levelfiles[stn_id].records[[column]].copy()
+            level_data_stn = rsesq_levelfiles[stn_id].records[column]
             # We convert into meters.
             if column.lower().endswith('_cm'):
-                level_data_stn[column] = level_data_stn[column] / 100
-            level_data_stn = level_data_stn.rename(columns={column: stn_id})
+                level_data_stn = level_data_stn / 100
+            leveldata_series[stn_id] = level_data_stn
             break
     else:
         print("Warning: there is no level data in that record.")
         continue
-
-    if leveldata_stack is None:
-        leveldata_stack = level_data_stn
-    else:
-        leveldata_stack = pd.merge(leveldata_stack,
-                                   level_data_stn,
-                                   left_index=True,
-                                   right_index=True,
-                                   how='outer')
-leveldata_stack.index.names = ['Date']
+leveldata_stack = align_series(leveldata_series, how='outer')
 print('Level data concatenated successfully.')
 
 print("Concatenating the baro data... ")
-barodata_stack = None
+barodata_series = {}
 for stn_id in rsesq_barofiles.keys():
     for column in rsesq_barofiles[stn_id].records.columns:
         if column.lower().startswith('level'):
-            baro_data_stn = rsesq_barofiles[stn_id].records[[column]].copy()
+            baro_data_stn = rsesq_barofiles[stn_id].records[column]
             # We convert into meters.
             if column.lower().endswith('_cm'):
-                baro_data_stn[column] = baro_data_stn[column] / 100
+                baro_data_stn = baro_data_stn / 100
             elif column.lower().endswith('_kpa'):
-                baro_data_stn[column] = baro_data_stn[column] * 0.101972
-            baro_data_stn = baro_data_stn.rename(columns={column: stn_id})
+                baro_data_stn = baro_data_stn * 0.101972
+            barodata_series[stn_id] = baro_data_stn
             break
     else:
         print("Warning: there is no level data in that record.")
         continue
-    if barodata_stack is None:
-        barodata_stack = baro_data_stn
-    else:
-        barodata_stack = pd.merge(barodata_stack,
-                                  baro_data_stn,
-                                  left_index=True,
-                                  right_index=True,
-                                  how='outer')
-barodata_stack.index.names = ['Date']
+barodata_stack = align_series(barodata_series, how='outer')
 print('Baro data concatenated successfully.')
 
 print("Saving the level and baro data to a csv... ", end='')
@@ -24,6 +24,7 @@ import pygtide
 
 # ---- Local imports
 from data_readers import MDDELCC_RSESQ_Reader
+from data_readers.align import align_series
 
 
 def generate_earth_tides(latitude, longitude, elevation, start_year, end_year,
@@ -55,25 +56,23 @@ def generate_earth_tides(latitude, longitude, elevation, start_year, end_year,
 # %% Produce and save the synthetic earth tides data to an csv file.
 
 rsesq_reader = MDDELCC_RSESQ_Reader()
-etdata_stack = None
+rsesq_catalog = rsesq_reader.catalog()
+etdata_series = {}
 i = 0
 for stn_id in rsesq_reader.station_ids():
     i += 1
-    sta_data = rsesq_reader.get_station_data(stn_id)
-    sta_lat = float(rsesq_reader[stn_id]['Latitude'])
-    sta_lon = float(rsesq_reader[stn_id]['Longitude'])
-    sta_ele = float(rsesq_reader[stn_id]['Elevation'])
-    if np.isnan(sta_ele):
+    # The elevation of the wells is read from the header of their data file.
+    sta_ele, sta_data = rsesq_reader.fetch_station_wldata(stn_id)
+    sta_lat = rsesq_catalog.at[stn_id, 'Latitude']
+    sta_lon = rsesq_catalog.at[stn_id, 'Longitude']
+    if sta_ele is None or np.isnan(sta_ele):
         continue
 
     etdata = generate_earth_tides(sta_lat, sta_lon, sta_ele, 1980, 2018)
-    etdata.rename(columns={'Signal [nm/s**2]': stn_id}, inplace=True)
-    if etdata_stack is None:
-        etdata_stack = etdata
-    else:
-        etdata_stack = pd.merge(etdata_stack, etdata,
-                                left_index=True, right_index=True,
-                                how='inner')
+    etdata_series[stn_id] = etdata['Signal [nm/s**2]']
+
+# Keep only the dates for which there are data at every well.
+etdata_stack = align_series(etdata_series, how='inner')
 
 # Save data to a csv file.
 dirname = osp.dirname(__file__)
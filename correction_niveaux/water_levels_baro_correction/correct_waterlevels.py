@@ -8,8 +8,6 @@
 
 
 # ---- Standard party imports
-import csv
-import os
 import os.path as osp
 from datetime import datetime
 
@@ -19,7 +17,9 @@ from matplotlib.backends.backend_pdf import PdfPages
 import numpy as np
 import pandas as pd
 import scipy.signal
-import xlrd
+
+# ---- Local imports
+from data_readers.utils import save_series_to_csv, xldates_to_datetime64
 
 
 workdir = osp.dirname(__file__)
@@ -46,8 +46,7 @@ def read_rsesq_data():
             stn_data['Water Level'], errors='coerce')
         stn_readings['Temperature (degC)'] = pd.to_numeric(
             stn_data['Temperature'], errors='coerce')
-        stn_readings.index = [
-            datetime(*xlrd.xldate_as_tuple(t, 0)) for t in stn_data['Time']]
+        stn_readings.index = xldates_to_datetime64(stn_data['Time'])
 
         rsesq_data[stn_id] = stn_readings.copy()
 
@@ -59,8 +58,7 @@ def read_rsesq_data():
 
     stn_readings = stn_data[
         ['Time', 'Water level (masl)', 'Water temperature (degC)']].copy()
-    stn_readings.index = [
-        datetime(*xlrd.xldate_as_tuple(t, 0)) for t in stn_data['Time']]
+    stn_readings.index = xldates_to_datetime64(stn_data['Time'].values)
     stn_readings = stn_readings.drop('Time', axis=1)
     stn_readings = stn_readings.rename(
         columns={'Water level (masl)': 'Water Level (masl)',
@@ -293,16 +291,7 @@ for sid, sta_data in rsesq_data.items():
         plt.close('all')
 
     # ---- Save the data to file
-    if not osp.exists(dirname):
-        os.makedirs(dirname)
-
-    filename = osp.join(dirname, filename)
-    sta_data.to_csv(filename)
-
-    with open(filename, 'r', encoding='utf8') as csvfile:
-        reader = list(csv.reader(csvfile, delimiter=','))
-
-    fcontent = [
+    header = [
         ["Well Name", sta_name],
         ["Well ID", sid],
         ["Latitude", sta_lat],
@@ -311,11 +300,12 @@ for sid, sta_data in rsesq_data.items():
         ["Province", 'Qc'],
         [],
         ]
-    fcontent.extend(reader)
-
-    with open(filename, 'w', encoding='utf8') as csvfile:
-        writer = csv.writer(csvfile, delimiter=',', lineterminator='\n')
-        writer.writerows(fcontent)
+    save_series_to_csv(
+        osp.join(dirname, filename), header,
+        [sta_data.index.name] + list(sta_data.columns),
+        [sta_data.index.values] +
+        [sta_data[col].values for col in sta_data.columns],
+        fmt='%r')
 
     print('done')
 pdfpages.close()
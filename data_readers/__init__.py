@@ -4,5 +4,27 @@ Created on Sat Apr  8 13:56:17 2017
 @author: jnsebgosselin
 """
 
-from .read_mddelcc_cehq import MDDELCC_CEHQ_Reader
-from .read_mddelcc_rses import MDDELCC_RSESQ_Reader
+import importlib
+
+# The readers are imported from their module on first access, so that
+# importing the package, or one of its helper modules, does not pull in
+# the dependencies of every reader.
+_READERS = {'MDDELCC_CEHQ_Reader': 'read_mddelcc_cehq',
+            'MDDELCC_RSESQ_Reader': 'read_mddelcc_rses',
+            'HYDAT_Reader': 'read_ec_hydat'}
+
+__all__ = list(_READERS)
+
+
+def __getattr__(name):
+    if name in _READERS:
+        module = importlib.import_module('.' + _READERS[name], __name__)
+        reader = getattr(module, name)
+        globals()[name] = reader
+        return reader
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:21:03 2026
+@author: jsgosselin
+"""
+
+# ---- Standard library imports
+import threading
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+# ---- Local imports
+from data_readers.utils import imap_in_thread_pool, xldates_to_datetime64
+
+
+KEY_NAMES = ['Network', 'Station', 'Variable']
+
+
+def series_to_arrays(series):
+    """
+    Return the times of a time series indexed by date as int64 nanoseconds
+    along with its values as floats.
+    """
+    times = np.asarray(series.index.values, dtype='datetime64[ns]')
+    return times.view('int64'), np.asarray(series.values, dtype=float)
+
+
+def sorted_unique(times):
+    """
+    Return the sorted unique values of an array of int64 times.
+
+    The times of the series are usually sorted already, in which case the
+    sort is skipped and only the repeated values are removed.
+    """
+    if np.any(times[1:] < times[:-1]):
+        times = np.sort(times)
+    mask = np.ones(len(times), dtype=bool)
+    mask[1:] = times[1:] != times[:-1]
+    return times[mask]
+
+
+def freq_to_nanoseconds(freq):
+    """
+    Return the length in nanoseconds of a fixed frequency, like 'D', 'h'
+    or '15min'. A ValueError is raised for frequencies that do not have a
+    fixed length, like months or years.
+    """
+    try:
+        return pd.tseries.frequencies.to_offset(freq).nanos
+    except ValueError:
+        raise ValueError(
+            "The frequency '{}' does not have a fixed length.".format(freq))
+
+
+def align_series(series, freq=None, how='outer', agg='mean'):
+    """
+    Align a dictionary of time series indexed by date on a shared time axis
+    and return them in a dataframe with one column per series.
+
+    If a frequency is provided, the readings are grouped in bins of that
+    frequency, the values of each bin are aggregated with agg, which is
+    either 'mean' or 'sum', and the time axis spans the bins between the
+    first and last reading regularly when how is 'outer'. Otherwise, the
+    time axis is the union of the dates of the series and the values of
+    duplicated dates are aggregated. When how is 'inner', only the dates
+    where all the series have a reading are kept.
+
+    The dataframe is allocated once and each series is mapped to its rows
+    with a binary search of its dates on the time axis, instead of merging
+    the series one pair at a time. When the keys of the series are
+    (network, station, variable) tuples, the columns of the dataframe are
+    a MultiIndex with these levels.
+    """
+    if how not in ('outer', 'inner'):
+        raise ValueError("how must be either 'outer' or 'inner'.")
+    if agg not in ('mean', 'sum'):
+        raise ValueError("agg must be either 'mean' or 'sum'.")
+
+    keys = list(series)
+    arrays = [series_to_arrays(series[key]) for key in keys]
+    if freq is not None:
+        step = freq_to_nanoseconds(freq)
+        arrays = [(times // step * step, values) for times, values in arrays]
+
+    # Build the shared time axis.
+    uniques = [sorted_unique(times) for times, values in arrays]
+    if how == 'inner':
+        axis = uniques[0] if uniques else np.array([], dtype='int64')
+        for times in uniques[1:]:
+            axis = np.intersect1d(axis, times, assume_unique=True)
+    elif freq is not None and any(len(times) for times in uniques):
+        axis = np.arange(min(t[0] for t in uniques if len(t)),
+                         max(t[-1] for t in uniques if len(t)) + step,
+                         step, dtype='int64')
+    else:
+        axis = sorted_unique(
+            np.hstack(uniques + [np.array([], dtype='int64')]))
+
+    # Map the readings of each series to the rows of the time axis.
+    # The matrix is allocated in column-major order, so that each series is
+    # written in a contiguous block, which is also the layout in which
+    # pandas stores the columns of a dataframe.
+    matrix = np.full((len(axis), len(keys)), np.nan, order='F')
+    for j, (times, values) in enumerate(arrays):
+        rows = np.searchsorted(axis, times)
+        mask = ~np.isnan(values) & (rows < len(axis))
+        mask[mask] = axis[rows[mask]] == times[mask]
+        if len(uniques[j]) == len(times):
+            # There is a single reading per row, so there is nothing
+            # to aggregate.
+            matrix[rows[mask], j] = values[mask]
+            continue
+        totals = np.bincount(
+            rows[mask], weights=values[mask], minlength=len(axis))
+        counts = np.bincount(rows[mask], minlength=len(axis))
+        if agg == 'mean':
+            totals = totals / np.maximum(counts, 1)
+        matrix[counts > 0, j] = totals[counts > 0]
+
+    if keys and all(isinstance(key, tuple) and len(key) == 3 for key in keys):
+        columns = pd.MultiIndex.from_tuples(keys, names=KEY_NAMES)
+    else:
+        columns = pd.Index(keys)
+    return pd.DataFrame(
+        matrix, columns=columns,
+        index=pd.DatetimeIndex(axis.view('datetime64[ns]'), name='Date'))
+
+
+class StationQuery(object):
+    """
+    A facade over the readers of the station networks to get the time series
+    of stations of different networks aligned on a shared time axis.
+
+    The series are requested with (network, station, variable) keys. The
+    readers of the RSESQ, CEHQ and HYDAT networks are created lazily on
+    first use, unless they are provided. The series of other sources, like
+    climate stations or synthetic data, can be made available with
+    add_series.
+    """
+    READERS = {'RSESQ': 'MDDELCC_RSESQ_Reader',
+               'CEHQ': 'MDDELCC_CEHQ_Reader',
+               'HYDAT': 'HYDAT_Reader'}
+
+    # The name of the columns of the data returned by the readers for each
+    # variable of their network.
+    VARIABLES = {'RSESQ': {'Level': 'Water Level (masl)',
+                           'Temperature': 'Temperature (degC)'},
+                 'CEHQ': {'Level': 'Level', 'Flow': 'Flow'},
+                 'HYDAT': {'Level': 'Level', 'Flow': 'Flow'}}
+
+    def __init__(self, readers=None, workdir=None, offline=False):
+        self.workdir = workdir
+        self.offline = offline
+        self._readers = dict(readers or {})
+        self._readers_lock = threading.Lock()
+        self._series = {}
+
+    def reader(self, network):
+        """Return the reader of the specified network."""
+        with self._readers_lock:
+            if network not in self._readers:
+                if network not in self.READERS:
+                    raise KeyError("There is no reader for network {}."
+                                   .format(network))
+                import data_readers
+                self._readers[network] = getattr(
+                    data_readers, self.READERS[network])(
+                        self.workdir, lazy=True, offline=self.offline)
+            return self._readers[network]
+
+    def add_series(self, network, sid, variable, series):
+        """
+        Make the time series indexed by date available under the specified
+        key, replacing the series of the readers if any.
+        """
+        self._series[(network, sid, variable)] = series
+
+    def get_series(self, network, sid, variable, start=None, end=None):
+        """
+        Return the time series of the specified variable of a station
+        between the start and end dates inclusively.
+        """
+        if (network, sid, variable) in self._series:
+            return self._series[(network, sid, variable)].loc[start:end]
+        if network not in self.VARIABLES:
+            raise KeyError("There is no series for network {}."
+                           .format(network))
+        if variable not in self.VARIABLES[network]:
+            raise KeyError("There is no variable {} for network {}."
+                           .format(variable, network))
+        column = self.VARIABLES[network][variable]
+
+        reader = self.reader(network)
+        if network == 'RSESQ':
+            elevation, data = reader.fetch_station_wldata(
+                sid, start=start, end=end)
+            if data is None:
+                return pd.Series([], dtype=float, index=pd.DatetimeIndex([]))
+            return data[column]
+        if network == 'HYDAT':
+            data = (reader.get_dly_flow(sid, start, end) if
+                    variable == 'Flow' else
+                    reader.get_dly_level(sid, start, end))
+        else:
+            data = reader.get_station_data(sid, start, end)
+        return pd.Series(
+            np.asarray(data[column], dtype=float),
+            index=pd.DatetimeIndex(xldates_to_datetime64(data['Time'])))
+
+    def get_matrix(self, keys, freq='D', start=None, end=None, how='outer',
+                   agg='mean', max_workers=None):
+        """
+        Return the time series of the specified (network, station,
+        variable) keys between the start and end dates inclusively, aligned
+        on a shared time axis of the specified frequency, in a dataframe
+        with one column per key.
+
+        See align_series for the meaning of freq, how and agg. If
+        max_workers is provided, the series are read with a pool of at most
+        that many threads.
+        """
+        keys = [tuple(key) for key in keys]
+
+        # The readers are created in the calling thread, before the series
+        # are read from the threads of the pool.
+        for network in {key[0] for key in keys if key not in self._series}:
+            if network in self.VARIABLES:
+                self.reader(network)
+
+        def get_series(key):
+            return self.get_series(*key, start=start, end=end)
+
+        if max_workers is None:
+            series = map(get_series, keys)
+        else:
+            series = imap_in_thread_pool(get_series, keys, max_workers)
+        return align_series(
+            dict(zip(keys, series)), freq=freq, how=how, agg=agg)
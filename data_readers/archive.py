@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:02:30 2026
+@author: jsgosselin
+"""
+
+# ---- Standard library imports
+import os
+import os.path as osp
+
+# ---- Third party imports
+import h5py
+import numpy as np
+import pandas as pd
+
+# ---- Local imports
+from data_readers.utils import bisect_sorted, xldates_to_datetime64
+
+
+CHUNK_ROWS = 4096
+COMPRESSION = 'gzip'
+COMPRESSION_LEVEL = 4
+
+
+# ---- HDF5 groups
+def write_station_group(group, data, attrs=None):
+    """
+    Write the time series dataframe of a station in the specified HDF5 group
+    along with its metadata as attributes.
+
+    The times are saved in a 'time' dataset of int64 nanoseconds and the
+    values in a 2D 'data' dataset of floats, with one column per column of
+    the dataframe. Both datasets are chunked, compressed and resizable, so
+    that new readings can be appended and a time slice can be read without
+    loading the whole series.
+    """
+    for name in ['time', 'data']:
+        if name in group:
+            del group[name]
+
+    time = data.index.values.astype('datetime64[ns]').view('int64')
+    values = data.values.astype(float).reshape(len(data), len(data.columns))
+    order = np.argsort(time, kind='stable')
+
+    group.attrs['columns'] = [str(col) for col in data.columns]
+    set_group_attrs(group, attrs)
+
+    group.create_dataset(
+        'time', data=time[order], maxshape=(None,), chunks=(CHUNK_ROWS,),
+        compression=COMPRESSION, compression_opts=COMPRESSION_LEVEL,
+        shuffle=True)
+    group.create_dataset(
+        'data', data=values[order], maxshape=(None, values.shape[1]),
+        chunks=(CHUNK_ROWS, max(values.shape[1], 1)),
+        compression=COMPRESSION, compression_opts=COMPRESSION_LEVEL,
+        shuffle=True)
+
+
+def set_group_attrs(group, attrs):
+    """Save the metadata of a station as attributes of its HDF5 group."""
+    for key, value in (attrs or {}).items():
+        if value is None:
+            value = ''
+        elif isinstance(value, (np.integer, np.floating, np.bool_)):
+            value = value.item()
+        group.attrs[key] = value
+
+
+def append_station_group(group, data):
+    """
+    Append the readings of the time series dataframe that are more recent
+    than the last reading saved in the specified HDF5 group.
+
+    Return the number of readings that were appended.
+    """
+    columns = list(group.attrs['columns'])
+    time = data.index.values.astype('datetime64[ns]').view('int64')
+    if len(group['time']):
+        mask = time > group['time'][-1]
+    else:
+        mask = np.ones(len(time), dtype=bool)
+    time = time[mask]
+    values = data[columns].values.astype(float)[mask]
+    order = np.argsort(time, kind='stable')
+
+    nrows = len(group['time'])
+    for name, new in [('time', time[order]), ('data', values[order])]:
+        group[name].resize(nrows + len(new), axis=0)
+        group[name][nrows:] = new
+    return len(time)
+
+
+def bisect_dataset(dset, value, side='left'):
+    """
+    Find the index where value should be inserted in the sorted 1D dataset
+    to keep it sorted, reading only the elements visited by the search.
+    """
+    return bisect_sorted(dset, value, lambda item: item, side)
+
+
+def read_station_group(group, start=None, end=None):
+    """
+    Read the time series dataframe saved in the specified HDF5 group.
+
+    If start or end are provided, only the readings between these dates
+    inclusively are read from the file.
+    """
+    columns = list(group.attrs['columns'])
+    i0 = (0 if start is None else bisect_dataset(
+        group['time'], pd.Timestamp(start).value, 'left'))
+    i1 = (len(group['time']) if end is None else bisect_dataset(
+        group['time'], pd.Timestamp(end).value, 'right'))
+    i1 = max(i0, i1)
+    return pd.DataFrame(
+        group['data'][i0:i1],
+        index=pd.DatetimeIndex(
+            group['time'][i0:i1].view('datetime64[ns]')),
+        columns=columns)
+
+
+def dlydata_to_frame(station, columns=('Level', 'Flow')):
+    """
+    Split the dictionary of a station with daily data in the format of the
+    CEHQ and HYDAT readers into a dataframe of the daily series indexed by
+    date and a dictionary of metadata.
+    """
+    data = pd.DataFrame(
+        {col: np.asarray(station[col], dtype=float) for col in columns},
+        index=pd.DatetimeIndex(xldates_to_datetime64(station['Time'])),
+        columns=list(columns))
+    attrs = {key: value for key, value in station.items()
+             if key not in ['Time', 'Year', 'Month', 'Day'] + list(columns)
+             and np.ndim(value) == 0}
+    return data, attrs
+
+
+class StationArchive(object):
+    """
+    An HDF5 archive of the time series of the stations of one or more
+    networks, where each station is saved in its own group.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def _open(self, mode):
+        if mode != 'r':
+            dirname = osp.dirname(osp.abspath(self.filepath))
+            os.makedirs(dirname, exist_ok=True)
+        return h5py.File(self.filepath, mode)
+
+    def station_ids(self):
+        """Return the IDs of the stations saved in the archive."""
+        if not osp.exists(self.filepath):
+            return []
+        with self._open('r') as h5file:
+            return list(h5file.keys())
+
+    def __contains__(self, sid):
+        if not osp.exists(self.filepath):
+            return False
+        with self._open('r') as h5file:
+            return str(sid) in h5file
+
+    def save(self, sid, data, attrs=None):
+        """
+        Save the time series dataframe and the metadata of the specified
+        station in the archive, replacing what was saved for it previously.
+        """
+        with self._open('a') as h5file:
+            if str(sid) in h5file:
+                del h5file[str(sid)]
+            write_station_group(
+                h5file.create_group(str(sid)), data, attrs)
+
+    def append(self, sid, data, attrs=None):
+        """
+        Append the readings of the time series dataframe that are more
+        recent than the last reading saved for the specified station and
+        update its metadata. The station is saved if it is not in the archive
+        yet.
+
+        Return the number of readings that were appended.
+        """
+        with self._open('a') as h5file:
+            if str(sid) not in h5file:
+                write_station_group(
+                    h5file.create_group(str(sid)), data, attrs)
+                return len(data)
+            group = h5file[str(sid)]
+            set_group_attrs(group, attrs)
+            return append_station_group(group, data)
+
+    def load(self, sid, start=None, end=None):
+        """
+        Return the time series dataframe of the specified station between
+        the start and end dates inclusively, or None if the station is not
+        in the archive.
+        """
+        if sid not in self:
+            return None
+        with self._open('r') as h5file:
+            return read_station_group(h5file[str(sid)], start, end)
+
+    def get_attrs(self, sid):
+        """Return the metadata of the specified station."""
+        with self._open('r') as h5file:
+            attrs = dict(h5file[str(sid)].attrs)
+        attrs.pop('columns', None)
+        return attrs
+
+    def last_time(self, sid):
+        """
+        Return the date of the last reading saved for the specified station
+        or None if there is none.
+        """
+        if sid not in self:
+            return None
+        with self._open('r') as h5file:
+            time = h5file[str(sid)]['time']
+            if len(time) == 0:
+                return None
+            return pd.Timestamp(int(time[-1]))
@@ -6,18 +6,54 @@ Created on Tue Oct 17 10:38:02 2017
 
 # ---- Imports: standard library
 from abc import ABC, abstractmethod
+import asyncio
 import os.path as osp
+import threading
+
+# ---- Imports: local
+from data_readers.utils import create_async_http_session
 
 
 class AbstractReader(ABC):
 
     DATABASE_FILEPATH = None
+    MAX_CONCURRENCY = 8
+
+    # The attributes that are set by load_database. When the reader is lazy,
+    # the database is loaded on first access to one of them.
+    LAZY_ATTRS = ('_db',)
 
-    def __init__(self, workdir=None):
+    def __init__(self, workdir=None, lazy=False, offline=False):
+        """
+        If lazy is True, the database is not loaded when the reader is
+        created, but on first access to it. If offline is True, the reader
+        uses only the data saved locally and never accesses the network.
+        """
         super().__init__()
-        if isinstance(workdir, str) and osp.exists(workdir):
+        self.offline = offline
+        self._loading = False
+        self._load_lock = threading.RLock()
+        if (isinstance(workdir, str) and osp.exists(workdir) and
+                self.DATABASE_FILEPATH is not None):
             self.DATABASE_FILEPATH = osp.join(workdir, self.DATABASE_FILEPATH)
-        self.load_database()
+        if not lazy:
+            self.load_database()
+
+    def __getattr__(self, name):
+        # This is only called when an attribute is not found, which is the
+        # case for the attributes set by load_database until it is called.
+        if name in self.LAZY_ATTRS and '_load_lock' in self.__dict__:
+            with self._load_lock:
+                if name not in self.__dict__ and not self._loading:
+                    self._loading = True
+                    try:
+                        self.load_database()
+                    finally:
+                        self._loading = False
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
 
     # ---- Load and fetch database
     @abstractmethod
@@ -28,6 +64,56 @@ class AbstractReader(ABC):
     def fetch_database(self):
         pass
 
+    # ---- Asynchronous fetch
+    async def fetch_database_async(self, session=None):
+        """
+        Fetch the database in the running event loop. Readers that do not
+        implement it natively run fetch_database in the default executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.fetch_database)
+
+    async def fetch_station_async(self, sid, session=None):
+        """
+        Fetch and return the data of the specified station in the running
+        event loop, using the provided aiohttp session if any. Readers that
+        do not implement it natively run get_station_data in the default
+        executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_station_data, sid)
+
+    async def iter_stations_async(self, sids=None, failures=None):
+        """
+        Fetch the data of all the stations, or of the specified stations
+        only, in the running event loop and yield a (sid, data) tuple for
+        each station as soon as its data are fetched.
+
+        At most MAX_CONCURRENCY stations are fetched at a time. If a
+        failures dictionary is provided, the error raised for a station is
+        stored in it and the station is skipped. Otherwise, the error is
+        raised.
+        """
+        sids = self.station_ids() if sids is None else sids
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        async with create_async_http_session(self.MAX_CONCURRENCY) as session:
+            async def fetch(sid):
+                async with semaphore:
+                    try:
+                        return sid, await self.fetch_station_async(
+                            sid, session), None
+                    except Exception as error:
+                        return sid, None, error
+
+            for future in asyncio.as_completed([fetch(sid) for sid in sids]):
+                sid, data, error = await future
+                if error is None:
+                    yield sid, data
+                elif failures is not None:
+                    failures[sid] = error
+                else:
+                    raise error
+
     # ---- Utility functions
     @abstractmethod
     def stations(self):
@@ -37,6 +123,14 @@ class AbstractReader(ABC):
     def station_ids(self):
         pass
 
+    @abstractmethod
+    def get_station_coords(self):
+        """
+        Return a dataframe indexed by station ID with the latitude and
+        longitude of the stations in decimal degrees.
+        """
+        pass
+
     # ---- Save to file
 
     @abstractmethod
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:48:14 2026
+@author: jsgosselin
+"""
+
+# ---- Standard library imports
+import datetime
+import json
+import os
+import os.path as osp
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+
+class StationCache(object):
+    """
+    A persistent on-disk cache of station time series.
+
+    Each station is saved in its own HDF5 file, in the same layout as in a
+    StationArchive, along with the url and the version of the source it was
+    read from, so that the data can be loaded back without having to parse
+    the source file again.
+
+    h5py is only imported when the cache is accessed, so that importing the
+    readers does not load it.
+    """
+
+    def __init__(self, dirname):
+        self.dirname = dirname
+
+    def filepath(self, sid):
+        """Return the path of the cache file of the specified station."""
+        return osp.join(self.dirname, '{}.h5'.format(sid))
+
+    def is_stale(self, sid, url, version=None):
+        """
+        Return whether the cached data of the specified station are missing
+        or were read from a different source url or version.
+        """
+        import h5py
+
+        filepath = self.filepath(sid)
+        if not osp.exists(filepath):
+            return True
+        with h5py.File(filepath, 'r') as h5file:
+            return (h5file.attrs.get('url') != (url or '') or
+                    h5file.attrs.get('version') != (version or ''))
+
+    def load(self, sid, url=None, version=None, start=None, end=None):
+        """
+        Return the elevation and the time series dataframe of the specified
+        station or None if the station is not cached.
+
+        If url or version are provided, None is also returned when the cached
+        data were read from a different source url or version. If start or
+        end are provided, only the readings between these dates inclusively
+        are read from the cache.
+        """
+        import h5py
+        from data_readers.archive import read_station_group
+
+        filepath = self.filepath(sid)
+        if not osp.exists(filepath):
+            return None
+        with h5py.File(filepath, 'r') as h5file:
+            if url is not None and h5file.attrs['url'] != url:
+                return None
+            if version is not None and h5file.attrs['version'] != version:
+                return None
+
+            # Files saved in an older layout are treated as missing.
+            if not isinstance(h5file.get('data'), h5py.Dataset):
+                return None
+            data = read_station_group(h5file, start, end)
+            elevation = h5file.attrs['elevation']
+        return elevation, data
+
+    def get_attrs(self, sid):
+        """
+        Return the url, the version and the elevation of the cached data of
+        the specified station in a dictionary or None if the station is not
+        cached or was saved in an older layout.
+        """
+        import h5py
+
+        filepath = self.filepath(sid)
+        if not osp.exists(filepath):
+            return None
+        with h5py.File(filepath, 'r') as h5file:
+            if not isinstance(h5file.get('data'), h5py.Dataset):
+                return None
+            return {key: h5file.attrs.get(key) for key in
+                    ['url', 'version', 'elevation']}
+
+    def last_time(self, sid):
+        """
+        Return the date of the last reading cached for the specified station
+        or None if there is none.
+        """
+        import h5py
+
+        if self.get_attrs(sid) is None:
+            return None
+        with h5py.File(self.filepath(sid), 'r') as h5file:
+            time = h5file['time']
+            if len(time) == 0:
+                return None
+            return pd.Timestamp(int(time[-1]))
+
+    def append(self, sid, url, version, elevation, data):
+        """
+        Append the readings of the time series dataframe that are more
+        recent than the last reading cached for the specified station and
+        update the url, version and elevation of the cached data. The
+        station is saved if it is not cached yet.
+
+        Return the number of readings that were appended.
+        """
+        import h5py
+        from data_readers.archive import (
+            append_station_group, set_group_attrs)
+
+        if self.get_attrs(sid) is None:
+            self.save(sid, url, version, elevation, data)
+            return len(data)
+        # The version is updated after the readings, so that an interrupted
+        # append is done again on the next sync and only adds the readings
+        # that are still missing.
+        with h5py.File(self.filepath(sid), 'a') as h5file:
+            count = append_station_group(h5file, data)
+            set_group_attrs(h5file, {
+                'url': url or '',
+                'version': version or '',
+                'elevation': np.nan if elevation is None else elevation})
+        return count
+
+    def save(self, sid, url, version, elevation, data):
+        """
+        Save the elevation and the time series dataframe of the specified
+        station in the cache.
+        """
+        import h5py
+        from data_readers.archive import write_station_group
+
+        os.makedirs(self.dirname, exist_ok=True)
+
+        # We write to a temporary file first so that an interrupted write
+        # never leaves a corrupted file in the cache.
+        filepath = self.filepath(sid)
+        tmppath = filepath + '.tmp'
+        with h5py.File(tmppath, 'w') as h5file:
+            write_station_group(h5file, data, {
+                'url': url or '',
+                'version': version or '',
+                'elevation': np.nan if elevation is None else elevation})
+        os.replace(tmppath, filepath)
+
+    def clear(self, sid=None):
+        """
+        Remove the cached data of the specified station or of all stations
+        if sid is None.
+        """
+        if sid is not None:
+            sids = [sid]
+        elif osp.exists(self.dirname):
+            sids = [f[:-3] for f in os.listdir(self.dirname)
+                    if f.endswith('.h5')]
+        else:
+            sids = []
+        for sid in sids:
+            if osp.exists(self.filepath(sid)):
+                os.remove(self.filepath(sid))
+
+
+class CatalogSnapshot(object):
+    """
+    A versioned local snapshot of the station catalog of a reader.
+
+    The catalog is saved in a JSON file along with the version of the
+    snapshot format, the time it was saved and the source it was read from,
+    so that a reader can be created from it without accessing the network.
+    """
+    VERSION = 1
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def exists(self):
+        return osp.exists(self.filepath)
+
+    def save(self, stations, source=None):
+        """Save the stations of the catalog to the snapshot file."""
+        dirname = osp.dirname(osp.abspath(self.filepath))
+        os.makedirs(dirname, exist_ok=True)
+
+        tmppath = self.filepath + '.tmp'
+        with open(tmppath, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION,
+                       'created': datetime.datetime.now().isoformat(),
+                       'source': source,
+                       'stations': stations}, f, ensure_ascii=False)
+        os.replace(tmppath, self.filepath)
+
+    def load(self):
+        """
+        Return the stations of the catalog saved in the snapshot file.
+
+        A FileNotFoundError is raised if there is no snapshot and a
+        ValueError if it was saved in a different format version.
+        """
+        if not self.exists():
+            raise FileNotFoundError(
+                "There is no local snapshot of the catalog at {}."
+                .format(self.filepath))
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get('version') != self.VERSION:
+            raise ValueError(
+                "The local snapshot of the catalog at {} is in format "
+                "version {} instead of {}.".format(
+                    self.filepath, snapshot.get('version'), self.VERSION))
+        return snapshot['stations']
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:17:36 2026
+@author: jsgosselin
+"""
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+
+# The fields of the station catalogs of the readers with the type of their
+# column, which is either 'str', 'float', 'category' or 'datetime'.
+RSESQ_CATALOG_SCHEMA = [
+    ('ID', 'str'),
+    ('Name', 'str'),
+    ('Latitude', 'float'),
+    ('Longitude', 'float'),
+    ('Nappe', 'category'),
+    ('Influenced', 'category'),
+    ('Last', 'datetime'),
+    ('url data', 'str')]
+
+CEHQ_CATALOG_SCHEMA = [
+    ('ID', 'str'),
+    ('Name', 'str'),
+    ('Status', 'category'),
+    ('Municipality', 'category'),
+    ('Administrative Region', 'category'),
+    ('Stream Name', 'str'),
+    ('Hydrographic Region', 'category'),
+    ('Flow Regime', 'category'),
+    ('Latitude', 'float'),
+    ('Longitude', 'float'),
+    ('Elevation', 'float'),
+    ('Drainage Area', 'float'),
+    ('Federal ID', 'str')]
+
+
+def build_station_catalog(db, schema):
+    """
+    Build a typed catalog of the stations of a network from a dictionary
+    of station info dictionaries keyed by station ID.
+
+    The catalog is a dataframe indexed by station ID with one column per
+    field of the schema. It is built one column at a time instead of one
+    row at a time. Coordinates and other numeric fields are converted to
+    floats, with NaN for the values that are missing or not numeric, and
+    fields with few distinct values, like the status or the aquifer type of
+    the stations, are stored as categoricals.
+    """
+    sids = sorted(db)
+    columns = {}
+    for key, dtype in schema:
+        values = [db[sid].get(key) for sid in sids]
+        if dtype == 'float':
+            # Some values are saved as strings with a decimal comma.
+            values = [value.replace(',', '.') if isinstance(value, str)
+                      else value for value in values]
+            columns[key] = pd.to_numeric(
+                pd.Series(values, dtype=object), errors='coerce').to_numpy(
+                    dtype=float)
+        elif dtype == 'category':
+            columns[key] = pd.Categorical(values)
+        elif dtype == 'datetime':
+            columns[key] = pd.to_datetime(
+                pd.Series(values, dtype=object), errors='coerce').to_numpy()
+        else:
+            columns[key] = np.array(values, dtype=object)
+    return pd.DataFrame(
+        columns, index=pd.Index(sids, name='ID', dtype=object),
+        columns=[key for key, dtype in schema])
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:15:22 2026
+@author: jsgosselin
+"""
+
+# ---- Standard library imports
+import datetime
+import json
+import os
+import os.path as osp
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+# ---- Local imports
+from data_readers.utils import xldates_to_datetime64
+
+
+DLY_COLUMNS = ['Time', 'Year', 'Month', 'Day', 'Level', 'Flow']
+
+
+def to_json_value(value):
+    """
+    Convert a metadata value of a station to a value that can be saved in
+    JSON, with NaN converted to None.
+    """
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class StationDataset(object):
+    """
+    A dataset of the daily series of the stations of a network saved in
+    Parquet files partitioned by province and station.
+
+    The Excel serial dates of the Time column are saved as timestamp[ns]
+    values, so that the Parquet files can be read as time series directly.
+
+    The series of each station is saved in its own file at
+    Province=<province>/ID=<station>/data.parquet, using the hive naming
+    convention for the partition directories. A JSON manifest lists the
+    partitions along with the metadata, the number of rows and the period
+    of each station, with ISO-8601 dates, so that downstream jobs can select
+    and read the partitions they need without opening the others. The name
+    of the manifest starts with an underscore, so that it is ignored by the
+    Parquet readers that discover the partitions from the directory tree.
+    """
+    VERSION = 3
+    MANIFEST = '_manifest.json'
+
+    def __init__(self, dirname):
+        self.dirname = dirname
+
+    def partition_path(self, province, sid):
+        """
+        Return the path of the file of the specified station relative to
+        the root directory of the dataset.
+        """
+        return '/'.join(['Province={}'.format(province),
+                         'ID={}'.format(sid), 'data.parquet'])
+
+    def write_partition(self, province, sid, data, columns=DLY_COLUMNS):
+        """
+        Save the daily series of a station, given in a dictionary of arrays,
+        in its partition and return the entry of the partition to add to
+        the manifest.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self.partition_path(province, sid)
+        filepath = osp.join(self.dirname, *path.split('/'))
+        os.makedirs(osp.dirname(filepath), exist_ok=True)
+
+        time = xldates_to_datetime64(data['Time'])
+        table = pa.table({col: time if col == 'Time' else
+                          np.asarray(data[col]) for col in columns})
+        pq.write_table(table, filepath + '.tmp', compression='zstd')
+        os.replace(filepath + '.tmp', filepath)
+
+        if len(time) == 0:
+            start, end = None, None
+        else:
+            start = str(np.datetime_as_string(time.min(), unit='D'))
+            end = str(np.datetime_as_string(time.max(), unit='D'))
+        return {'path': path, 'rows': len(time), 'start': start, 'end': end}
+
+    def save_manifest(self, partitions, source=None):
+        """Save the manifest of the partitions of the dataset."""
+        os.makedirs(self.dirname, exist_ok=True)
+        filepath = osp.join(self.dirname, self.MANIFEST)
+        with open(filepath + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION,
+                       'created': datetime.datetime.now().isoformat(),
+                       'source': source,
+                       'partitions': partitions},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(filepath + '.tmp', filepath)
+
+    def manifest(self):
+        """
+        Return the partitions listed in the manifest of the dataset in a
+        dataframe indexed by station ID.
+
+        A FileNotFoundError is raised if there is no manifest and a
+        ValueError if it was saved in a different format version.
+        """
+        filepath = osp.join(self.dirname, self.MANIFEST)
+        if not osp.exists(filepath):
+            raise FileNotFoundError(
+                "There is no dataset manifest at {}.".format(filepath))
+        with open(filepath, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != self.VERSION:
+            raise ValueError(
+                "The dataset manifest at {} is in format version {} instead "
+                "of {}.".format(filepath, manifest.get('version'),
+                                self.VERSION))
+        partitions = pd.DataFrame(manifest['partitions'])
+        if len(partitions):
+            partitions = partitions.set_index('ID', drop=False)
+        return partitions
+
+    def load(self, sid, columns=None):
+        """
+        Return the daily series of the specified station in a dataframe,
+        reading only the specified columns if any.
+        """
+        import pyarrow.parquet as pq
+
+        path = self.manifest().at[sid, 'path']
+        return pq.read_table(
+            osp.join(self.dirname, *path.split('/')),
+            columns=columns).to_pandas()
+
+    def export(self, stations, source=None, attrs=None, verbose=True):
+        """
+        Save the stations yielded by the iterable of stations in the format
+        of HYDAT_Reader.iter_dly_hydat in their partition and save the
+        manifest of the dataset. The progress is printed if verbose is True.
+
+        The metadata of the stations are added to their manifest entry,
+        restricted to the keys listed in attrs if any. Return the manifest
+        entries of the stations that were saved.
+        """
+        partitions = []
+        for i, station in enumerate(stations):
+            entry = {key: to_json_value(value) for key, value in
+                     station.items() if key not in DLY_COLUMNS and
+                     (attrs is None or key in attrs or key == 'ID')}
+            entry.update(self.write_partition(
+                station['Province'], station['ID'], station))
+            partitions.append(entry)
+            if verbose:
+                print("\rSaving station %s (%d saved)" % (
+                      station['ID'], i + 1), end="          ")
+        if verbose:
+            print()
+        self.save_manifest(partitions, source)
+        return partitions
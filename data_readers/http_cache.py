@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:58:58 2026
+@author: jsgosselin
+"""
+
+# ---- Standard library imports
+import asyncio
+import hashlib
+import os
+import os.path as osp
+import sqlite3
+import threading
+import time
+
+# ---- Local imports
+from data_readers.utils import (
+    HTTP_TIMEOUT, create_http_session, create_async_http_session,
+    get_user_cache_dir)
+
+
+HTTP_CACHE_DIRPATH = osp.join(get_user_cache_dir(), 'http_cache')
+HTTP_CACHE_MAXSIZE = 500 * 1024**2
+HTTP_CACHE_TTL = 24 * 3600
+
+
+class HTTPCache(object):
+    """
+    A persistent on-disk cache of HTTP responses shared by the data readers.
+
+    The content of each url is saved in its own file, while its ETag and
+    Last-Modified headers, its size and the times it was last fetched and
+    last accessed are kept in a SQLite index. Content younger than ttl
+    seconds is returned without any request, unless a revalidation is
+    requested. Older content is revalidated with a conditional request, so
+    that it is downloaded again only if it changed on the server. The least
+    recently accessed content is evicted when the total size of the cache
+    exceeds max_size bytes.
+    """
+
+    def __init__(self, dirname=HTTP_CACHE_DIRPATH, max_size=HTTP_CACHE_MAXSIZE,
+                 ttl=HTTP_CACHE_TTL):
+        self.dirname = dirname
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._lock = threading.RLock()
+        self._session = None
+
+        os.makedirs(self.dirname, exist_ok=True)
+        self._con = sqlite3.connect(
+            osp.join(self.dirname, 'index.sqlite3'), check_same_thread=False)
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, filename TEXT, etag TEXT, "
+                "last_modified TEXT, size INTEGER, fetched REAL, "
+                "accessed REAL)")
+
+    def close(self):
+        """Close the connection to the index of the cache."""
+        with self._lock:
+            self._con.close()
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def filepath(self, url):
+        """Return the path of the file where the content of url is saved."""
+        return osp.join(
+            self.dirname, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def _get_entry(self, url):
+        with self._lock:
+            row = self._con.execute(
+                "SELECT etag, last_modified, fetched FROM responses "
+                "WHERE url = ?", (url,)).fetchone()
+        if row is None or not osp.exists(self.filepath(url)):
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'fetched': row[2]}
+
+    def _read(self, url, fetched=None):
+        """
+        Read the cached content of url and mark it as accessed, as well as
+        fetched if a time is provided.
+        """
+        with open(self.filepath(url), 'rb') as f:
+            content = f.read()
+        with self._lock, self._con:
+            if fetched is None:
+                self._con.execute(
+                    "UPDATE responses SET accessed = ? WHERE url = ?",
+                    (time.time(), url))
+            else:
+                self._con.execute(
+                    "UPDATE responses SET accessed = ?, fetched = ? "
+                    "WHERE url = ?", (time.time(), fetched, url))
+        return content
+
+    def _write(self, url, content, headers):
+        """Save the content and the validators of a response to the cache."""
+        filepath = self.filepath(url)
+        tmppath = '{}.{}.tmp'.format(filepath, threading.get_ident())
+        with open(tmppath, 'wb') as f:
+            f.write(content)
+        os.replace(tmppath, filepath)
+
+        now = time.time()
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO responses"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, osp.basename(filepath), headers.get('ETag'),
+                 headers.get('Last-Modified'), len(content), now, now))
+        self.evict()
+
+    def _get_validators(self, entry):
+        """Return the headers of a conditional request for a cache entry."""
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _is_fresh(self, entry, revalidate=False):
+        return (not revalidate and entry is not None and
+                time.time() - entry['fetched'] < self.ttl)
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = create_http_session()
+            return self._session
+
+    def fetch(self, url, session=None, revalidate=False):
+        """
+        Return the content of url, downloading it only if it is not cached
+        or if it changed on the server since it was cached.
+
+        If revalidate is True, the cached content is revalidated with the
+        server even if it is younger than ttl. A requests session can be
+        provided to reuse its pooled connections. The cached content is
+        returned if the server cannot be reached or does not respond within
+        HTTP_TIMEOUT seconds.
+        """
+        import requests
+
+        entry = self._get_entry(url)
+        if self._is_fresh(entry, revalidate):
+            return self._read(url)
+
+        session = session or self._get_session()
+        try:
+            response = session.get(
+                url, headers=self._get_validators(entry),
+                timeout=HTTP_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if entry is None:
+                raise
+            return self._read(url)
+
+        if response.status_code == 304 and entry is not None:
+            return self._read(url, fetched=time.time())
+        response.raise_for_status()
+        self._write(url, response.content, response.headers)
+        return response.content
+
+    async def fetch_async(self, url, session=None, revalidate=False):
+        """
+        Return the content of url like fetch does, but download it with
+        an aiohttp session in the running event loop.
+        """
+        import aiohttp
+
+        entry = self._get_entry(url)
+        if self._is_fresh(entry, revalidate):
+            return self._read(url)
+
+        if session is None:
+            async with create_async_http_session() as session:
+                return await self.fetch_async(url, session, revalidate)
+        try:
+            async with session.get(
+                    url, headers=self._get_validators(entry)) as response:
+                if response.status == 304 and entry is not None:
+                    return self._read(url, fetched=time.time())
+                response.raise_for_status()
+                content = await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if entry is None:
+                raise
+            return self._read(url)
+
+        self._write(url, content, response.headers)
+        return content
+
+    def retrieve(self, url, filepath, session=None, revalidate=False):
+        """
+        Save the content of url to the specified filepath, downloading it
+        only if it is not cached or if it changed on the server.
+        """
+        content = self.fetch(url, session, revalidate)
+        with open(filepath, 'wb') as f:
+            f.write(content)
+
+    def size(self):
+        """Return the total size in bytes of the cached content."""
+        with self._lock:
+            return self._con.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self):
+        """
+        Remove the least recently accessed content until the total size of
+        the cache is below max_size.
+        """
+        with self._lock:
+            total = self.size()
+            if total <= self.max_size:
+                return
+            rows = self._con.execute(
+                "SELECT url, size FROM responses ORDER BY accessed").fetchall()
+            with self._con:
+                for url, size in rows:
+                    if total <= self.max_size:
+                        break
+                    self._remove(url)
+                    total -= size
+
+    def _remove(self, url):
+        if osp.exists(self.filepath(url)):
+            os.remove(self.filepath(url))
+        self._con.execute("DELETE FROM responses WHERE url = ?", (url,))
+
+    def clear(self, url=None):
+        """
+        Remove the cached content of the specified url or of all urls if
+        url is None.
+        """
+        with self._lock, self._con:
+            if url is not None:
+                urls = [url]
+            else:
+                urls = [row[0] for row in
+                        self._con.execute("SELECT url FROM responses")]
+            for url in urls:
+                self._remove(url)
+
+
+_HTTP_CACHE = None
+_HTTP_CACHE_LOCK = threading.Lock()
+
+
+def get_http_cache():
+    """Return the HTTP cache shared by all the data readers."""
+    global _HTTP_CACHE
+    with _HTTP_CACHE_LOCK:
+        if _HTTP_CACHE is None:
+            _HTTP_CACHE = HTTPCache()
+        return _HTTP_CACHE
+
+
+def set_http_cache(dirname=HTTP_CACHE_DIRPATH, max_size=HTTP_CACHE_MAXSIZE,
+                   ttl=HTTP_CACHE_TTL):
+    """
+    Set the location, the maximum size in bytes and the time to live in
+    seconds of the HTTP cache shared by all the data readers.
+    """
+    global _HTTP_CACHE
+    with _HTTP_CACHE_LOCK:
+        if _HTTP_CACHE is not None:
+            _HTTP_CACHE.close()
+        _HTTP_CACHE = HTTPCache(dirname, max_size, ttl)
+        return _HTTP_CACHE
+
+
+def fetch_url(url, session=None, revalidate=False):
+    """
+    Return the content of url through the HTTP cache shared by all the
+    data readers, revalidating the cached content with the server if
+    revalidate is True.
+    """
+    return get_http_cache().fetch(url, session, revalidate)
+
+
+async def fetch_url_async(url, session=None, revalidate=False):
+    """
+    Return the content of url through the HTTP cache shared by all the
+    data readers, downloading it with an aiohttp session.
+    """
+    return await get_http_cache().fetch_async(url, session, revalidate)
@@ -6,19 +6,106 @@ Created on Tue Jun 13 14:29:29 2017
 
 # ---- Imports: standard library
 
+from itertools import groupby
+from operator import itemgetter
+from urllib.request import pathname2url
 import sqlite3
 import os
-import csv
+import threading
 
 # ---- Imports: third parties
 
 import pandas as pd
 import numpy as np
-from xlrd.xldate import xldate_from_date_tuple
 
 # ---- Imports: local
 
-from base import AbstractReader
+from data_readers.base import AbstractReader
+from data_readers.utils import (
+    imap_in_thread_pool, save_series_to_csv, slice_dly_series,
+    xldates_from_ymd)
+
+
+def connect_hydat(filepath, mmap_size=2**30, cache_size=64 * 2**20):
+    """
+    Open a read-only connection to the HYDAT database.
+
+    The database is opened as immutable, so that SQLite does not lock the
+    file nor check whether it was changed by another process, which means
+    that the file must not be modified while it is opened. Up to mmap_size
+    bytes of the file are memory-mapped and up to cache_size bytes of pages
+    are cached by the connection.
+    """
+    uri = 'file:{}?mode=ro&immutable=1'.format(
+        pathname2url(os.path.abspath(filepath)))
+    con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    con.execute("PRAGMA mmap_size = {:d}".format(mmap_size))
+    con.execute("PRAGMA cache_size = {:d}".format(-(cache_size // 1024)))
+    con.execute("PRAGMA temp_store = MEMORY")
+    return con
+
+
+# ---- Base functions
+
+
+def unpivot_dly_series(df_dly, dtype):
+    """
+    Reshape the content of a DLY_FLOWS or DLY_LEVELS table, where each row
+    holds the daily values of a month in the columns <dtype>1 to <dtype>31,
+    into daily time series arrays. If the table contains the
+    STATION_NUMBER column, the station ID of each daily value is also
+    returned.
+
+    The day columns are stacked in a 2D block and the days beyond the number
+    of days in each month (NO_DAYS) are masked out in a single operation.
+    """
+    days = np.arange(1, 32)
+    values = df_dly.reindex(
+        columns=[dtype + str(day) for day in days]).to_numpy(dtype=float)
+    mask = days[np.newaxis, :] <= df_dly['NO_DAYS'].to_numpy()[:, np.newaxis]
+
+    shape = (len(df_dly), len(days))
+    data = {}
+    if 'STATION_NUMBER' in df_dly.columns:
+        data['ID'] = np.broadcast_to(
+            df_dly['STATION_NUMBER'].to_numpy(dtype=object)[:, np.newaxis],
+            shape)[mask]
+    data['Year'] = np.broadcast_to(
+        df_dly['YEAR'].to_numpy(dtype=int)[:, np.newaxis], shape)[mask]
+    data['Month'] = np.broadcast_to(
+        df_dly['MONTH'].to_numpy(dtype=int)[:, np.newaxis], shape)[mask]
+    data['Day'] = np.broadcast_to(days, shape)[mask]
+    data['Time'] = xldates_from_ymd(data['Year'], data['Month'], data['Day'])
+    data[dtype.title()] = values[mask]
+    return data
+
+
+def combine_dly_series(df_dly_flows, df_dly_levels):
+    """
+    Combine the daily flow and level series returned by unpivot_dly_series
+    on a common time axis.
+    """
+    time = np.hstack([df_dly_flows['Time'], df_dly_levels['Time']])
+    time = np.unique(time)
+    time = np.sort(time)
+
+    df_dly_hydat = {}
+    df_dly_hydat['Time'] = time
+    for field in ['Year', 'Month', 'Day']:
+        df_dly_hydat[field] = np.zeros(len(time)).astype(int)
+    for field in ['Flow', 'Level']:
+        df_dly_hydat[field] = np.zeros(len(time)).astype(float) * np.nan
+
+    if len(df_dly_flows['Time']) > 0:
+        indexes = np.digitize(df_dly_flows['Time'], time, right=True)
+        for key in ['Year', 'Month', 'Day', 'Flow']:
+            df_dly_hydat[key][indexes] = df_dly_flows[key]
+    if len(df_dly_levels['Time']) > 0:
+        indexes = np.digitize(df_dly_levels['Time'], time, right=True)
+        for key in ['Year', 'Month', 'Day', 'Level']:
+            df_dly_hydat[key][indexes] = df_dly_levels[key]
+
+    return df_dly_hydat
 
 
 # ---- API
@@ -27,13 +114,78 @@ from base import AbstractReader
 class HYDAT_Reader(AbstractReader):
 
     DATABASE_FILEPATH = 'Hydat.sqlite3'
+    LAZY_ATTRS = ('_db', '_connections')
+    SQL_CHUNKSIZE = 500
+    SQL_MMAP_SIZE = 2**30
+    SQL_CACHE_SIZE = 64 * 2**20
+
+    DLY_TABLES = {'FLOW': 'DLY_FLOWS', 'LEVEL': 'DLY_LEVELS'}
+
+    STATION_INFO_FIELDS = [
+        ('STATION_NUMBER', 'ID'),
+        ('STATION_NAME', 'Name'),
+        ('PROV_TERR_STATE_LOC', 'Province'),
+        ('LATITUDE', 'Latitude'),
+        ('LONGITUDE', 'Longitude'),
+        ('DRAINAGE_AREA_GROSS', 'Drainage Area Gross'),
+        ('DRAINAGE_AREA_EFFECT', 'Drainage Area Effect')]
 
     def load_database(self):
         if not os.path.exists(self.DATABASE_FILEPATH):
             raise FileNotFoundError
 
-        self._con = sqlite3.connect(self.DATABASE_FILEPATH)
+        # Each thread queries the database with its own connection, which
+        # is opened on first use.
+        self._connections = threading.local()
+        self._connections_list = []
+        self._connections_lock = threading.Lock()
+
+        # We keep the content of the STATIONS table in memory indexed by
+        # station number, so that the info of the stations can be looked up
+        # without querying the database each time.
         self._db = pd.read_sql_query("select * from STATIONS;", self._con)
+        self._db = self._db.set_index('STATION_NUMBER', drop=False)
+
+    @property
+    def _con(self):
+        """The connection to the database of the calling thread."""
+        connections = self._connections
+        if not hasattr(connections, 'con'):
+            connections.con = connect_hydat(
+                self.DATABASE_FILEPATH, self.SQL_MMAP_SIZE,
+                self.SQL_CACHE_SIZE)
+            with self._connections_lock:
+                # The connections of the threads that ended, like the ones
+                # of a thread pool that was shut down, are closed here.
+                for thread, con in self._connections_list:
+                    if not thread.is_alive():
+                        con.close()
+                self._connections_list = [
+                    (thread, con) for thread, con in self._connections_list
+                    if thread.is_alive()]
+                self._connections_list.append(
+                    (threading.current_thread(), connections.con))
+        return connections.con
+
+    def close(self):
+        """
+        Close the connections to the database of all threads. They are
+        opened again on the next query.
+        """
+        with self._connections_lock:
+            for thread, con in self._connections_list:
+                con.close()
+            self._connections_list = []
+            self._connections = threading.local()
+
+    def fetch_database(self):
+        """
+        The HYDAT database cannot be fetched automatically. It must be
+        downloaded from https://www.canada.ca/en/environment-climate-change/
+        services/water-overview/quantity/monitoring/survey/data-products-
+        services/national-archive-hydat.html and saved at DATABASE_FILEPATH.
+        """
+        raise NotImplementedError
 
     def get_version(self):
         cur = self._con.execute("select * from Version;")
@@ -45,22 +197,63 @@ class HYDAT_Reader(AbstractReader):
         return results
 
     def stations(self):
-        return self._db['STATION_NAME'].as_matrix().flatten()
+        return self._db['STATION_NAME'].to_numpy()
 
     def station_ids(self):
-        return self._db['STATION_NUMBER'].as_matrix().flatten()
+        return self._db['STATION_NUMBER'].to_numpy()
 
-    def get_station_ids(self, hydstatus=None, province=None):
+    def get_metadata(self, sids=None, fields=None):
+        """
+        Return the info of the specified stations, or of all the stations if
+        sids is None, in a dataframe indexed by station number.
+
+        The fields to return can be specified with a list of column names
+        of the STATIONS table. The row of stations that do not exist in the
+        database are filled with NaN.
+        """
+        metadata = self._db if sids is None else self._db.reindex(sids)
+        return metadata if fields is None else metadata[fields]
+
+    def get_station_coords(self):
+        return self._get_station_info(None)[['Latitude', 'Longitude']]
+
+    def _get_station_info(self, sids):
+        """
+        Return the info of the specified stations in a dataframe indexed by
+        ID with the column names that are used for the station data.
+        """
+        stations = self.get_metadata(
+            sids, [field for field, key in self.STATION_INFO_FIELDS])
+        stations = stations.rename(columns=dict(self.STATION_INFO_FIELDS))
+        stations['ID'] = stations.index.values
+        stations.index.name = 'ID'
+        return stations
+
+    def _stations_filter(self, hydstatus=None, province=None):
+        """
+        Return the WHERE clause and its parameters to select the stations
+        with the specified status and province in the STATIONS table. A list
+        of provinces can be provided to select the stations of all of them.
+        """
         params = []
-        req = "select STATION_NUMBER from STATIONS"
+        req = ""
         keyword = "WHERE"
         if hydstatus:
             params.append(hydstatus)
             req += " %s HYD_STATUS = ?" % keyword
             keyword = "AND"
-        if province:
+        if province and isinstance(province, (list, tuple, set)):
+            params.extend(province)
+            req += " %s PROV_TERR_STATE_LOC IN (%s)" % (
+                keyword, ', '.join(['?'] * len(province)))
+        elif province:
             params.append(province)
             req += " %s PROV_TERR_STATE_LOC = ?" % keyword
+        return req, params
+
+    def get_station_ids(self, hydstatus=None, province=None):
+        where, params = self._stations_filter(hydstatus, province)
+        req = "select STATION_NUMBER from STATIONS" + where
 
         cur = self._con.execute(req, params)
         results = cur.fetchall()
@@ -68,9 +261,7 @@ class HYDAT_Reader(AbstractReader):
         return [i[0] for i in results]
 
     def _get_from_sid(self, sid, param):
-        req = "select %s from STATIONS WHERE STATION_NUMBER = ?;" % param
-        cur = self._con.execute(req, [sid])
-        return cur.fetchall()[0][0]
+        return self._db.at[sid, param]
 
     def get_hydstatus_from_sid(self, sid):
         """Return whether the station is still active or not."""
@@ -104,131 +295,386 @@ class HYDAT_Reader(AbstractReader):
         """
         return self._get_from_sid(sid, 'DRAINAGE_AREA_EFFECT')
 
-    def get_dly_flow(self, sid):
+    def _time_window_filter(self, start=None, end=None):
+        """
+        Return the conditions and their parameters to select the rows of a
+        daily table for the months that overlap the time window. When no
+        start is specified, only the years after 1930 are selected.
+        """
+        conditions = []
+        params = []
+        if start is None:
+            conditions.append("YEAR > 1930")
+        else:
+            start = pd.Timestamp(start)
+            conditions.append("YEAR * 100 + MONTH >= ?")
+            params.append(start.year * 100 + start.month)
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions.append("YEAR * 100 + MONTH <= ?")
+            params.append(end.year * 100 + end.month)
+        return " AND ".join(conditions), params
+
+    def get_dly_flow(self, sid, start=None, end=None):
         """"Return a time series with daily flow values in m^3/s"""
-        req = ("select * from DLY_FLOWS WHERE STATION_NUMBER = ?"
-               " AND YEAR > 1930")
-        df = pd.read_sql_query(req, self._con, params=[sid])
-        return self._dly_series_tolist(df, 'FLOW')
+        return self._get_dly_series('DLY_FLOWS', 'FLOW', sid, start, end)
 
-    def get_dly_level(self, sid):
+    def get_dly_level(self, sid, start=None, end=None):
         """"Return a time series with water level values in m"""
-        req = ("select * from DLY_LEVELS WHERE STATION_NUMBER = ?"
-               " AND YEAR > 1930")
-        df = pd.read_sql_query(req, self._con, params=[sid])
-        return self._dly_series_tolist(df, 'LEVEL')
+        return self._get_dly_series('DLY_LEVELS', 'LEVEL', sid, start, end)
 
-    def get_dly_hydat_from_id(self, sid):
-        df_dly_hydat = {}
+    def _get_dly_series(self, table, dtype, sid, start=None, end=None):
+        """
+        Return the daily series of the specified table for the station
+        between the start and end dates inclusively. Only the rows of the
+        months that overlap this period are read from the database.
+        """
+        where, params = self._time_window_filter(start, end)
+        req = ("select * from {} WHERE STATION_NUMBER = ?"
+               " AND {} ORDER BY YEAR, MONTH").format(table, where)
+        df = pd.read_sql_query(req, self._con, params=[sid] + params)
+        return slice_dly_series(unpivot_dly_series(df, dtype), start, end)
 
+    def get_dly_hydat_from_id(self, sid, start=None, end=None):
         # ---- Fetch station info
 
-        df_dly_hydat['ID'] = sid
-        df_dly_hydat['Name'] = self.get_name_from_sid(sid)
-        df_dly_hydat['Province'] = self.get_prov_from_sid(sid)
-        df_dly_hydat['Latitude'], df_dly_hydat['Longitude'] = \
-            self.get_xy_from_sid(sid)
-        df_dly_hydat['Drainage Area Gross'] = self.get_drainage_area_gross(sid)
-        df_dly_hydat['Drainage Area Effect'] = \
-            self.get_drainage_area_effect(sid)
+        if sid not in self._db.index:
+            raise KeyError("There is no station {} in the HYDAT database."
+                           .format(sid))
+        df_dly_hydat = self._get_station_info([sid]).to_dict('records')[0]
 
         # ---- Fetch and format daily data
 
         # Fetch the daily flow and level data from the database and format
         # the data in an array.
 
-        df_dly_flows = self.get_dly_flow(sid)
-        df_dly_levels = self.get_dly_level(sid)
+        df_dly_flows = self.get_dly_flow(sid, start, end)
+        df_dly_levels = self.get_dly_level(sid, start, end)
 
         # ---- Combine flow and level datasets
 
-        time = np.hstack([df_dly_flows['Time'], df_dly_levels['Time']])
-        time = np.unique(time)
-        time = np.sort(time)
-
-        df_dly_hydat['Time'] = time
-        for field in ['Year', 'Month', 'Day']:
-            df_dly_hydat[field] = np.zeros(len(time)).astype(int)
-        for field in ['Flow', 'Level']:
-            df_dly_hydat[field] = np.zeros(len(time)).astype(float) * np.nan
-
-        if len(df_dly_flows) > 0:
-            indexes = np.digitize(df_dly_flows['Time'], time, right=True)
-            for key in ['Year', 'Month', 'Day', 'Flow']:
-                df_dly_hydat[key][indexes] = df_dly_flows[key]
-        if len(df_dly_levels) > 0:
-            indexes = np.digitize(df_dly_levels['Time'], time, right=True)
-            for key in ['Year', 'Month', 'Day', 'Level']:
-                df_dly_hydat[key][indexes] = df_dly_levels[key]
+        df_dly_hydat.update(combine_dly_series(df_dly_flows, df_dly_levels))
 
         return df_dly_hydat
 
-    def _dly_series_tolist(self, df_dly, dtype):
-        columns = df_dly.columns.values.tolist()
-        data = {'Time': [], 'Year': [], 'Month': [], 'Day': [],
-                dtype.title(): []}
-        for row in df_dly.itertuples(index=False):
-            year = row.YEAR
-            mth = row.MONTH
-            day = 0
-            while day < row.NO_DAYS:
-                try:
-                    index = columns.index(dtype+str(day))
-                except ValueError:
-                    pass
+    def get_station_data(self, sid, start=None, end=None):
+        """
+        Return the info and the daily flow and level data of the specified
+        station between the start and end dates inclusively.
+        """
+        return self.get_dly_hydat_from_id(sid, start, end)
+
+    def _iter_dly_rows(self, table, where, params, fetchsize, start=None,
+                       end=None):
+        """
+        Stream the rows of the specified daily table for the stations
+        selected by the WHERE clause in batches of fetchsize rows and yield
+        the rows of one station at a time in a dataframe.
+        """
+        window, window_params = self._time_window_filter(start, end)
+        cur = self._con.cursor()
+        cur.execute(("select * from {} WHERE {} AND STATION_NUMBER IN"
+                     " (select STATION_NUMBER from STATIONS{})"
+                     " ORDER BY STATION_NUMBER").format(table, window, where),
+                    window_params + params)
+        columns = [desc[0] for desc in cur.description]
+        getsid = itemgetter(columns.index('STATION_NUMBER'))
+
+        current_sid = None
+        rows = []
+        while True:
+            batch = cur.fetchmany(fetchsize)
+            if not batch:
+                break
+            for sid, group in groupby(batch, key=getsid):
+                if sid != current_sid:
+                    if rows:
+                        yield current_sid, pd.DataFrame(rows, columns=columns)
+                    current_sid = sid
+                    rows = []
+                rows.extend(group)
+        if rows:
+            yield current_sid, pd.DataFrame(rows, columns=columns)
+        cur.close()
+
+    def iter_dly_hydat(self, hydstatus=None, province=None, fetchsize=10000,
+                       start=None, end=None, max_workers=None):
+        """
+        Yield the daily flow and level data of the stations with the
+        specified status and province one station at a time, in the same
+        format as get_dly_hydat_from_id, between the start and end dates
+        inclusively.
+
+        The rows of the daily tables are streamed with the database cursor
+        in batches of fetchsize rows, so that only the data of the current
+        station are held in memory.
+
+        If max_workers is provided, the data of the stations are instead
+        queried one station at a time by a pool of max_workers threads,
+        each with its own connection to the database, and are yielded in
+        the same order.
+        """
+        sids = sorted(self.get_station_ids(hydstatus, province))
+        if max_workers is not None:
+            yield from imap_in_thread_pool(
+                lambda sid: self.get_dly_hydat_from_id(sid, start, end),
+                sids, max_workers)
+            return
+
+        where, params = self._stations_filter(hydstatus, province)
+        stations = self._get_station_info(sids)
+
+        dly_rows = {}
+        dly_heads = {}
+        for table in ['DLY_FLOWS', 'DLY_LEVELS']:
+            dly_rows[table] = self._iter_dly_rows(
+                table, where, params, fetchsize, start, end)
+            dly_heads[table] = next(dly_rows[table], (None, None))
+
+        # Both daily tables are streamed in the same order as the stations,
+        # so we only need to advance each stream when its current rows
+        # belong to the current station.
+        for station in stations.to_dict('records'):
+            dly_series = {}
+            for table, dtype in [('DLY_FLOWS', 'FLOW'),
+                                 ('DLY_LEVELS', 'LEVEL')]:
+                sid, df_dly = dly_heads[table]
+                if sid == station['ID']:
+                    dly_heads[table] = next(dly_rows[table], (None, None))
                 else:
-                    time = xldate_from_date_tuple((year, mth, day), 0)
-                    data['Time'].append(time)
-                    data['Year'].append(year)
-                    data['Month'].append(mth)
-                    data['Day'].append(day)
-                    data[dtype.title()].append(row[index])
-                finally:
-                    day += 1
-        return data
-
-    def save_station_to_hdf5(self, station_id, filepath):
-        return
+                    df_dly = pd.DataFrame(
+                        [], columns=['YEAR', 'MONTH', 'NO_DAYS'])
+                dly_series[dtype] = slice_dly_series(
+                    unpivot_dly_series(df_dly, dtype), start, end)
+
+            station.update(combine_dly_series(
+                dly_series['FLOW'], dly_series['LEVEL']))
+            yield station
+
+    def _read_sql_for_ids(self, req, sids, params=(), chunksize=None,
+                          max_workers=None):
+        """
+        Execute the request for the specified station IDs in chunks of at
+        most chunksize IDs, SQL_CHUNKSIZE by default, and return the results
+        in a dataframe. The request must contain a '{sids}' placeholder
+        where the list of parameters of the IN clause are inserted, followed
+        by the other parameters of the request.
+
+        If max_workers is provided, the chunks are queried by a pool of
+        max_workers threads, each with its own connection to the database.
+        """
+        def read_chunk(chunk):
+            return pd.read_sql_query(
+                req.format(sids=', '.join(['?'] * len(chunk))),
+                self._con, params=chunk + list(params))
+
+        sids = list(sids)
+        chunksize = chunksize or self.SQL_CHUNKSIZE
+        chunks = [sids[i:i + chunksize] for i in
+                  range(0, len(sids), chunksize)]
+        if max_workers is None:
+            chunks = [read_chunk(chunk) for chunk in chunks]
+        else:
+            chunks = list(imap_in_thread_pool(
+                read_chunk, chunks, max_workers))
+        if len(chunks) == 0:
+            return pd.read_sql_query(
+                req.format(sids="''") + " LIMIT 0", self._con,
+                params=list(params))
+        return pd.concat(chunks, ignore_index=True)
+
+    def get_dly_hydat_for_ids(self, sids, start=None, end=None,
+                              max_workers=None):
+        """
+        Return the daily flow and level data of the specified stations in a
+        long-format dataframe with one row per station and day, between the
+        start and end dates inclusively.
+
+        The data are fetched for all stations at once with a few chunked
+        queries instead of one query per station and field. The info of the
+        stations is stored in the 'stations' attribute of the dataframe.
+
+        If max_workers is provided, the stations are split in chunks of at
+        most SQL_CHUNKSIZE stations that are queried by a pool of max_workers
+        threads, so that the work is spread across the cores.
+        """
+        stations = self._get_station_info(sids)
+
+        chunksize = self.SQL_CHUNKSIZE
+        if max_workers is not None:
+            # Make sure that every thread gets a share of the stations.
+            chunksize = max(1, min(
+                chunksize, -(-len(stations) // max_workers)))
+
+        where, params = self._time_window_filter(start, end)
+        dly_series = []
+        for table, dtype in [('DLY_FLOWS', 'FLOW'), ('DLY_LEVELS', 'LEVEL')]:
+            df_dly = self._read_sql_for_ids(
+                ("select * from {} WHERE STATION_NUMBER IN ({{sids}})"
+                 " AND {}").format(table, where),
+                sids, params, chunksize, max_workers)
+            dly_series.append(pd.DataFrame(slice_dly_series(
+                unpivot_dly_series(df_dly, dtype), start, end)))
+
+        df_dly_hydat = pd.merge(
+            dly_series[0], dly_series[1],
+            on=['ID', 'Time', 'Year', 'Month', 'Day'], how='outer')
+        df_dly_hydat = df_dly_hydat[
+            ['ID', 'Time', 'Year', 'Month', 'Day', 'Level', 'Flow']]
+        df_dly_hydat = df_dly_hydat.sort_values(
+            ['ID', 'Time']).reset_index(drop=True)
+        df_dly_hydat.attrs['stations'] = stations
+
+        return df_dly_hydat
+
+    def get_dly_stats(self, sids, dtype='FLOW', freq='month', start=None,
+                      end=None):
+        """
+        Return the mean, min and max of the daily values and the number of
+        days with a value, for each month or year, of the specified station
+        or stations, between the start and end dates inclusively.
+
+        The statistics are computed within SQLite with expressions generated
+        over the day columns of the monthly rows of the daily table, so that
+        only the aggregated rows are returned from the database. The dtype
+        must be either 'FLOW' or 'LEVEL' and freq either 'month' or 'year'.
+        """
+        if dtype not in self.DLY_TABLES:
+            raise ValueError("dtype must be one of {}".format(
+                list(self.DLY_TABLES)))
+        if freq not in ('month', 'year'):
+            raise ValueError("freq must be either 'month' or 'year'")
+        if isinstance(sids, str):
+            sids = [sids]
+
+        # The first and last days of each month that are within the time
+        # window. Only the months of the start and end dates are partial.
+        first_day = "1"
+        last_day = "NO_DAYS"
+        if start is not None:
+            start = pd.Timestamp(start)
+            first_day = (
+                "CASE WHEN YEAR * 100 + MONTH = {:d} THEN {:d} ELSE 1 END"
+                ).format(start.year * 100 + start.month, start.day)
+        if end is not None:
+            end = pd.Timestamp(end)
+            last_day = (
+                "MIN(NO_DAYS, CASE WHEN YEAR * 100 + MONTH = {:d}"
+                " THEN {:d} ELSE 31 END)"
+                ).format(end.year * 100 + end.month, end.day)
+
+        # The statistics of each monthly row are computed first. The
+        # missing days are replaced by neutral values for the sum, min and
+        # max, since the scalar SQL functions do not skip NULL values.
+        values = [
+            "CASE WHEN {0} BETWEEN first_day AND last_day THEN {1}{0} END"
+            .format(day, dtype) for day in range(1, 32)]
+        count = ' + '.join("({} IS NOT NULL)".format(v) for v in values)
+        total = ' + '.join("COALESCE({}, 0.0)".format(v) for v in values)
+        vmin = "MIN({})".format(', '.join(
+            "COALESCE({}, 1e308)".format(v) for v in values))
+        vmax = "MAX({})".format(', '.join(
+            "COALESCE({}, -1e308)".format(v) for v in values))
+
+        where, params = self._time_window_filter(start, end)
+        groups = "ID, Year, Month" if freq == 'month' else "ID, Year"
+        req = (
+            "SELECT {groups}, TOTAL(total) / SUM(count) AS Mean,"
+            " MIN(NULLIF(vmin, 1e308)) AS Min,"
+            " MAX(NULLIF(vmax, -1e308)) AS Max, SUM(count) AS Count"
+            " FROM (SELECT ID, Year, Month, {count} AS count,"
+            " {total} AS total, {vmin} AS vmin, {vmax} AS vmax"
+            " FROM (SELECT *, STATION_NUMBER AS ID, YEAR AS Year,"
+            " MONTH AS Month, {first_day} AS first_day,"
+            " {last_day} AS last_day FROM {table}"
+            " WHERE STATION_NUMBER IN ({{sids}}) AND {where}))"
+            " GROUP BY {groups} ORDER BY {groups}"
+            ).format(
+                groups=groups, count=count, total=total, vmin=vmin,
+                vmax=vmax, first_day=first_day, last_day=last_day,
+                table=self.DLY_TABLES[dtype], where=where)
+        return self._read_sql_for_ids(req, sids, params)
+
+    def get_monthly_stats(self, sids, dtype='FLOW', start=None, end=None):
+        """
+        Return the monthly mean, min, max and number of days with a value
+        of the daily flow or level of the specified station or stations.
+        """
+        return self.get_dly_stats(sids, dtype, 'month', start, end)
+
+    def get_annual_stats(self, sids, dtype='FLOW', start=None, end=None):
+        """
+        Return the annual mean, min, max and number of days with a value
+        of the daily flow or level of the specified station or stations.
+        """
+        return self.get_dly_stats(sids, dtype, 'year', start, end)
+
+    def save_dly_hydat_to_parquet(self, dirname, hydstatus=None,
+                                  province=None, start=None, end=None,
+                                  fetchsize=10000, verbose=True):
+        """
+        Save the daily flow and level data of the stations with the
+        specified status and province, or list of provinces, in a Parquet
+        dataset partitioned by province and station, with a manifest of
+        the partitions. See data_readers.dataset.StationDataset.
+
+        The daily tables are streamed once with iter_dly_hydat, so that only
+        the data of one station at a time are held in memory.
+        """
+        from data_readers.dataset import StationDataset
+
+        return StationDataset(dirname).export(
+            self.iter_dly_hydat(hydstatus, province, fetchsize, start, end),
+            source=os.path.basename(self.DATABASE_FILEPATH), verbose=verbose)
+
+    def save_station_to_hdf5(self, sid, filepath, append=False):
+        """
+        Save the daily streamflow and level data of the specified station
+        with its info in a HDF5 archive. If append is True, only the days
+        more recent than the last day saved in the archive are added.
+        """
+        from data_readers.archive import StationArchive, dlydata_to_frame
+
+        data, attrs = dlydata_to_frame(self.get_dly_hydat_from_id(sid))
+        if append:
+            StationArchive(filepath).append(sid, data, attrs)
+        else:
+            StationArchive(filepath).save(sid, data, attrs)
 
     def save_station_to_csv(self, sid, filepath):
-        station = self.get_dly_hydat_from_id(sid)
+        self.save_dly_hydat_to_csv(self.get_dly_hydat_from_id(sid), filepath)
 
+    def save_dly_hydat_to_csv(self, station, filepath):
+        """
+        Save the station data returned by get_dly_hydat_from_id or
+        iter_dly_hydat to a csv file.
+        """
         # Generate the file header.
-        fc = [['Station Name', station['Name']],
-              ['Station ID', station['ID']],
-              ['Province', station['Province']],
-              ['Latitude (dd)', station['Latitude']],
-              ['Longitude (dd)', station['Longitude']],
-              ['Drainage Area Gross (km2)', station['Drainage Area Gross']],
-              ['Drainage Area Effect (km2)', station['Drainage Area Effect']],
-              [],
-              ['Source', 'https://ec.gc.ca/rhc-wsc'],
-              [],
-              ['Time', 'Year', 'Month', 'Day',
-               'Water level (m)', 'Flow (m3/s)']]
-
-        # Append the dataset.
-        data = np.vstack([station['Time'], station['Year'], station['Month'],
-                          station['Day'], station['Level'], station['Flow']]
-                         ).transpose().tolist()
-        fc.extend(data)
-
-        # Create the destination directory if it doesn't exist.
-        filepath = os.path.abspath(filepath)
-        if not os.path.exists(os.path.dirname(filepath)):
-            os.makedirs(os.path.dirname(filepath))
+        header = [
+            ['Station Name', station['Name']],
+            ['Station ID', station['ID']],
+            ['Province', station['Province']],
+            ['Latitude (dd)', station['Latitude']],
+            ['Longitude (dd)', station['Longitude']],
+            ['Drainage Area Gross (km2)', station['Drainage Area Gross']],
+            ['Drainage Area Effect (km2)', station['Drainage Area Effect']],
+            [],
+            ['Source', 'https://ec.gc.ca/rhc-wsc'],
+            []]
+        columns = ['Time', 'Year', 'Month', 'Day',
+                   'Water level (m)', 'Flow (m3/s)']
 
         # Save the csv.
-        with open(filepath, 'w') as f:
-            writer = csv.writer(f, delimiter=',', lineterminator='\n')
-            writer.writerows(fc)
+        save_series_to_csv(
+            filepath, header, columns,
+            [station['Time'], station['Year'], station['Month'],
+             station['Day'], station['Level'], station['Flow']],
+            fmt=['%0.6f', '%d', '%d', '%d', '%r', '%r'])
 
 
 if __name__ == "__main__":
     reader = HYDAT_Reader()
-    for sid in reader.get_station_ids(hydstatus='A', province='ON'):
-        reader.get_hydstatus_from_sid(sid)
-        reader.get_prov_from_sid(sid)
-        df_dly_hydat = reader.get_dly_hydat_from_id(sid)
-        print(np.min(df_dly_hydat['Year']), np.max(df_dly_hydat['Year']))
-        # reader.save_station_to_csv(sid, 'test_hydat.csv')
+    sids = reader.get_station_ids(hydstatus='A', province='ON')
+    df_dly_hydat = reader.get_dly_hydat_for_ids(sids)
+    print(df_dly_hydat.groupby('ID')['Year'].agg(['min', 'max']))
+    # reader.save_station_to_csv(sids[0], 'test_hydat.csv')
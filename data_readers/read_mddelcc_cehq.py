@@ -5,28 +5,58 @@ Created on Tue Jun 13 14:29:29 2017
 """
 
 # ---- Imports: standard library
-from urllib.request import urlopen
-from urllib.error import HTTPError, URLError
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import io
+import json
 import numpy as np
 import os
-
-# ---- Imports: third parties
-from bs4 import BeautifulSoup
-from xlrd.xldate import xldate_from_date_tuple
+import pandas as pd
+import re
+import sqlite3
+import threading
 
 # ---- Imports: local
 from .base import AbstractReader
-from .utils import find_unique, dms2decdeg, save_content_to_csv
+from .catalog import CEHQ_CATALOG_SCHEMA, build_station_catalog
+from .http_cache import fetch_url, fetch_url_async
+from .utils import (
+    find_unique, dms2decdeg, save_series_to_csv, xldates_from_ymd,
+    run_in_thread_pool, create_async_http_session, slice_dly_series,
+    xldate_window, get_user_cache_dir)
+
+
+CEHQ_URL = "http://www.cehq.gouv.qc.ca/"
 
 
 # ---- Base functions
 def read_html_from_url(url):
     """"Get, read and decode html data from a url in the the CEHQ domain."""
+    import requests
+
     try:
-        html = urlopen(url).read()
-    except (HTTPError, URLError):
+        html = fetch_url(url)
+    except requests.RequestException:
         return None
+    return decode_html_lines(html)
+
+
+async def read_html_from_url_async(url, session=None):
+    """
+    Get, read and decode html data from a url in the the CEHQ domain in the
+    running event loop.
+    """
+    import aiohttp
 
+    try:
+        html = await fetch_url_async(url, session)
+    except aiohttp.ClientError:
+        return None
+    return decode_html_lines(html)
+
+
+def decode_html_lines(html):
+    """Decode html data from the CEHQ domain and split it in lines."""
     try:
         data = html.decode('iso-8859-1').split('\r\n')
         return data
@@ -39,23 +69,60 @@ def scrape_station_ids():
     Get a list of the IDs of all the stations for which data are available
     on the CEHQ website
     """
-    url = ("http://www.cehq.gouv.qc.ca/hydrometrie/"
-           "historique_donnees/default.asp")
+    url = CEHQ_URL + "hydrometrie/historique_donnees/default.asp"
+    return parse_station_ids(fetch_url(url))
+
+
+async def scrape_station_ids_async(session=None):
+    """
+    Get a list of the IDs of all the stations for which data are available
+    on the CEHQ website in the running event loop.
+    """
+    url = CEHQ_URL + "hydrometrie/historique_donnees/default.asp"
+    return parse_station_ids(await fetch_url_async(url, session))
 
-    soup = BeautifulSoup(urlopen(url), 'html.parser')
+
+def parse_station_ids(html):
+    """
+    Get the list of station IDs from the html of the CEHQ historical data
+    page.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
     select = soup.find("select", attrs={"id": "lstStation"})
     options = select.find_all("option")
 
     return [row.text.strip() for row in options if row.text.strip()]
 
 
+def get_datasheet_url(sid):
+    """Return the url of the datasheet of the specified station."""
+    url = CEHQ_URL + "hydrometrie/historique_donnees/"
+    url += "fiche_station.asp?NoStation=%s" % sid
+    return url
+
+
 def scrape_station_datasheet(sid):
     """
     Read the information in the station datasheet.
     """
-    url = "http://www.cehq.gouv.qc.ca/hydrometrie/historique_donnees/"
-    url += "fiche_station.asp?NoStation=%s" % sid
-    html = urlopen(url).read().decode('iso-8859-1')
+    return parse_station_datasheet(sid, fetch_url(get_datasheet_url(sid)))
+
+
+async def scrape_station_datasheet_async(sid, session=None):
+    """
+    Read the information in the station datasheet in the running event loop.
+    """
+    html = await fetch_url_async(get_datasheet_url(sid), session)
+    return parse_station_datasheet(sid, html)
+
+
+def parse_station_datasheet(sid, html):
+    """
+    Get the information of a station from the html of its datasheet.
+    """
+    html = html.decode('iso-8859-1')
 
     FIELDS_KEYS = [('Numéro de la station :', 'ID'),
                    ('Nom de la station :', 'Name'),
@@ -120,33 +187,71 @@ def scrape_daily_series_from_txt(sid, data):
     """
     Structured the daily streamflow and level that were downloaded on the CEHQ
     website into structured arrays and store them in a dataframe.
-    """
-    df = {'Time': [], 'Year': [], 'Month': [], 'Day': [],
-          'Daily values': [], 'Note': []}
 
-    if data is None:
-        return df
+    The lines of daily records are extracted from the whole content of the
+    file at once with a regex and are parsed in bulk with the C parser of
+    pandas, instead of being split and converted one line at a time. The
+    tokens that follow the note on a line are ignored.
+    """
+    regex = re.compile(
+        r'^[ \t]*' + re.escape(sid) +
+        r'[ \t]+\d{4}/\d{1,2}/\d{1,2}(?:[ \t].*)?$', re.MULTILINE)
+    lines = regex.findall('\n'.join(data or []))
+
+    columns = ['ID', 'Year', 'Month', 'Day', 'Daily values', 'Note']
+    if lines:
+        records = pd.read_csv(
+            io.StringIO('\n'.join(lines).replace('/', ' ')),
+            sep=r'\s+', header=None, names=columns,
+            usecols=range(len(columns)),
+            dtype={'ID': str, 'Year': int, 'Month': int, 'Day': int,
+                   'Note': str})
     else:
-        for row in data:
-            row = [s.strip() for s in row.split()]
-            try:
-                if row[0] == sid:
-                    date = [int(s) for s in row[1].split("/")]
-                    df['Time'].append(xldate_from_date_tuple(date, 0))
-                    df['Year'].append(date[0])
-                    df['Month'].append(date[1])
-                    df['Day'].append(date[2])
-                    try:
-                        df['Daily values'].append(float(row[2]))
-                    except IndexError:
-                        df['Daily values'].append(np.nan)
-                    try:
-                        df['Note'].append(row[3])
-                    except IndexError:
-                        df['Note'].append('')
-            except IndexError:
-                pass
-        return df
+        records = pd.DataFrame(
+            {'Year': np.array([], dtype=int), 'Month': np.array([], dtype=int),
+             'Day': np.array([], dtype=int), 'Daily values': [], 'Note': []})
+
+    df = {}
+    df['Year'] = records['Year'].to_numpy(dtype=int)
+    df['Month'] = records['Month'].to_numpy(dtype=int)
+    df['Day'] = records['Day'].to_numpy(dtype=int)
+    df['Daily values'] = pd.to_numeric(
+        records['Daily values'], errors='coerce').to_numpy(dtype=float)
+    df['Note'] = records['Note'].fillna('').to_numpy(dtype=str)
+    df['Time'] = xldates_from_ymd(df['Year'], df['Month'], df['Day'])
+    return df
+
+
+def merge_dly_series(df_Q, df_N):
+    """
+    Merge the daily streamflow and level series returned by
+    scrape_daily_series_from_txt on a common sorted time axis.
+    """
+    df_dly_hydat = {}
+
+    time = np.union1d(df_Q['Time'], df_N['Time'])
+    df_dly_hydat['Time'] = time
+    for field in ['Year', 'Month', 'Day']:
+        df_dly_hydat[field] = np.zeros(len(time)).astype(int)
+    for field in ['Flow', 'Level']:
+        df_dly_hydat[field] = np.zeros(len(time)).astype(float) * np.nan
+
+    for df, field in [(df_Q, 'Flow'), (df_N, 'Level')]:
+        indexes = np.searchsorted(time, df['Time'])
+        for key in ['Year', 'Month', 'Day']:
+            df_dly_hydat[key][indexes] = df[key]
+        df_dly_hydat[field][indexes] = df['Daily values']
+
+    return df_dly_hydat
+
+
+def get_dlydata_urls(sid):
+    """
+    Return the urls of the daily streamflow and level data files of the
+    specified station.
+    """
+    root = CEHQ_URL + "depot/historique_donnees/"
+    return [root+"fichier/%s_Q.txt" % sid, root+"fichier/%s_N.txt" % sid]
 
 
 def scrape_data_from_sid(sid):
@@ -154,45 +259,235 @@ def scrape_data_from_sid(sid):
     This is a meta function that will read and restructured station info and
     daily streamflow and level data for the station with the specified id.
     """
-    df_dly_hydat = {'ID': sid}
+    # The streamflow and level data files are downloaded concurrently.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        data_Q, data_N = executor.map(
+            read_html_from_url, get_dlydata_urls(sid))
+    return structure_data_from_txt(sid, data_Q, data_N)
+
 
-    root = "http://www.cehq.gouv.qc.ca/depot/historique_donnees/"
-    data_Q = read_html_from_url(root+"fichier/%s_Q.txt" % sid)
-    data_N = read_html_from_url(root+"fichier/%s_N.txt" % sid)
+async def scrape_data_from_sid_async(sid, session=None):
+    """
+    Read and restructured station info and daily streamflow and level data
+    for the station with the specified id in the running event loop.
+    """
+    data_Q, data_N = await asyncio.gather(*[
+        read_html_from_url_async(url, session)
+        for url in get_dlydata_urls(sid)])
+    return structure_data_from_txt(sid, data_Q, data_N)
+
+
+def structure_data_from_txt(sid, data_Q, data_N):
+    """
+    Restructured the station info and the daily streamflow and level data
+    from the lines of the data files downloaded from the CEHQ website.
 
+    The daily series are empty if there is no data file for the station.
+    """
+    df_dly_hydat = {'ID': sid}
     if data_N:
         df_dly_hydat.update(scrape_station_data_header(data_N))
     elif data_Q:
         df_dly_hydat.update(scrape_station_data_header(data_Q))
-    else:
-        return {}
 
     df_Q = scrape_daily_series_from_txt(sid, data_Q)
     df_N = scrape_daily_series_from_txt(sid, data_N)
 
     # ---- Combine flow and level datasets
 
-    time = np.hstack([df_Q['Time'], df_N['Time']])
-    time = np.unique(time)
-    time = np.sort(time)
+    df_dly_hydat.update(merge_dly_series(df_Q, df_N))
 
-    df_dly_hydat['Time'] = time
-    for field in ['Year', 'Month', 'Day']:
-        df_dly_hydat[field] = np.zeros(len(time)).astype(int)
-    for field in ['Flow', 'Level']:
-        df_dly_hydat[field] = np.zeros(len(time)).astype(float) * np.nan
+    return df_dly_hydat
 
-    indexes = np.digitize(df_Q['Time'], time, right=True)
-    for key in ['Year', 'Month', 'Day']:
-        df_dly_hydat[key][indexes] = df_Q[key]
-    df_dly_hydat['Flow'][indexes] = df_Q['Daily values']
 
-    indexes = np.digitize(df_N['Time'], time, right=True)
-    for key in ['Year', 'Month', 'Day']:
-        df_dly_hydat[key][indexes] = df_N[key]
-    df_dly_hydat['Level'][indexes] = df_N['Daily values']
+# ---- Local database
 
-    return df_dly_hydat
+
+class CEHQ_Database(object):
+    """
+    A SQLite database where the datasheet and the daily data of each station
+    of the CEHQ are stored as separate records, so that a single station
+    can be added, replaced or loaded without reading or rewriting the
+    data of all the other stations.
+
+    Each thread accesses the database with its own connection, so that the
+    stations can be loaded from a pool of threads.
+    """
+    DLY_FIELDS = ['Time', 'Year', 'Month', 'Day', 'Level', 'Flow']
+    HEADER_FIELDS = ['Latitude', 'Longitude', 'Elevation']
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        dirname = os.path.dirname(os.path.abspath(filepath))
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        self._connections = threading.local()
+        self._connections_list = []
+        self._connections_lock = threading.Lock()
+
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS datasheets"
+            " (ID TEXT PRIMARY KEY, datasheet TEXT)")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS dly_data"
+            " (ID TEXT, Time REAL, Year INTEGER, Month INTEGER,"
+            " Day INTEGER, Level REAL, Flow REAL)")
+        self._con.execute(
+            "CREATE INDEX IF NOT EXISTS dly_data_idx ON dly_data (ID, Time)")
+        # The stations whose daily data were saved, so that the stations
+        # without any daily data are not downloaded again each time.
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS dly_stations (ID TEXT PRIMARY KEY)")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS info"
+            " (key TEXT PRIMARY KEY, value TEXT)")
+        self._con.commit()
+
+    @property
+    def _con(self):
+        """The connection to the database of the calling thread."""
+        connections = self._connections
+        if not hasattr(connections, 'con'):
+            connections.con = sqlite3.connect(
+                self.filepath, check_same_thread=False)
+            with self._connections_lock:
+                # The connections of the threads that ended, like the ones
+                # of a thread pool that was shut down, are closed here.
+                for thread, con in self._connections_list:
+                    if not thread.is_alive():
+                        con.close()
+                self._connections_list = [
+                    (thread, con) for thread, con in self._connections_list
+                    if thread.is_alive()]
+                self._connections_list.append(
+                    (threading.current_thread(), connections.con))
+        return connections.con
+
+    def close(self):
+        """
+        Close the connections to the database of all threads. They are
+        opened again on the next access.
+        """
+        with self._connections_lock:
+            for thread, con in self._connections_list:
+                con.close()
+            self._connections_list = []
+            self._connections = threading.local()
+
+    def station_ids(self):
+        """Return the IDs of the stations saved in the database."""
+        cur = self._con.execute("SELECT ID FROM datasheets ORDER BY ID")
+        return [row[0] for row in cur.fetchall()]
+
+    def has_dlydata(self, sid):
+        """
+        Return whether daily data are saved for the specified station, even
+        if the series of that station are empty.
+        """
+        cur = self._con.execute(
+            "SELECT 1 FROM dly_stations WHERE ID = ?"
+            " UNION ALL SELECT 1 FROM dly_data WHERE ID = ? LIMIT 1",
+            [sid, sid])
+        return cur.fetchone() is not None
+
+    def load_datasheets(self):
+        """Return the datasheets of all stations in a dictionary."""
+        cur = self._con.execute("SELECT ID, datasheet FROM datasheets")
+        return {sid: json.loads(datasheet) for sid, datasheet in cur}
+
+    def load_dlydata(self, sid, start=None, end=None):
+        """
+        Return the daily data of the specified station between the start and
+        end dates inclusively in a dictionary of arrays or None if no daily
+        data are saved for that station.
+        """
+        xlstart, xlend = xldate_window(start, end)
+        where = "ID = ?"
+        params = [sid]
+        if start is not None:
+            where += " AND Time >= ?"
+            params.append(xlstart)
+        if end is not None:
+            where += " AND Time <= ?"
+            params.append(xlend)
+        cur = self._con.execute(
+            "SELECT {} FROM dly_data WHERE {} ORDER BY Time".format(
+                ', '.join(self.DLY_FIELDS), where), params)
+        rows = cur.fetchall()
+        if len(rows) == 0 and not self.has_dlydata(sid):
+            return None
+
+        data = np.array(rows, dtype=float).reshape(
+            len(rows), len(self.DLY_FIELDS))
+        dlydata = {}
+        for i, field in enumerate(self.DLY_FIELDS):
+            dlydata[field] = data[:, i]
+            if field in ['Year', 'Month', 'Day']:
+                dlydata[field] = dlydata[field].astype(int)
+        return dlydata
+
+    def get_info(self, key, default=None):
+        """Return the value saved in the database for the specified key."""
+        cur = self._con.execute("SELECT value FROM info WHERE key = ?", [key])
+        row = cur.fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_info(self, key, value):
+        """
+        Save the value for the specified key in the database or remove the
+        key if value is None.
+        """
+        with self._con:
+            if value is None:
+                self._con.execute("DELETE FROM info WHERE key = ?", [key])
+            else:
+                self._con.execute(
+                    "INSERT OR REPLACE INTO info VALUES (?, ?)",
+                    [key, json.dumps(value)])
+
+    def save_datasheet(self, sid, datasheet):
+        """Add or replace the datasheet of the specified station."""
+        with self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO datasheets VALUES (?, ?)",
+                [sid, json.dumps(datasheet)])
+
+    def save_dlydata(self, sid, dlydata):
+        """
+        Add or replace the daily data of the specified station. The station
+        info that is read from the header of the daily data files is saved
+        in the datasheet of the station.
+        """
+        cur = self._con.execute(
+            "SELECT datasheet FROM datasheets WHERE ID = ?", [sid])
+        row = cur.fetchone()
+        datasheet = {'ID': sid} if row is None else json.loads(row[0])
+        for field in self.HEADER_FIELDS:
+            if field in dlydata:
+                datasheet[field] = dlydata[field]
+
+        rows = zip([sid] * len(dlydata.get('Time', [])),
+                   *[np.asarray(dlydata[field]).tolist() for
+                     field in self.DLY_FIELDS if field in dlydata])
+        with self._con:
+            self._con.execute(
+                "INSERT OR REPLACE INTO datasheets VALUES (?, ?)",
+                [sid, json.dumps(datasheet)])
+            self._con.execute("DELETE FROM dly_data WHERE ID = ?", [sid])
+            self._con.executemany(
+                "INSERT INTO dly_data VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._con.execute(
+                "INSERT OR IGNORE INTO dly_stations VALUES (?)", [sid])
+        return datasheet
+
+    def clear(self):
+        """Remove the data of all the stations from the database."""
+        with self._con:
+            self._con.execute("DELETE FROM datasheets")
+            self._con.execute("DELETE FROM dly_data")
+            self._con.execute("DELETE FROM dly_stations")
+            self._con.execute("DELETE FROM info")
 
 
 # ---- API
@@ -200,8 +495,16 @@ def scrape_data_from_sid(sid):
 
 class MDDELCC_CEHQ_Reader(AbstractReader):
 
-    def __init__(self):
-        super(MDDELCC_CEHQ_Reader, self).__init__()
+    DATABASE_FILEPATH = 'mddelcc_cehq_database.sqlite3'
+    LAZY_ATTRS = ('_db', '_store')
+
+    def __init__(self, workdir=None, lazy=False, offline=False):
+        if not (isinstance(workdir, str) and os.path.exists(workdir)):
+            # The database of the stations is saved in the cache directory
+            # of the user instead of the current directory.
+            workdir = get_user_cache_dir()
+            os.makedirs(workdir, exist_ok=True)
+        super(MDDELCC_CEHQ_Reader, self).__init__(workdir, lazy, offline)
 
     def stations(self, active=None):
         stns = self._db.values()
@@ -217,33 +520,166 @@ class MDDELCC_CEHQ_Reader(AbstractReader):
     def station_ids(self):
         return list(self._db.keys())
 
+    def catalog(self):
+        """
+        Return the typed catalog of the stations, with float coordinates
+        and categorical status and region fields, in a dataframe indexed by
+        station ID. The catalog is built on first use and is built again
+        only after the datasheet of a station changed.
+        """
+        db = self._db
+        if getattr(self, '_catalog', None) is None:
+            self._catalog = build_station_catalog(db, CEHQ_CATALOG_SCHEMA)
+        return self._catalog
+
+    def get_station_coords(self):
+        """
+        Return a dataframe indexed by station ID with the latitude and
+        longitude of the stations. The coordinates are read from the header
+        of the data files, so they are NaN for the stations whose daily data
+        were not fetched yet.
+        """
+        return self.catalog()[['Latitude', 'Longitude']]
+
+    def _set_datasheet(self, sid, datasheet):
+        self._db[sid] = datasheet
+        self._catalog = None
+
     # ---- Load and fetch database
 
     def load_database(self):
-        try:
-            self._db = np.load(self.DATABASE_FILEPATH).item()
-        except FileNotFoundError:
+        """
+        Load the datasheets of all the stations from the local database
+        or fetch them from the CEHQ website if the local database is empty.
+        The daily data of the stations are only loaded when requested.
+
+        When the reader is offline, only the local database is loaded. The
+        last crawl of the website is never resumed automatically, even if it
+        was interrupted or if some datasheets could not be fetched. It must
+        be resumed with fetch_database(resume=True).
+        """
+        self._store = CEHQ_Database(self.DATABASE_FILEPATH)
+        self._db = self._store.load_datasheets()
+        self._catalog = None
+        if self.offline:
+            return
+        if len(self._db) == 0:
             self.fetch_database()
+        elif self._pending_crawl_sids():
+            print("The last crawl of the CEHQ website is incomplete. Call "
+                  "fetch_database(resume=True) to resume it.")
 
-    def fetch_database(self):
+    def fetch_database(self, resume=False, max_workers=8):
         """
         Clear the local database and fetch the datasheets for all available
         station on the CEHQ website. The daily streamflow and level data are
         not downloaded during this operation.
+
+        The datasheets are fetched concurrently by a pool of max_workers
+        threads and each datasheet is saved in the local database as soon
+        as it is fetched. If resume is True, the local database is not
+        cleared and only the datasheets that were not fetched during the
+        last crawl, because it was interrupted or because they could not
+        be fetched, are fetched.
+
+        Return a dictionary with the error raised for each station whose
+        datasheet could not be fetched.
+        """
+        sids = self._pending_crawl_sids() if resume else None
+        if sids is None:
+            sids = scrape_station_ids()
+        sids = self._start_crawl(sids, resume)
+
+        print("Fetching station datasheets from the CEHQ website...")
+        results, failures = run_in_thread_pool(
+            scrape_station_datasheet, sids, max_workers,
+            callback=self._checkpoint_datasheet)
+        self._end_crawl(failures)
+        return failures
+
+    async def fetch_database_async(self, session=None, resume=False):
+        """
+        Fetch the datasheets for all available station on the CEHQ website
+        like fetch_database does, but in the running event loop with at most
+        MAX_CONCURRENCY requests at a time.
+
+        Return a dictionary with the error raised for each station whose
+        datasheet could not be fetched.
         """
-        sids = scrape_station_ids()
-        self._db = {}
+        if session is None:
+            async with create_async_http_session(
+                    self.MAX_CONCURRENCY) as session:
+                return await self.fetch_database_async(session, resume)
+
+        sids = self._pending_crawl_sids() if resume else None
+        if sids is None:
+            sids = await scrape_station_ids_async(session)
+        sids = self._start_crawl(sids, resume)
+
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        failures = {}
+
+        async def fetch(sid):
+            async with semaphore:
+                try:
+                    datasheet = await scrape_station_datasheet_async(
+                        sid, session)
+                except Exception as error:
+                    failures[sid] = error
+                else:
+                    self._checkpoint_datasheet(sid, datasheet)
+
         print("Fetching station datasheets from the CEHQ website...")
-        for i, sid in enumerate(sids):
-            result = scrape_station_datasheet(sid)
-            self._db[result['ID']] = result
-            print("\r%d of %d" % (i, len(sids)), end="          ")
-        print("\nDatasheet fetched for all stations.")
-        np.save(self.DATABASE_FILEPATH, self._db)
+        await asyncio.gather(*[fetch(sid) for sid in sids])
+        self._end_crawl(failures)
+        return failures
+
+    def _pending_crawl_sids(self):
+        """
+        Return the IDs of the stations whose datasheet was not fetched during
+        the last crawl, either because the crawl was interrupted or because
+        the datasheet could not be fetched, or None if the last crawl was
+        completed successfully.
+        """
+        crawl_sids = self._store.get_info('crawl_sids')
+        if crawl_sids is not None:
+            return crawl_sids
+        return self._store.get_info('crawl_failures')
+
+    def _start_crawl(self, sids, resume):
+        """
+        Clear the local database if the crawl is not resumed and return the
+        IDs of the stations whose datasheet remains to be fetched.
+        """
+        if not resume:
+            self._store.clear()
+            self._db = {}
+            self._catalog = None
+        self._store.set_info('crawl_sids', sids)
+        self._store.set_info('crawl_failures', None)
+        return [sid for sid in sids if sid not in self._db]
+
+    def _checkpoint_datasheet(self, sid, datasheet):
+        self._set_datasheet(datasheet['ID'], datasheet)
+        self._store.save_datasheet(datasheet['ID'], datasheet)
+        return datasheet
+
+    def _end_crawl(self, failures):
+        # The pass over the stations is complete, so only the stations whose
+        # datasheet could not be fetched remain to be fetched on resume.
+        self._store.set_info('crawl_sids', None)
+        if failures:
+            self._store.set_info('crawl_failures', sorted(failures))
+            print("Datasheet could not be fetched for %d stations."
+                  % len(failures))
+        else:
+            print("Datasheet fetched for all stations.")
 
     def set_local_database_dir(self, dirname):
         self.DATABASE_FILEPATH = os.path.join(
-                dirname, 'mddelcc_cehq_database.npy')
+                dirname, 'mddelcc_cehq_database.sqlite3')
+        self._store.close()
+        self.load_database()
 
     # ---- Fetch data
 
@@ -251,67 +687,125 @@ class MDDELCC_CEHQ_Reader(AbstractReader):
         """
         Download the daily streamflow and level for the station corresponding
         to the provided id and save the results in the local database.
+
+        Only the record of that station is replaced in the local database.
+        """
+        return self._save_station_dlydata(sid, scrape_data_from_sid(sid))
+
+    async def fetch_station_async(self, sid, session=None):
+        """
+        Download the daily streamflow and level for the station corresponding
+        to the provided id in the running event loop and save the results in
+        the local database.
+        """
+        dlydata = await scrape_data_from_sid_async(sid, session)
+        return self._save_station_dlydata(sid, dlydata)
+
+    def _save_station_dlydata(self, sid, dlydata):
+        self._set_datasheet(sid, self._store.save_dlydata(sid, dlydata))
+
+        station = self._db[sid].copy()
+        station.update(dlydata)
+        return station
+
+    def get_station_data(self, sid, start=None, end=None):
+        """
+        Return the datasheet and the daily streamflow and level data of the
+        station corresponding to the provided id between the start and end
+        dates inclusively. The daily data are loaded from the local database
+        or fetched from the CEHQ website if they are not saved locally yet.
+        """
+        dlydata = self._store.load_dlydata(sid, start, end)
+        if dlydata is None:
+            if self.offline:
+                raise FileNotFoundError(
+                    "The daily data of station {} are not saved in the local "
+                    "database.".format(sid))
+            # The whole series is saved in the local database, but only the
+            # requested window is returned.
+            station = self.fetch_station_dlydata(sid)
+            station.update(slice_dly_series(
+                {key: station[key] for key in CEHQ_Database.DLY_FIELDS},
+                start, end))
+            return station
+
+        station = self._db[sid].copy()
+        station.update(dlydata)
+        return station
+
+    def fetch_all_station_dlydata(self, sids=None, max_workers=8):
+        """
+        Download the daily streamflow and level of all the stations, or of
+        the specified stations only, using a pool of max_workers threads.
+        The data of each station are saved in the local database as soon
+        as they are downloaded.
+
+        Return a dictionary with the error raised for each station whose
+        data could not be downloaded.
         """
-        self._db[sid].update(scrape_data_from_sid(sid))
-        np.save(self.DATABASE_FILEPATH, self._db)
-        return self._db[sid]
+        # We do not keep the daily data of the stations in memory once
+        # they are saved in the local database.
+        def checkpoint(sid, dlydata):
+            self._set_datasheet(sid, self._store.save_dlydata(sid, dlydata))
+
+        sids = self.station_ids() if sids is None else sids
+        results, failures = run_in_thread_pool(
+            scrape_data_from_sid, sids, max_workers, callback=checkpoint)
+        return failures
 
-    # def fetch_all_station_dlydata(self, sid):
+    def save_station_to_hdf5(self, sid, filepath, append=False):
+        """
+        Save the daily streamflow and level data of the specified station
+        with its datasheet in a HDF5 archive. If append is True, only the
+        days more recent than the last day saved in the archive are added.
+        """
+        from .archive import StationArchive, dlydata_to_frame
 
-    def save_station_to_hdf5(self):
-        pass
+        data, attrs = dlydata_to_frame(self.get_station_data(sid))
+        if append:
+            StationArchive(filepath).append(sid, data, attrs)
+        else:
+            StationArchive(filepath).save(sid, data, attrs)
 
     def save_station_to_csv(self, sid, filepath):
         """
         Save data from local database to csv. If the data are not already
         saved in the local database, it is fetched from the mddelcc website.
         """
-        if 'Level' not in list(self._db[sid].keys()):
-            self.fetch_station_dlydata(sid)
-        station = self._db[sid]
+        station = self.get_station_data(sid)
 
         federal_id = (
             '' if station["Federal ID"] == '\x97' else station["Federal ID"])
 
         # Generate the file header.
-        fc = [['Station ID', station['ID']],
-              ['Station Name', station['Name']],
-              ['Description', station['Description']],
-              ['Status', station['Status']],
-              ['Active period', station['Active period']],
-              ['Province', 'Qc'],
-              ['Municipality', station['Municipality']],
-              ['Administrative Region', station['Administrative Region']],
-              ['Stream Name', station['Stream Name']],
-              ['Hydrographic Region', station['Hydrographic Region']],
-              ['Latitude (dd)', station['Latitude']],
-              ['Longitude (dd)', station['Longitude']],
-              ['Elevation (m)', station['Elevation']],
-              ['Drainage Area (km2)', station['Drainage Area']],
-              ['Flow Regime', station['Flow Regime']],
-              [],
-              ['Source', 'https://www.cehq.gouv.qc.ca'],
-              ['Federal ID', federal_id],
-              [],
-              ['Time', 'Year', 'Month', 'Day', 'Level (m)', 'Flow (m3/s)']]
-
-        # Append the dataset.
-        data = np.vstack([station['Time'].astype(str),
-                          station['Year'].astype(str),
-                          station['Month'].astype(str),
-                          station['Day'].astype(str),
-                          station['Level'].astype(str),
-                          station['Flow'].astype(str)]
-                         ).transpose().tolist()
-        fc.extend(data)
-
-        # Create the destination directory if it doesn't exist.
-        filepath = os.path.abspath(filepath)
-        if not os.path.exists(os.path.dirname(filepath)):
-            os.makedirs(os.path.dirname(filepath))
+        header = [
+            ['Station ID', station['ID']],
+            ['Station Name', station['Name']],
+            ['Description', station['Description']],
+            ['Status', station['Status']],
+            ['Active period', station['Active period']],
+            ['Province', 'Qc'],
+            ['Municipality', station['Municipality']],
+            ['Administrative Region', station['Administrative Region']],
+            ['Stream Name', station['Stream Name']],
+            ['Hydrographic Region', station['Hydrographic Region']],
+            ['Latitude (dd)', station['Latitude']],
+            ['Longitude (dd)', station['Longitude']],
+            ['Elevation (m)', station['Elevation']],
+            ['Drainage Area (km2)', station['Drainage Area']],
+            ['Flow Regime', station['Flow Regime']],
+            [],
+            ['Source', 'https://www.cehq.gouv.qc.ca'],
+            ['Federal ID', federal_id],
+            []]
+        columns = ['Time', 'Year', 'Month', 'Day', 'Level (m)', 'Flow (m3/s)']
 
         # Save the csv.
-        save_content_to_csv(filepath, fc)
+        save_series_to_csv(
+            filepath, header, columns,
+            [station['Time'], station['Year'], station['Month'],
+             station['Day'], station['Level'], station['Flow']],
+            fmt=['%0.6f', '%d', '%d', '%d', '%r', '%r'])
 
 
 if __name__ == "__main__":
@@ -5,23 +5,30 @@ Created on Tue Jun 13 14:29:29 2017
 """
 
 # ---- Standard library imports
-from urllib.request import urlopen, urlretrieve
+import asyncio
 from io import BytesIO
+from xml.etree import ElementTree
 import numpy as np
 import os
 import os.path as osp
-import requests
-import datetime
+import re
 
 # ---- Third party imports
-from bs4 import BeautifulSoup, CData
-import xlrd
 import pandas as pd
 
 # ---- Local imports
 from data_readers.base import AbstractReader
+from data_readers.cache import CatalogSnapshot, StationCache
+from data_readers.catalog import RSESQ_CATALOG_SCHEMA, build_station_catalog
+from data_readers.http_cache import fetch_url, fetch_url_async, get_http_cache
 from data_readers.utils import (
-    find_float_from_str, save_content_to_csv, find_all, find_unique)
+    find_float_from_str, save_series_to_csv, find_all, create_http_session,
+    run_in_thread_pool, xldates_to_datetime64, datetime64_to_xldates,
+    xldate_window, bisect_sorted, get_user_cache_dir)
+
+
+MARKERS_URL = ('http://www.mddelcc.gouv.qc.ca/eau/piezo/' +
+               'carte_google/markers-piezo.js')
 
 
 # ---- Base functions
@@ -29,11 +36,15 @@ def get_xml_url():
     """
     Get the url of the last xml data table.
     """
-    mpjs = ('http://www.mddelcc.gouv.qc.ca/eau/piezo/' +
-            'carte_google/markers-piezo.js')
+    return parse_xml_url(fetch_url(MARKERS_URL))
+
 
-    f = urlopen(mpjs)
-    reader = f.read().decode('utf-8', 'replace')
+def parse_xml_url(content):
+    """
+    Get the url of the last xml data table from the content of the
+    javascript file that places the markers on the map.
+    """
+    reader = content.decode('utf-8', 'replace')
 
     txt = "MYMAP.placePuits('"
     n = len("MYMAP.placePuits('")
@@ -45,86 +56,141 @@ def get_xml_url():
     return url
 
 
+# Labels of the fields that are extracted from the description of each
+# station in the xml data table, along with the key they are stored under.
+XML_FIELDS = {'Station': 'ID',
+              'Longitude': 'Longitude',
+              'Latitude': 'Latitude',
+              'Nappe': 'Nappe',
+              'Influencé': 'Influenced',
+              'Dernière lecture': 'Last',
+              'Données': 'url data',
+              'Schéma': 'url drilllog',
+              'Graphique': 'url graph'}
+XML_FIELDS_REGEX = re.compile(
+    r'(Station|Longitude|Latitude|Nappe|Influencé|Dernière lecture) ='
+    r'(.*?)<br/>'
+    r'|<a href="([^"]*)">(Données|Schéma|Graphique)')
+
+
+def parse_xml_description(cdi):
+    """
+    Extract the info of a station from its description block in the xml
+    data table in a single pass.
+    """
+    fields = {}
+    for label, value, url, url_label in XML_FIELDS_REGEX.findall(cdi):
+        key = XML_FIELDS[label or url_label]
+        if key not in fields:
+            fields[key] = (value or url).strip()
+    return fields
+
+
+def parse_xml_datatable(source):
+    """
+    Parse the xml datafile from the specified filename or file object and
+    return a database with the well info.
+
+    The file is parsed incrementally, so that only one placemark is held in
+    memory at a time.
+    """
+    db = {}
+    for event, elem in ElementTree.iterparse(source, events=('end',)):
+        if elem.tag.rsplit('}', 1)[-1].lower() != 'placemark':
+            continue
+
+        name = None
+        desc = ''
+        for child in elem:
+            tag = child.tag.rsplit('}', 1)[-1].lower()
+            if tag == 'name':
+                name = child.text
+            elif tag == 'description':
+                desc = child.text or ''
+        for cdi in desc.split('<br/>--<br/>'):
+            fields = parse_xml_description(cdi)
+            pid = fields.get('ID')
+
+            db[pid] = {'ID': pid, 'Name': name}
+            for key in ['Longitude', 'Latitude', 'Nappe', 'Influenced',
+                        'Last', 'url data', 'url drilllog', 'url graph']:
+                db[pid][key] = fields.get(key)
+        elem.clear()
+    return db
+
+
 def read_xml_datatable(url):
     """
     Read the xml datafile and return a database with the well info
     """
-    xml = urlopen(url)
+    xml = BytesIO(fetch_url(url))
 
     # To save the xlm content to file.
     # xml_filename = osp.join(osp.dirname(__file__), 'rsesq.xml')
     # with open(xml_filename, 'wb') as xmlfile:
     #     xmlfile.write(xml.read())
 
-    soup = BeautifulSoup(xml, 'html.parser')
-    places = soup.find_all('placemark')
+    return parse_xml_datatable(xml)
 
-    db = {}
-    for place in places:
-        desc = place.find('description')
-        name = place.find('name').text
-        for cd in desc.findAll(text=True):
-            if isinstance(cd, CData):
-                for i, cdi in enumerate(cd.split('<br/>--<br/>')):
-                    pid = find_unique('Station =(.*?)<br/>', cdi)
-
-                    db[pid] = {}
-                    db[pid]['ID'] = pid
-                    db[pid]['Name'] = name
-                    db[pid]['Longitude'] = find_unique(
-                        'Longitude =(.*?)<br/>', cdi)
-                    db[pid]['Latitude'] = find_unique(
-                        'Latitude =(.*?)<br/>', cdi)
-                    db[pid]['Nappe'] = find_unique(
-                        'Nappe =(.*?)<br/>', cdi)
-                    db[pid]['Influenced'] = find_unique(
-                        'Influencé =(.*?)<br/>', cdi)
-                    try:
-                        db[pid]['Last'] = find_unique(
-                            'Dernière lecture =(.*?)<br/>', cdi)
-                    except IndexError:
-                        db[pid]['Last'] = None
-
-                    # Get datafiles url.
-                    keys = ['url data', 'url drilllog', 'url graph']
-                    ss = ['<br/><a href="(.*?)">Données',
-                          'Données</a><br/><a href="(.*?)">Schéma',
-                          'Schéma</a><br/><a href="(.*?)">Graphique']
-                    for key, s in zip(keys, ss):
-                        try:
-                            db[pid][key] = find_unique(s, cdi)
-                        except IndexError:
-                            db[pid][key] = None
-    return db
 
-
-def get_wldata_from_xls(url_or_fpath):
+def get_wldata_from_xls(url_or_fpath, session=None, start=None, end=None,
+                        revalidate=False):
     """
     Get elevation, time, water level and water temperature data from a xls
     file downloaded from http://www.mddelcc.gouv.qc.ca/eau/piezo/.
+
+    A requests session can be provided to reuse its pooled connections when
+    downloading the file through the shared HTTP cache. If revalidate is
+    True, the copy of the file in the HTTP cache is revalidated with the
+    server. If start or end are provided, only the readings between these
+    dates inclusively are read.
     """
     if url_or_fpath.startswith('http://'):
-        # Save the content of the file in a memory buffer.
-        response = requests.get(url_or_fpath)
-        bytes_io = BytesIO(response.content)
-
-        # Read the content of the file and extract the data.
-        with xlrd.open_workbook(file_contents=bytes_io.read()) as wb:
-            ws = wb.sheet_by_index(0)
+        content = fetch_url(url_or_fpath, session, revalidate)
     else:
-        # Read the content of the file and extract the data.
-        with xlrd.open_workbook(url_or_fpath) as wb:
-            ws = wb.sheet_by_index(0)
+        with open(url_or_fpath, 'rb') as f:
+            content = f.read()
+    return parse_wldata_xls(content, start, end)
+
+
+def parse_wldata_xls(content, start=None, end=None):
+    """
+    Get elevation, time, water level and water temperature data from the
+    content of a xls file downloaded from the mddelcc website.
+
+    If start or end are provided, only the rows of the readings between these
+    dates inclusively are converted. Since the readings are sorted by date,
+    these rows are found with a binary search on the date column.
+    """
+    import xlrd
+
+    with xlrd.open_workbook(file_contents=content) as wb:
+        ws = wb.sheet_by_index(0)
+
+    def row_xldate(rowx):
+        try:
+            return float(ws.cell_value(rowx, 0))
+        except (TypeError, ValueError):
+            # Rows that do not contain a date are at the end of the sheet.
+            return np.inf
 
     row_idx = ws.col_values(0).index('Date du relevé') + 1
+    xlstart, xlend = xldate_window(start, end)
+    rows = range(row_idx, ws.nrows)
+    start_rowx = (row_idx if start is None else
+                  row_idx + bisect_sorted(rows, xlstart, row_xldate, 'left'))
+    end_rowx = (ws.nrows if end is None else
+                row_idx + bisect_sorted(rows, xlend, row_xldate, 'right'))
+    end_rowx = max(start_rowx, end_rowx)
+
     stn_data = pd.DataFrame(
         [],
-        index=[datetime.datetime(*xlrd.xldate_as_tuple(t, 0)) for t in
-               ws.col_values(0, start_rowx=row_idx)])
+        index=xldates_to_datetime64(pd.to_numeric(
+            ws.col_values(0, start_rowx, end_rowx), errors='coerce')))
     stn_data['Water Level (masl)'] = pd.to_numeric(
-        ws.col_values(1, start_rowx=row_idx), errors='coerce')
+        ws.col_values(1, start_rowx, end_rowx), errors='coerce')
     stn_data['Temperature (degC)'] = pd.to_numeric(
-        ws.col_values(2, start_rowx=row_idx), errors='coerce')
+        ws.col_values(2, start_rowx, end_rowx), errors='coerce')
 
     stn_elevation = find_float_from_str(ws.cell_value(4, 2))
 
@@ -133,10 +199,19 @@ def get_wldata_from_xls(url_or_fpath):
 
 class MDDELCC_RSESQ_Reader(AbstractReader):
     COLUMNS = ['ID', 'Name', 'Lat_ddeg', 'Lon_ddeg', 'Nappe', 'Influenced']
-
-    def __init__(self, workdir=None):
-        self._stations = pd.DataFrame(columns=self.COLUMNS)
-        super().__init__(workdir)
+    DATABASE_FILEPATH = 'mddelcc_rsesq_catalog.json'
+    CACHE_DIRPATH = 'mddelcc_rsesq_cache'
+    LAZY_ATTRS = ('_db', '_stations', '_catalog')
+
+    def __init__(self, workdir=None, lazy=False, offline=False):
+        if not (isinstance(workdir, str) and osp.exists(workdir)):
+            # The catalog and the data of the stations are saved in the
+            # cache directory of the user instead of the current directory.
+            workdir = get_user_cache_dir()
+            os.makedirs(workdir, exist_ok=True)
+        self.CACHE_DIRPATH = osp.join(workdir, self.CACHE_DIRPATH)
+        self._cache = StationCache(self.CACHE_DIRPATH)
+        super().__init__(workdir, lazy, offline)
 
     def __getitem__(self, key):
         return self._db[key]
@@ -145,59 +220,292 @@ class MDDELCC_RSESQ_Reader(AbstractReader):
     def stations(self):
         return self._stations
 
+    def catalog(self):
+        """
+        Return the typed catalog of the stations, with float coordinates
+        and categorical aquifer fields, in a dataframe indexed by station ID.
+        """
+        return self._catalog
+
     def station_ids(self):
         return self._stations.index.values
 
-    def get_station_data(self, stn_id):
+    def get_station_coords(self):
+        return self._catalog[['Latitude', 'Longitude']]
+
+    def get_station_data(self, stn_id, force=False, session=None, start=None,
+                         end=None):
         """
         Return a pandas dataframe with the temperature and water level time
-        series corresponding to the specified station indexed by date.
+        series corresponding to the specified station indexed by date,
+        between the start and end dates inclusively.
+
+        The data are read from the local cache unless they are not available
+        there, they are stale or force is True. If force is True, the data
+        file is also revalidated with the server.
         """
-        stn_elevation, stn_data = self.fetch_station_wldata(stn_id)
+        stn_elevation, stn_data = self.fetch_station_wldata(
+            stn_id, force, session, start, end)
         return stn_data
 
     # ---- Load and fetch data
     def load_database(self):
-        self.fetch_database()
-
-        data = []
-        for stn_id in sorted(list(self._db.keys())):
-            data.append([
-                stn_id, self._db[stn_id]['Name'],
-                float(self._db[stn_id]['Latitude']),
-                float(self._db[stn_id]['Longitude']),
-                self._db[stn_id]['Nappe'],
-                self._db[stn_id]['Influenced']])
-
-        self._stations = pd.DataFrame(data, columns=self.COLUMNS)
-        self._stations.set_index([self.COLUMNS[0]], drop=False, inplace=True)
+        """
+        Fetch the station table from the mddelcc website or load it from the
+        local snapshot of the catalog when the reader is offline.
+        """
+        if self.offline:
+            self._set_database(CatalogSnapshot(self.DATABASE_FILEPATH).load())
+        else:
+            self.fetch_database()
 
     def fetch_database(self):
+        """
+        Fetch the station table from the mddelcc website and save it in the
+        local snapshot of the catalog.
+        """
         url = get_xml_url()
-        self._db = read_xml_datatable(url)
+        self._set_database(read_xml_datatable(url))
+        CatalogSnapshot(self.DATABASE_FILEPATH).save(self._db, url)
 
-    def fetch_station_wldata(self, sid):
+    async def fetch_database_async(self, session=None):
+        """
+        Fetch the station table from the mddelcc website in the running
+        event loop.
+        """
+        url = parse_xml_url(await fetch_url_async(MARKERS_URL, session))
+        content = await fetch_url_async(url, session)
+        self._set_database(parse_xml_datatable(BytesIO(content)))
+        CatalogSnapshot(self.DATABASE_FILEPATH).save(self._db, url)
+
+    def _set_database(self, db):
+        self._db = db
+        self._catalog = build_station_catalog(db, RSESQ_CATALOG_SCHEMA)
+        self._stations = self._catalog.rename(columns={
+            'Latitude': 'Lat_ddeg', 'Longitude': 'Lon_ddeg'})[self.COLUMNS]
+
+    def fetch_station_wldata(self, sid, force=False, session=None,
+                             start=None, end=None):
+        """
+        Return the elevation and the water level and temperature data of the
+        specified station between the start and end dates inclusively.
+
+        The data are loaded from the local cache if the cached copy was read
+        from the same url and has the same last reading date as the one
+        listed in the station table. Otherwise, the data are downloaded from
+        the mddelcc website and saved in the cache. When the reader is
+        offline, the cached data are always used. Only the readings of the
+        time window are read from the cache.
+        """
         url = self._db[sid]['url data']
-        if url not in [None, '', b'']:
-            return get_wldata_from_xls(url)
-        else:
+        if url in [None, '', b'']:
             return None, None
 
+        if self.offline:
+            cached = self._cache.load(sid, start=start, end=end)
+            if cached is None:
+                raise FileNotFoundError(
+                    "The data of station {} are not cached locally."
+                    .format(sid))
+            return cached
+
+        version = self._db[sid].get('Last')
+        if not force:
+            cached = self._cache.load(sid, url, version or '', start, end)
+            if cached is not None:
+                return cached
+
+        # The whole series is saved in the cache, but only the requested
+        # window is returned.
+        stn_elevation, stn_data = get_wldata_from_xls(
+            url, session, revalidate=force)
+        self._cache.save(sid, url, version, stn_elevation, stn_data)
+        if start is not None or end is not None:
+            stn_data = stn_data.loc[start:end]
+        return stn_elevation, stn_data
+
+    async def fetch_station_async(self, sid, session=None, force=False):
+        """
+        Return a pandas dataframe with the temperature and water level time
+        series of the specified station, downloading it in the running
+        event loop if it is not cached or if it is stale.
+
+        The cache is read and written, and the data file is parsed, in the
+        default executor, so that the event loop is not blocked. When the
+        reader is offline, the cached data are always used.
+        """
+        url = self._db[sid]['url data']
+        if url in [None, '', b'']:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if self.offline:
+            stn_elevation, stn_data = await loop.run_in_executor(
+                None, self.fetch_station_wldata, sid)
+            return stn_data
+
+        version = self._db[sid].get('Last')
+        if not force:
+            cached = await loop.run_in_executor(
+                None, self._cache.load, sid, url, version or '')
+            if cached is not None:
+                return cached[1]
+
+        def save_wldata(content):
+            stn_elevation, stn_data = parse_wldata_xls(content)
+            self._cache.save(sid, url, version, stn_elevation, stn_data)
+            return stn_data
+
+        content = await fetch_url_async(url, session, revalidate=force)
+        return await loop.run_in_executor(None, save_wldata, content)
+
+    def fetch_all_stations_wldata(self, sids=None, max_workers=8,
+                                  force=False, verbose=True):
+        """
+        Fetch the water level and temperature data of all the stations, or
+        of the specified stations only, using a pool of threads that share
+        a single HTTP session.
+
+        Return a dictionary with the data of each station that was fetched
+        successfully and a dictionary with the error raised for each station
+        that could not be fetched.
+        """
+        sids = self.station_ids() if sids is None else sids
+        with create_http_session(max_workers) as session:
+            return run_in_thread_pool(
+                lambda sid: self.get_station_data(sid, force, session),
+                sids, max_workers, verbose)
+
+    # ---- Incremental sync
+    def plan_sync(self, sids=None):
+        """
+        Compare the date of the last reading of the stations listed in the
+        station table with the data saved in the local cache and return the
+        plan of the downloads needed to bring the cache up to date in a
+        dataframe indexed by station ID.
+
+        The action of each station is 'download' if it is not cached yet,
+        'append' if the station table lists readings more recent than the
+        cached ones or 'skip' otherwise. Stations without a data file are
+        skipped.
+        """
+        sids = self.station_ids() if sids is None else sids
+        plan = []
+        for sid in sids:
+            url = self._db[sid]['url data']
+            version = self._db[sid].get('Last') or ''
+            last = pd.to_datetime(version or None, errors='coerce')
+            attrs = self._cache.get_attrs(sid)
+            stored = None if attrs is None else self._cache.last_time(sid)
+
+            if url in [None, '', b'']:
+                action = 'skip'
+            elif attrs is None or attrs['url'] != url or stored is None:
+                action = 'download'
+            elif attrs['version'] == version:
+                action = 'skip'
+            elif not pd.isnull(last) and stored.normalize() > last:
+                # The catalog date is a day without a time, so the cached
+                # readings are complete only if they go past that day.
+                action = 'skip'
+            else:
+                action = 'append'
+            plan.append([sid, action, last, stored])
+        plan = pd.DataFrame(
+            plan, columns=['ID', 'Action', 'Last', 'Stored'])
+        return plan.set_index('ID', drop=False)
+
+    def _sync_station(self, sid, action, stored, session=None):
+        url = self._db[sid]['url data']
+        version = self._db[sid].get('Last')
+
+        # The data file is revalidated with the server, since the copy saved
+        # in the HTTP cache can predate the readings listed in the station
+        # table. Only the rows of the readings that are more recent than the
+        # last cached reading are converted and merged into the cache.
+        if action == 'download':
+            stored = None
+        stn_elevation, stn_data = get_wldata_from_xls(
+            url, session, start=stored, revalidate=True)
+
+        # The date of the last reading listed in the station table is saved
+        # as the version of the cached data only once the cached readings
+        # reach it, so that a station whose data file is not up to date yet
+        # on the server is synced again on the next sync.
+        last = pd.to_datetime(version or None, errors='coerce')
+        latest = stn_data.index.max() if len(stn_data) else pd.NaT
+        if stored is not None and not (latest >= stored):
+            latest = stored
+        if not (pd.isnull(last) or latest.normalize() >= last):
+            version = None
+
+        if action == 'download':
+            self._cache.save(sid, url, version, stn_elevation, stn_data)
+            return len(stn_data)
+        return self._cache.append(
+            sid, url, version, stn_elevation, stn_data)
+
+    def sync(self, sids=None, max_workers=8, verbose=True):
+        """
+        Bring the local cache up to date with the station table by
+        downloading only the data files of the stations with new readings
+        and merging only these new readings into the cache. See plan_sync.
+        A station is marked as up to date only once its cached readings
+        reach the date of the last reading listed in the station table.
+
+        Return a dictionary with the number of readings added for each
+        station that was synced successfully and a dictionary with the error
+        raised for each station that could not be synced.
+        """
+        plan = self.plan_sync(sids)
+        plan = plan[plan['Action'] != 'skip']
+        if verbose:
+            print("%d stations to download and %d to update" % (
+                  (plan['Action'] == 'download').sum(),
+                  (plan['Action'] == 'append').sum()))
+        with create_http_session(max_workers) as session:
+            return run_in_thread_pool(
+                lambda sid: self._sync_station(
+                    sid, plan.at[sid, 'Action'], plan.at[sid, 'Stored'],
+                    session),
+                plan.index, max_workers, verbose)
+
     # ---- Download files
-    def dwnld_raw_xls_datafile(self, station_id, filepath):
+    def dwnld_raw_xls_datafile(self, station_id, filepath, session=None):
         """
         Download the water level data file and save it to disk in the
         specified directory.
         """
         # Create the destination directory if it doesn't exist.
         filepath = os.path.abspath(filepath)
-        if not os.path.exists(os.path.dirname(filepath)):
-            os.makedirs(os.path.dirname(filepath))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
         # Download the xls file.
         station = self._db[station_id]
         if station['url data'] not in [None, '', b'']:
-            urlretrieve(station['url data'], filepath)
+            get_http_cache().retrieve(station['url data'], filepath, session)
+
+    def dwnld_all_raw_xls_datafiles(self, dirname, sids=None, max_workers=8,
+                                    verbose=True):
+        """
+        Download the water level data files of all the stations, or of the
+        specified stations only, in the specified directory using a pool of
+        threads that share a single HTTP session.
+
+        Return a dictionary with the path of the file downloaded for each
+        station and a dictionary with the error raised for each station
+        that could not be downloaded.
+        """
+        def dwnld_xls(sid):
+            if self._db[sid]['url data'] in [None, '', b'']:
+                return None
+            filepath = osp.join(dirname, '{}.xls'.format(sid))
+            self.dwnld_raw_xls_datafile(sid, filepath, session)
+            return filepath
+
+        sids = self.station_ids() if sids is None else sids
+        with create_http_session(max_workers) as session:
+            return run_in_thread_pool(dwnld_xls, sids, max_workers, verbose)
 
     def dwnld_piezo_drilllog(self, station_id, directory):
         """
@@ -211,7 +519,8 @@ class MDDELCC_RSESQ_Reader(AbstractReader):
         station = self._db[station_id]
         if station['url drilllog'] not in [None, '', b'']:
             filename = 'drillog_{}.pdf'.format(station_id)
-            urlretrieve(station['url drilllog'], osp.join(directory, filename))
+            get_http_cache().retrieve(
+                station['url drilllog'], osp.join(directory, filename))
 
     def dwnld_piezo_graph(self, station_id, directory):
         """
@@ -225,74 +534,81 @@ class MDDELCC_RSESQ_Reader(AbstractReader):
         station = self._db[station_id]
         if station['url graph'] not in [None, '', b'']:
             filename = 'graphique_{}.pdf'.format(station_id)
-            urlretrieve(station['url graph'], osp.join(directory, filename))
+            get_http_cache().retrieve(
+                station['url graph'], osp.join(directory, filename))
 
     # ---- Save to file
-    def save_station_to_hdf5(self, station_id, filepath):
-        pass
+    def save_station_to_hdf5(self, sid, filepath, append=False):
+        """
+        Save the water level and temperature data of the specified station
+        with its info in a HDF5 archive. If append is True, only the readings
+        more recent than the last reading saved in the archive are added.
+        """
+        from data_readers.archive import StationArchive
 
-    def save_station_to_csv(self, sid, filepath):
-        if self._db[sid]['url data'] in [None, '', b'']:
+        stn_elevation, stn_data = self.fetch_station_wldata(sid)
+        if stn_data is None:
             return
 
-        # If the data are not already saved in the local database, fetch it
-        # from the mddelcc website.
-        if 'Water Level' not in list(self._db[sid].keys()):
-            self.fetch_station_wldata(sid)
+        attrs = self._db[sid].copy()
+        attrs['Elevation'] = stn_elevation
+        if append:
+            StationArchive(filepath).append(sid, stn_data, attrs)
+        else:
+            StationArchive(filepath).save(sid, stn_data, attrs)
+
+    def save_station_to_csv(self, sid, filepath):
+        """
+        Save the water level and temperature data of the specified station
+        in a csv file. The data are read from the local cache or fetched from
+        the mddelcc website if they are not cached or if they are stale.
+        """
+        stn_elevation, stn_data = self.fetch_station_wldata(sid)
+        if stn_data is None:
+            return
 
         stn = self._db[sid]
         # Generate the file header.
-        fc = [['Well Name', stn['Name']],
-              ['Well ID', stn['ID']],
-              ['Latitude', stn['Latitude']],
-              ['Longitude', stn['Longitude']],
-              ['Elevation', stn['Elevation']],
-              ['Nappe', stn['Nappe']],
-              ['Influenced', stn['Influenced']],
-              [],
-              ['Source', 'http://www.mddelcc.gouv.qc.ca/eau/piezo/'],
-              [],
-              ['Time', 'Year', 'Month', 'Day', 'Water level (masl)',
-               'Water temperature (degC)']]
-
-        # Append the dataset.
-        data = np.vstack([stn['Time'].astype(str), stn['Year'].astype(str),
-                          stn['Month'].astype(str), stn['Day'].astype(str),
-                          stn['Water Level'].astype(str),
-                          stn['Temperature'].astype(str)]
-                         ).transpose().tolist()
-        fc.extend(data)
-
-        # Create the destination directory if it doesn't exist.
-        filepath = os.path.abspath(filepath)
-        if not os.path.exists(os.path.dirname(filepath)):
-            os.makedirs(os.path.dirname(filepath))
+        header = [
+            ['Well Name', stn['Name']],
+            ['Well ID', stn['ID']],
+            ['Latitude', stn['Latitude']],
+            ['Longitude', stn['Longitude']],
+            ['Elevation', stn_elevation],
+            ['Nappe', stn['Nappe']],
+            ['Influenced', stn['Influenced']],
+            [],
+            ['Source', 'http://www.mddelcc.gouv.qc.ca/eau/piezo/'],
+            []]
+        columns = ['Time', 'Year', 'Month', 'Day', 'Water level (masl)',
+                   'Water temperature (degC)']
 
         # Save the csv.
-        save_content_to_csv(filepath, fc)
+        save_series_to_csv(
+            filepath, header, columns,
+            [datetime64_to_xldates(stn_data.index.values),
+             stn_data.index.year.values, stn_data.index.month.values,
+             stn_data.index.day.values,
+             stn_data['Water Level (masl)'].values,
+             stn_data['Temperature (degC)'].values],
+            fmt=['%0.6f', '%d', '%d', '%d', '%r', '%r'])
 
     def save_station_table_to_csv(self, filepath):
         """
         Save the information for all the wells of the RSESQ in a csv file.
         """
-        fcontent = [['#', 'Well_ID', 'Well_Name', 'Latitude_ddeg',
-                     'Longitude_ddeg', 'Nappe', 'Influenced']]
-        for i, stn_id in enumerate(sorted(self.station_ids())):
-            fcontent.append([
-                str(i), stn_id,
-                self._db[stn_id]['Name'],
-                self._db[stn_id]['Latitude'],
-                self._db[stn_id]['Longitude'],
-                self._db[stn_id]['Nappe'],
-                self._db[stn_id]['Influenced']])
-
-        # Create the destination directory if it doesn't exist.
-        filepath = osp.abspath(filepath)
-        if not osp.exists(osp.dirname(filepath)):
-            os.makedirs(osp.dirname(filepath))
+        columns = ['#', 'Well_ID', 'Well_Name', 'Latitude_ddeg',
+                   'Longitude_ddeg', 'Nappe', 'Influenced']
+        stations = self._stations.sort_index()
 
         # Save the csv.
-        save_content_to_csv(filepath, fcontent)
+        save_series_to_csv(
+            filepath, [], columns,
+            [np.arange(len(stations)), stations['ID'].values,
+             stations['Name'].values, stations['Lat_ddeg'].values,
+             stations['Lon_ddeg'].values, stations['Nappe'].values,
+             stations['Influenced'].values],
+            fmt=['%d', '%s', '%s', '%r', '%r', '%s', '%s'])
 
 
 if __name__ == "__main__":
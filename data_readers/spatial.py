@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:04:04 2026
+@author: jsgosselin
+"""
+
+# ---- Standard library imports
+import hashlib
+import os
+import os.path as osp
+import pickle
+
+# ---- Third party imports
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+EARTH_RADIUS = 6373  # The Earth radius in km
+
+
+def calc_dist_from_coord(lat1, lon1, lat2, lon2):
+    """
+    Compute the  horizontal distance in km between a location given in
+    decimal degrees and a set of locations also given in decimal degrees.
+    """
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+
+    return EARTH_RADIUS * c
+
+
+def latlon_to_xyz(lat, lon):
+    """
+    Convert locations given in decimal degrees to cartesian coordinates on
+    the unit sphere.
+    """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon),
+                            np.cos(lat) * np.sin(lon),
+                            np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """
+    Convert straight line distances on the unit sphere to great circle
+    distances in km.
+    """
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(dist):
+    """
+    Convert great circle distances in km to straight line distances on the
+    unit sphere.
+    """
+    return 2 * np.sin(np.minimum(dist, np.pi * EARTH_RADIUS) /
+                      (2 * EARTH_RADIUS))
+
+
+def catalogs_signature(catalogs, latcol='Latitude', loncol='Longitude'):
+    """
+    Return a hash of the IDs and coordinates of the stations of the
+    catalogs, which is used to tell if a persisted index is stale.
+    """
+    sha = hashlib.sha1()
+    for network in sorted(catalogs):
+        catalog = catalogs[network]
+        sha.update(str(network).encode('utf-8'))
+        sha.update('\n'.join(map(str, catalog.index)).encode('utf-8'))
+        sha.update(np.asarray(catalog[latcol], dtype=float).tobytes())
+        sha.update(np.asarray(catalog[loncol], dtype=float).tobytes())
+    return sha.hexdigest()
+
+
+class SpatialIndex(object):
+    """
+    A spatial index over the stations of one or more networks.
+
+    The catalogs are given as a dictionary of dataframes indexed by station
+    ID, keyed by network name. The stations of each network are indexed in
+    a KD-tree built on their coordinates on the unit sphere, so that the
+    nearest stations of a batch of locations can be found without computing
+    the distance to every station.
+    """
+
+    def __init__(self, catalogs, latcol='Latitude', loncol='Longitude'):
+        self.signature = catalogs_signature(catalogs, latcol, loncol)
+        self._ids = {}
+        self._trees = {}
+        for network, catalog in catalogs.items():
+            lat = np.asarray(catalog[latcol], dtype=float)
+            lon = np.asarray(catalog[loncol], dtype=float)
+            valid = ~(np.isnan(lat) | np.isnan(lon))
+            self._ids[network] = np.asarray(catalog.index)[valid]
+            self._trees[network] = cKDTree(
+                latlon_to_xyz(lat[valid], lon[valid]))
+
+    def networks(self):
+        """Return the names of the networks in the index."""
+        return list(self._trees.keys())
+
+    def station_ids(self, network):
+        """Return the IDs of the stations of a network in the index."""
+        return self._ids[network]
+
+    def query(self, network, lat, lon, k=1):
+        """
+        Find the k nearest stations of the specified network for each of
+        the locations given in decimal degrees.
+
+        Return an array with the distances in km and an array with the IDs
+        of the nearest stations, both of shape (n, k) and sorted by distance.
+        When the network has less than k stations, the missing neighbours
+        have an infinite distance and a None ID.
+        """
+        xyz = latlon_to_xyz(np.atleast_1d(lat), np.atleast_1d(lon))
+        tree = self._trees[network]
+        chord, idx = tree.query(xyz, k=k)
+        chord = np.asarray(chord, dtype=float).reshape(len(xyz), k)
+        idx = np.asarray(idx).reshape(len(xyz), k)
+
+        missing = idx >= tree.n
+        ids = np.empty(idx.shape, dtype=object)
+        ids[~missing] = self._ids[network][idx[~missing]]
+        ids[missing] = None
+
+        dist = chord_to_km(chord)
+        dist[missing] = np.inf
+        return dist, ids
+
+    def query_radius(self, network, lat, lon, radius):
+        """
+        Find the stations of the specified network that are within radius
+        km of each of the locations given in decimal degrees.
+
+        Return a list with, for each location, an array with the distances
+        in km and an array with the IDs of the stations found, both sorted
+        by distance.
+        """
+        xyz = latlon_to_xyz(np.atleast_1d(lat), np.atleast_1d(lon))
+        tree = self._trees[network]
+        results = []
+        for point, idx in zip(
+                xyz, tree.query_ball_point(xyz, km_to_chord(radius))):
+            idx = np.asarray(idx, dtype=int)
+            dist = chord_to_km(
+                np.sqrt(np.sum((tree.data[idx] - point)**2, axis=1)))
+            order = np.argsort(dist, kind='stable')
+            results.append((dist[order], self._ids[network][idx[order]]))
+        return results
+
+    # ---- Persistence
+    def save(self, filepath):
+        """Save the index to the specified file."""
+        os.makedirs(osp.dirname(osp.abspath(filepath)), exist_ok=True)
+        tmppath = filepath + '.tmp'
+        with open(tmppath, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, filepath)
+
+    @staticmethod
+    def load(filepath):
+        """Load an index that was saved to the specified file."""
+        with open(filepath, 'rb') as f:
+            return pickle.load(f)
+
+
+def load_spatial_index(filepath, catalogs, latcol='Latitude',
+                       loncol='Longitude'):
+    """
+    Load the spatial index of the catalogs that was saved to the specified
+    file, or build it and save it to that file if it does not exist or if
+    the stations of the catalogs changed since it was built.
+    """
+    if osp.exists(filepath):
+        try:
+            index = SpatialIndex.load(filepath)
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            index = None
+        if (index is not None and index.signature ==
+                catalogs_signature(catalogs, latcol, loncol)):
+            return index
+
+    index = SpatialIndex(catalogs, latcol, loncol)
+    index.save(filepath)
+    return index
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:32:33 2026
+@author: jsgosselin
+
+Fixtures shared by the tests of the data readers, which serve the content
+of the websites of the networks from a local HTTP server, either in a
+thread or in the running event loop.
+"""
+
+# ---- Standard library imports
+from collections import Counter
+import hashlib
+import http.server
+import os.path as osp
+import threading
+
+# ---- Third party imports
+import pytest
+
+# ---- Local imports
+import data_readers.http_cache as http_cache
+
+
+DATADIR = osp.join(osp.dirname(__file__), 'data')
+
+
+def read_test_data(filename):
+    """Return the content of the specified file of the test data."""
+    with open(osp.join(DATADIR, filename), 'rb') as f:
+        return f.read()
+
+
+def get_etag(content):
+    """Return the ETag under which the local servers serve content."""
+    return '"{}"'.format(hashlib.sha1(content).hexdigest())
+
+
+class LocalHTTPServer(object):
+    """
+    A HTTP server that runs in a thread and serves the content of the paths
+    listed in routes. A route can also be mapped to a HTTP error code. The
+    number of requests received for each path is counted in hits and the
+    number of conditional requests answered with 304 in not_modified.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.hits = Counter()
+        self.not_modified = Counter()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.hits[self.path] += 1
+                content = server.routes.get(self.path, 404)
+                if isinstance(content, int):
+                    self.send_error(content)
+                    return
+                etag = get_etag(content)
+                if self.headers.get('If-None-Match') == etag:
+                    server.not_modified[self.path] += 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(content)
+
+        self._httpd = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        self.root = 'http://127.0.0.1:{}/'.format(
+            self._httpd.server_address[1])
+
+    def url(self, path):
+        """Return the url of the specified path on the server."""
+        return self.root + path.lstrip('/')
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class LocalAsyncHTTPServer(object):
+    """
+    A HTTP server that runs in the running event loop and serves the
+    content of the paths listed in routes like LocalHTTPServer does. It must
+    be used as an asynchronous context manager.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = {} if routes is None else routes
+        self.hits = Counter()
+        self.not_modified = Counter()
+        self.root = None
+        self._runner = None
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        self.hits[request.path_qs] += 1
+        content = self.routes.get(request.path_qs, 404)
+        if isinstance(content, int):
+            return web.Response(status=content)
+        etag = get_etag(content)
+        if request.headers.get('If-None-Match') == etag:
+            self.not_modified[request.path_qs] += 1
+            return web.Response(status=304)
+        return web.Response(body=content, headers={'ETag': etag})
+
+    def url(self, path):
+        """Return the url of the specified path on the server."""
+        return self.root + path.lstrip('/')
+
+    async def __aenter__(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.root = 'http://127.0.0.1:{}/'.format(
+            site._server.sockets[0].getsockname()[1])
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._runner.cleanup()
+
+
+@pytest.fixture
+def http_server():
+    server = LocalHTTPServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def http_cache_dir(tmp_path, monkeypatch):
+    """
+    Route the requests of the readers through an empty HTTP cache that
+    revalidates every url on each request.
+    """
+    monkeypatch.setattr(http_cache, '_HTTP_CACHE', None)
+    cache = http_cache.set_http_cache(str(tmp_path / 'http_cache'), ttl=0)
+    yield cache.dirname
+    cache.close()
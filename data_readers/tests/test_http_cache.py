@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:43:20 2026
+@author: jsgosselin
+
+Tests for the HTTP cache shared by the data readers, with the responses
+served by a local HTTP server.
+"""
+
+# ---- Standard library imports
+import asyncio
+
+# ---- Third party imports
+import pytest
+import requests
+
+# ---- Local imports
+from data_readers.http_cache import HTTPCache
+from data_readers.tests.conftest import LocalAsyncHTTPServer
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'http_cache'), ttl=3600)
+    yield cache
+    cache.close()
+
+
+def test_fetch_within_ttl(cache, http_server):
+    """
+    Test that the content younger than ttl is returned without any request,
+    unless a revalidation is requested.
+    """
+    http_server.routes['/data.txt'] = b'version 1'
+    url = http_server.url('data.txt')
+
+    assert cache.fetch(url) == b'version 1'
+    assert cache.fetch(url) == b'version 1'
+    assert http_server.hits['/data.txt'] == 1
+
+    http_server.routes['/data.txt'] = b'version 2'
+    assert cache.fetch(url) == b'version 1'
+    assert cache.fetch(url, revalidate=True) == b'version 2'
+    assert http_server.hits['/data.txt'] == 2
+    assert cache.fetch(url) == b'version 2'
+    assert http_server.hits['/data.txt'] == 2
+
+
+def test_fetch_revalidates_stale_content(cache, http_server):
+    """
+    Test that the content older than ttl is revalidated with a conditional
+    request and is downloaded again only if it changed on the server.
+    """
+    cache.ttl = 0
+    http_server.routes['/data.txt'] = b'version 1'
+    url = http_server.url('data.txt')
+
+    assert cache.fetch(url) == b'version 1'
+    fetched = cache._get_entry(url)['fetched']
+    assert cache.fetch(url) == b'version 1'
+    assert http_server.hits['/data.txt'] == 2
+    assert http_server.not_modified['/data.txt'] == 1
+    assert cache._get_entry(url)['fetched'] > fetched
+
+    http_server.routes['/data.txt'] = b'version 2'
+    assert cache.fetch(url) == b'version 2'
+    assert http_server.not_modified['/data.txt'] == 1
+
+
+def test_fetch_offline_fallback(cache, http_server):
+    """
+    Test that the cached content is returned when the server cannot be
+    reached and that the error is raised for the content that is not
+    cached.
+    """
+    cache.ttl = 0
+    http_server.routes['/data.txt'] = b'version 1'
+    url = http_server.url('data.txt')
+    assert cache.fetch(url) == b'version 1'
+
+    http_server.close()
+    assert cache.fetch(url) == b'version 1'
+    assert cache.fetch(url, revalidate=True) == b'version 1'
+    with pytest.raises(requests.ConnectionError):
+        cache.fetch(http_server.url('other.txt'))
+
+
+def test_fetch_http_error(cache, http_server):
+    """Test that a HTTP error is raised and nothing is cached."""
+    http_server.routes['/data.txt'] = 500
+    url = http_server.url('data.txt')
+    with pytest.raises(requests.HTTPError):
+        cache.fetch(url)
+    assert cache._get_entry(url) is None
+    assert cache.size() == 0
+
+
+def test_evict_least_recently_accessed(cache, http_server):
+    """
+    Test that the least recently accessed content is evicted when the size
+    of the cache exceeds max_size.
+    """
+    cache.max_size = 25
+    for name in ['a', 'b', 'c']:
+        http_server.routes['/{}.txt'.format(name)] = name.encode() * 10
+
+    cache.fetch(http_server.url('a.txt'))
+    cache.fetch(http_server.url('b.txt'))
+    cache.fetch(http_server.url('a.txt'))
+    assert cache.size() == 20
+
+    cache.fetch(http_server.url('c.txt'))
+    assert cache.size() == 20
+    assert cache._get_entry(http_server.url('a.txt')) is not None
+    assert cache._get_entry(http_server.url('b.txt')) is None
+    assert cache._get_entry(http_server.url('c.txt')) is not None
+
+    assert cache.fetch(http_server.url('b.txt')) == b'b' * 10
+    assert http_server.hits['/b.txt'] == 2
+
+
+def test_retrieve(cache, http_server, tmp_path):
+    """Test that the content of an url is saved to the specified file."""
+    http_server.routes['/data.txt'] = b'version 1'
+    filepath = str(tmp_path / 'data.txt')
+    cache.retrieve(http_server.url('data.txt'), filepath)
+    with open(filepath, 'rb') as f:
+        assert f.read() == b'version 1'
+
+
+def test_fetch_async(cache):
+    """
+    Test that the content is fetched in the running event loop through the
+    cache, with the same ttl, revalidation and fallback behavior as fetch.
+    """
+    async def run():
+        routes = {'/data.txt': b'version 1'}
+        async with LocalAsyncHTTPServer(routes) as server:
+            url = server.url('data.txt')
+            assert await cache.fetch_async(url) == b'version 1'
+            assert await cache.fetch_async(url) == b'version 1'
+            assert server.hits['/data.txt'] == 1
+
+            assert await cache.fetch_async(url, revalidate=True) == (
+                b'version 1')
+            assert server.not_modified['/data.txt'] == 1
+
+            routes['/data.txt'] = b'version 2'
+            assert await cache.fetch_async(url, revalidate=True) == (
+                b'version 2')
+            assert server.hits['/data.txt'] == 3
+        assert await cache.fetch_async(url, revalidate=True) == b'version 2'
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:02:41 2026
+@author: jsgosselin
+
+Tests for the HYDAT_Reader, with a small synthetic HYDAT database whose
+daily values are compared with the results computed with pandas.
+"""
+
+# ---- Standard library imports
+import asyncio
+from calendar import monthrange
+import sqlite3
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---- Local imports
+from data_readers.dataset import StationDataset
+from data_readers.read_ec_hydat import HYDAT_Reader
+from data_readers.utils import datetime64_to_xldates
+
+
+# The ID, name, province and status of the stations of the database, along
+# with the years of their daily flow and level records.
+STATIONS = [
+    ('01AB004', 'RIVIERE D', 'NB', 'A', [], []),
+    ('02HA003', 'RIVIERE C', 'ON', 'A', [2000, 2001], [2000, 2001]),
+    ('02OA001', 'RIVIERE A', 'QC', 'A', [1998, 1999, 2000, 2001],
+     [1999, 2000, 2001]),
+    ('02OA002', 'RIVIERE B', 'QC', 'D', [1930, 2000, 2001], [])]
+SIDS = [station[0] for station in STATIONS]
+
+
+def create_hydat_database(filepath):
+    """
+    Create a HYDAT database with the STATIONS, DLY_FLOWS and DLY_LEVELS
+    tables of the stations listed in STATIONS and return the daily values
+    saved in the DLY_FLOWS and DLY_LEVELS tables in long-format dataframes.
+    """
+    rng = np.random.RandomState(0)
+    con = sqlite3.connect(filepath)
+    con.execute(
+        "CREATE TABLE STATIONS (STATION_NUMBER TEXT PRIMARY KEY,"
+        " STATION_NAME TEXT, PROV_TERR_STATE_LOC TEXT, HYD_STATUS TEXT,"
+        " LATITUDE REAL, LONGITUDE REAL, DRAINAGE_AREA_GROSS REAL,"
+        " DRAINAGE_AREA_EFFECT REAL)")
+    con.execute("CREATE TABLE VERSION (Version TEXT, Date TEXT)")
+    con.execute("INSERT INTO VERSION VALUES ('1.0', '2020-01-01')")
+
+    daily = {}
+    for dtype, table, index in [('FLOW', 'DLY_FLOWS', 4),
+                                ('LEVEL', 'DLY_LEVELS', 5)]:
+        columns = ', '.join('{0}{1} REAL, {0}_SYMBOL{1} TEXT'.format(
+            dtype, day) for day in range(1, 32))
+        con.execute(
+            "CREATE TABLE {} (STATION_NUMBER TEXT, YEAR INTEGER,"
+            " MONTH INTEGER, FULL_MONTH INTEGER, NO_DAYS INTEGER,"
+            " MONTHLY_MEAN REAL, {})".format(table, columns))
+
+        records = []
+        for station in STATIONS:
+            sid = station[0]
+            for year in station[index]:
+                for month in range(1, 13):
+                    # A month of levels is missing for each station.
+                    if dtype == 'LEVEL' and month == 6 and year == 2000:
+                        continue
+                    ndays = monthrange(year, month)[1]
+                    values = np.round(rng.rand(31) * 100, 3)
+                    values[rng.rand(31) < 0.05] = np.nan
+                    values[ndays:] = np.nan
+                    row = [sid, year, month, 1, ndays,
+                           np.nanmean(values[:ndays])]
+                    for day in range(31):
+                        row += [None if np.isnan(values[day]) else
+                                float(values[day]), None]
+                    con.execute("INSERT INTO {} VALUES ({})".format(
+                        table, ', '.join(['?'] * len(row))), row)
+                    records.extend(
+                        [sid, year, month, day + 1, values[day]]
+                        for day in range(ndays))
+        daily[dtype] = pd.DataFrame(
+            records, columns=['ID', 'Year', 'Month', 'Day', dtype.title()])
+        daily[dtype]['Date'] = pd.to_datetime(
+            daily[dtype][['Year', 'Month', 'Day']])
+
+    for i, (sid, name, prov, status, _, _) in enumerate(STATIONS):
+        con.execute("INSERT INTO STATIONS VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (sid, name, prov, status, 45 + i / 10, -73 - i / 10,
+                     100.0 * (i + 1), None if i == 0 else 50.0 * (i + 1)))
+    con.commit()
+    con.close()
+    return daily
+
+
+@pytest.fixture
+def hydat_daily(tmp_path):
+    """The daily values saved in a synthetic HYDAT database."""
+    return create_hydat_database(str(tmp_path / 'Hydat.sqlite3'))
+
+
+@pytest.fixture
+def hydat_reader(tmp_path, hydat_daily):
+    reader = HYDAT_Reader(str(tmp_path))
+    yield reader
+    reader.close()
+
+
+def get_expected_series(hydat_daily, sid, start=None, end=None):
+    """
+    Return the daily flow and level series of a station that are expected
+    from the values saved in the database, after 1930 and between the
+    start and end dates inclusively.
+    """
+    flows = hydat_daily['FLOW']
+    levels = hydat_daily['LEVEL']
+    series = pd.merge(
+        flows[flows['ID'] == sid], levels[levels['ID'] == sid],
+        on=['ID', 'Year', 'Month', 'Day', 'Date'], how='outer')
+    series = series[series['Year'] > 1930]
+    if start is not None:
+        series = series[series['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        series = series[series['Date'] <= pd.Timestamp(end)]
+    return series.sort_values('Date').reset_index(drop=True)
+
+
+def assert_series_equal(station, expected):
+    assert np.array_equal(
+        station['Time'], datetime64_to_xldates(expected['Date'].values))
+    for key in ['Year', 'Month', 'Day']:
+        assert np.array_equal(station[key], expected[key])
+    for key in ['Flow', 'Level']:
+        assert np.array_equal(
+            np.asarray(station[key], dtype=float), expected[key],
+            equal_nan=True)
+
+
+def assert_stations_equal(station, other):
+    assert station.keys() == other.keys()
+    for key, value in station.items():
+        if isinstance(value, np.ndarray):
+            assert np.array_equal(value, other[key], equal_nan=True)
+        else:
+            assert value == other[key] or (pd.isnull(value) and
+                                           pd.isnull(other[key]))
+
+
+@pytest.mark.parametrize('start, end', [
+    (None, None), ('2000-03-15', None), (None, '2000-02-10'),
+    ('2000-03-15', '2001-02-10')])
+def test_get_dly_hydat_from_id(hydat_reader, hydat_daily, start, end):
+    """
+    Test that the daily flow and level series of a station match the
+    values saved in the database, within the time window.
+    """
+    for sid in SIDS:
+        station = hydat_reader.get_dly_hydat_from_id(sid, start, end)
+        assert station['ID'] == sid
+        assert_series_equal(
+            station, get_expected_series(hydat_daily, sid, start, end))
+
+    station = hydat_reader.get_dly_hydat_from_id('02OA001')
+    assert station['Name'] == 'RIVIERE A'
+    assert station['Province'] == 'QC'
+    assert station['Latitude'] == 45.2
+    assert station['Drainage Area Effect'] == 150
+    assert np.isnan(
+        hydat_reader.get_dly_hydat_from_id('01AB004')['Drainage Area Effect'])
+
+    with pytest.raises(KeyError):
+        hydat_reader.get_dly_hydat_from_id('XXXXXXX')
+
+
+@pytest.mark.parametrize('start, end', [
+    (None, None), ('2000-03-15', '2001-02-10')])
+def test_get_dly_hydat_for_ids(hydat_reader, hydat_daily, start, end):
+    """
+    Test that the bulk extraction returns the same daily series as the
+    extraction of the stations one at a time, with or without threads.
+    """
+    hydat_reader.SQL_CHUNKSIZE = 2
+    data = hydat_reader.get_dly_hydat_for_ids(SIDS, start, end)
+    assert list(data.columns) == [
+        'ID', 'Time', 'Year', 'Month', 'Day', 'Level', 'Flow']
+    assert list(data.attrs['stations'].index) == SIDS
+    for sid in SIDS:
+        assert_series_equal(
+            data[data['ID'] == sid],
+            get_expected_series(hydat_daily, sid, start, end))
+        assert_series_equal(
+            hydat_reader.get_dly_hydat_from_id(sid, start, end),
+            get_expected_series(hydat_daily, sid, start, end))
+
+    parallel = hydat_reader.get_dly_hydat_for_ids(
+        SIDS, start, end, max_workers=3)
+    pd.testing.assert_frame_equal(parallel, data)
+
+
+@pytest.mark.parametrize('max_workers', [None, 2])
+def test_iter_dly_hydat(hydat_reader, max_workers):
+    """
+    Test that the stations are streamed in the order of their ID with the
+    same data as when they are extracted one at a time.
+    """
+    stations = list(hydat_reader.iter_dly_hydat(
+        fetchsize=7, start='2000-03-15', max_workers=max_workers))
+    assert [station['ID'] for station in stations] == SIDS
+    for station in stations:
+        assert_stations_equal(station, hydat_reader.get_dly_hydat_from_id(
+            station['ID'], start='2000-03-15'))
+
+    stations = list(hydat_reader.iter_dly_hydat(
+        hydstatus='A', province=['QC', 'ON'], max_workers=max_workers))
+    assert [station['ID'] for station in stations] == ['02HA003', '02OA001']
+
+
+def test_iter_stations_async(hydat_reader):
+    """
+    Test that the data of the stations are read in the default executor
+    when they are iterated in the running event loop.
+    """
+    async def run():
+        failures = {}
+        results = {sid: station async for sid, station in
+                   hydat_reader.iter_stations_async(failures=failures)}
+        assert failures == {}
+        assert sorted(results) == SIDS
+        for sid in SIDS:
+            assert_stations_equal(
+                results[sid], hydat_reader.get_station_data(sid))
+
+    asyncio.run(run())
+
+
+def test_get_metadata(hydat_reader):
+    """Test the lookup of the info of the stations by station number."""
+    metadata = hydat_reader.get_metadata(
+        ['02OA002', 'XXXXXXX'], ['STATION_NAME', 'HYD_STATUS'])
+    assert list(metadata.index) == ['02OA002', 'XXXXXXX']
+    assert metadata.at['02OA002', 'STATION_NAME'] == 'RIVIERE B'
+    assert pd.isnull(metadata.at['XXXXXXX', 'STATION_NAME'])
+
+    assert hydat_reader.get_name_from_sid('02HA003') == 'RIVIERE C'
+    assert hydat_reader.get_prov_from_sid('02HA003') == 'ON'
+    assert hydat_reader.get_hydstatus_from_sid('02OA002') is False
+    assert hydat_reader.get_xy_from_sid('02HA003') == (45.1, -73.1)
+    assert hydat_reader.get_station_ids(province='QC') == [
+        '02OA001', '02OA002']
+
+
+@pytest.mark.parametrize('freq', ['month', 'year'])
+@pytest.mark.parametrize('dtype', ['FLOW', 'LEVEL'])
+@pytest.mark.parametrize('start, end', [
+    (None, None), ('2000-03-15', '2001-02-10')])
+def test_get_dly_stats(hydat_reader, hydat_daily, freq, dtype, start, end):
+    """
+    Test that the statistics computed in SQLite match the ones computed
+    with pandas from the daily values.
+    """
+    daily = hydat_daily[dtype]
+    daily = daily[daily['Year'] > 1930]
+    if start is not None:
+        daily = daily[(daily['Date'] >= pd.Timestamp(start)) &
+                      (daily['Date'] <= pd.Timestamp(end))]
+    groups = ['ID', 'Year', 'Month'] if freq == 'month' else ['ID', 'Year']
+    expected = daily.groupby(groups)[dtype.title()].agg(
+        ['mean', 'min', 'max', 'count']).reset_index()
+    expected.columns = groups + ['Mean', 'Min', 'Max', 'Count']
+
+    stats = hydat_reader.get_dly_stats(SIDS, dtype, freq, start, end)
+    pd.testing.assert_frame_equal(stats, expected, check_dtype=False)
+
+    stats_method = (hydat_reader.get_monthly_stats if freq == 'month' else
+                    hydat_reader.get_annual_stats)
+    pd.testing.assert_frame_equal(
+        stats_method('02OA001', dtype, start, end),
+        expected[expected['ID'] == '02OA001'].reset_index(drop=True),
+        check_dtype=False)
+
+
+def test_get_dly_stats_errors(hydat_reader):
+    with pytest.raises(ValueError):
+        hydat_reader.get_dly_stats(SIDS, dtype='TEMPERATURE')
+    with pytest.raises(ValueError):
+        hydat_reader.get_dly_stats(SIDS, freq='week')
+
+
+def test_save_dly_hydat_to_parquet(hydat_reader, hydat_daily, tmp_path):
+    """
+    Test that the daily series of the stations are saved in a Parquet
+    dataset with the dates saved as timestamps.
+    """
+    pytest.importorskip('pyarrow')
+    dirname = str(tmp_path / 'dataset')
+    hydat_reader.save_dly_hydat_to_parquet(
+        dirname, province='QC', start='2000-03-15', verbose=False)
+
+    dataset = StationDataset(dirname)
+    manifest = dataset.manifest()
+    assert list(manifest.index) == ['02OA001', '02OA002']
+    assert manifest.at['02OA001', 'start'] == '2000-03-15'
+    assert manifest.at['02OA001', 'end'] == '2001-12-31'
+
+    data = dataset.load('02OA001')
+    assert str(data['Time'].dtype) == 'datetime64[ns]'
+    expected = get_expected_series(hydat_daily, '02OA001', '2000-03-15')
+    assert np.array_equal(data['Time'].values, expected['Date'].values)
+    assert manifest.at['02OA001', 'rows'] == len(expected)
+
+
+def test_database_is_read_only(hydat_reader):
+    """Test that the database is opened read-only."""
+    with pytest.raises(sqlite3.OperationalError):
+        hydat_reader._con.execute("DELETE FROM STATIONS")
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:34:10 2026
+@author: jsgosselin
+
+Tests for the MDDELCC_CEHQ_Reader, with the pages of the CEHQ website
+served by a local HTTP server.
+"""
+
+# ---- Standard library imports
+import asyncio
+
+# ---- Third party imports
+import numpy as np
+import pytest
+
+# ---- Local imports
+import data_readers.read_mddelcc_cehq as read_mddelcc_cehq
+from data_readers.read_mddelcc_cehq import MDDELCC_CEHQ_Reader
+from data_readers.tests.conftest import LocalAsyncHTTPServer
+
+
+SIDS = ['{:06d}'.format(i) for i in range(1, 9)]
+STATIONS_PATH = '/hydrometrie/historique_donnees/default.asp'
+DATASHEET_PATH = (
+    '/hydrometrie/historique_donnees/fiche_station.asp?NoStation={}')
+DLYFILE_PATH = '/depot/historique_donnees/fichier/{}_{}.txt'
+
+
+def create_stations_html(sids):
+    """Create the html of the page that lists the stations of the CEHQ."""
+    options = ''.join('<option>{}</option>'.format(sid) for sid in sids)
+    return '<select id="lstStation">{}</select>'.format(options).encode(
+        'iso-8859-1')
+
+
+def create_datasheet_html(sid):
+    """Create the html of the datasheet of a station of the CEHQ."""
+    fields = [('Numéro de la station :', sid),
+              ('Nom de la station :', 'Rivière {}'.format(sid)),
+              ('Description :', 'À 1 km du pont'),
+              ('État :', 'Station ouverte'),
+              ("Période(s) d'activité :", '1970<br>1990'),
+              ('Municipalité :', 'Québec'),
+              ('Région administrative :', 'Capitale-Nationale'),
+              ("Lac ou cours d'eau :", 'Rivière'),
+              ('Région hydrographique', 'Saint-Laurent'),
+              ('Bassin versant à la station', '1\xa0234,5 km²'),
+              ("Régime d'écoulement", 'Naturel'),
+              ('Numéro fédéral de la station :', '\x97')]
+    return ''.join(
+        '<tr><td>{}</td><td width="421">{}&nbsp;</td></tr>'.format(*field)
+        for field in fields).encode('iso-8859-1')
+
+
+def create_dlyfile(sid, values):
+    """
+    Create the content of a daily data file of a station of the CEHQ with
+    the daily values of the first days of January 1990.
+    """
+    lines = ['Station: {}'.format(sid), '', '', '',
+             'Coordonnées: (NAD83) 45º 30\' 10" // -73º 20\' 05"',
+             'Altitude : 12.5 m']
+    lines += [''] * 15 + ['Station Date Débit Remarque']
+    for day, value in enumerate(values, start=1):
+        lines.append('{} 1990/01/{:02d} {} MC'.format(sid, day, value))
+    return '\r\n'.join(lines).encode('iso-8859-1')
+
+
+def create_routes(sids):
+    """
+    Create the routes of the station list and of the datasheets of the
+    specified stations.
+    """
+    routes = {STATIONS_PATH: create_stations_html(sids)}
+    for sid in sids:
+        routes[DATASHEET_PATH.format(sid)] = create_datasheet_html(sid)
+    return routes
+
+
+def datasheet_hits(http_server, sid):
+    return http_server.hits[DATASHEET_PATH.format(sid)]
+
+
+@pytest.fixture
+def cehq_server(http_server, http_cache_dir, monkeypatch):
+    """Serve the station list and the datasheets of the CEHQ website."""
+    monkeypatch.setattr(read_mddelcc_cehq, 'CEHQ_URL', http_server.root)
+    http_server.routes.update(create_routes(SIDS))
+    return http_server
+
+
+def test_scrape_daily_series_from_txt():
+    """
+    Test that the daily records of a station are parsed from the lines of
+    its data file, ignoring the tokens that follow the note.
+    """
+    data = ['Station: 022704', '',
+            '022704 1970/01/04 1.5 R E',
+            '022704 1970/01/05',
+            ' 022704 1970/1/6 2.5',
+            '022704 1970/01/07 3.5 MC R E',
+            '022705 1970/01/08 4.5']
+    df = read_mddelcc_cehq.scrape_daily_series_from_txt('022704', data)
+    assert np.array_equal(df['Day'], [4, 5, 6, 7])
+    assert np.array_equal(
+        df['Daily values'], [1.5, np.nan, 2.5, 3.5], equal_nan=True)
+    assert list(df['Note']) == ['R', '', '', 'MC']
+    assert np.array_equal(df['Time'], 25572 + np.arange(4))
+
+
+def test_fetch_database(cehq_server, tmp_path):
+    """
+    Test that the datasheets of all the stations are fetched when the
+    local database is empty.
+    """
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path))
+
+    assert sorted(reader.station_ids()) == SIDS
+    assert reader._pending_crawl_sids() is None
+    stn = reader._db['000003']
+    assert stn['Name'] == 'Rivière 000003'
+    assert stn['Active period'] == '1970 ; 1990'
+    assert stn['Drainage Area'] == 1234.5
+    for sid in SIDS:
+        assert datasheet_hits(cehq_server, sid) == 1
+
+    # The datasheets are loaded from the local database afterwards.
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path))
+    assert sorted(reader.station_ids()) == SIDS
+    for sid in SIDS:
+        assert datasheet_hits(cehq_server, sid) == 1
+
+
+def test_database_in_user_cache_dir(tmp_path, monkeypatch):
+    """
+    Test that the local database is saved in the cache directory of the
+    user when no working directory is provided, like the RSESQ reader does.
+    """
+    dirname = str(tmp_path / 'data_readers')
+    monkeypatch.setattr(
+        read_mddelcc_cehq, 'get_user_cache_dir', lambda: dirname)
+    reader = MDDELCC_CEHQ_Reader(lazy=True)
+    assert reader.DATABASE_FILEPATH == str(
+        tmp_path / 'data_readers' / 'mddelcc_cehq_database.sqlite3')
+
+
+def test_failures_are_not_resumed_on_load(cehq_server, tmp_path):
+    """
+    Test that a datasheet that cannot be fetched is reported, but is not
+    fetched again each time a reader is created.
+    """
+    cehq_server.routes[DATASHEET_PATH.format('000005')] = 500
+
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path), lazy=True)
+    reader._store = read_mddelcc_cehq.CEHQ_Database(reader.DATABASE_FILEPATH)
+    reader._db = {}
+    failures = reader.fetch_database(max_workers=4)
+    assert list(failures) == ['000005']
+    assert sorted(reader.station_ids()) == [
+        sid for sid in SIDS if sid != '000005']
+    assert reader._pending_crawl_sids() == ['000005']
+
+    hits = sum(cehq_server.hits.values())
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path))
+    assert sum(cehq_server.hits.values()) == hits
+    assert len(reader.station_ids()) == len(SIDS) - 1
+    assert reader._pending_crawl_sids() == ['000005']
+
+
+def test_resume_failures(cehq_server, tmp_path):
+    """
+    Test that resuming the crawl fetches only the datasheets that could not
+    be fetched during the last crawl.
+    """
+    cehq_server.routes[DATASHEET_PATH.format('000005')] = 500
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path))
+    assert reader._pending_crawl_sids() == ['000005']
+
+    cehq_server.routes[DATASHEET_PATH.format('000005')] = (
+        create_datasheet_html('000005'))
+    failures = reader.fetch_database(resume=True)
+
+    assert failures == {}
+    assert sorted(reader.station_ids()) == SIDS
+    assert reader._pending_crawl_sids() is None
+    assert cehq_server.hits[STATIONS_PATH] == 1
+    for sid in SIDS:
+        assert datasheet_hits(cehq_server, sid) == (
+            2 if sid == '000005' else 1)
+
+
+def test_resume_interrupted_crawl(cehq_server, tmp_path, monkeypatch):
+    """
+    Test that resuming a crawl that was interrupted fetches only the
+    datasheets that were not saved in the local database.
+    """
+    scrape_station_datasheet = read_mddelcc_cehq.scrape_station_datasheet
+
+    def interrupted_scrape(sid):
+        if sid == '000004':
+            raise KeyboardInterrupt
+        return scrape_station_datasheet(sid)
+
+    monkeypatch.setattr(
+        read_mddelcc_cehq, 'scrape_station_datasheet', interrupted_scrape)
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path), lazy=True)
+    reader._store = read_mddelcc_cehq.CEHQ_Database(reader.DATABASE_FILEPATH)
+    reader._db = {}
+    with pytest.raises(KeyboardInterrupt):
+        reader.fetch_database(max_workers=1)
+    saved = reader._store.station_ids()
+    assert 0 < len(saved) < len(SIDS)
+    assert reader._pending_crawl_sids() == SIDS
+
+    monkeypatch.setattr(
+        read_mddelcc_cehq, 'scrape_station_datasheet',
+        scrape_station_datasheet)
+    reader = MDDELCC_CEHQ_Reader(str(tmp_path))
+    assert sorted(reader.station_ids()) == saved
+
+    failures = reader.fetch_database(resume=True)
+    assert failures == {}
+    assert sorted(reader.station_ids()) == SIDS
+    assert reader._pending_crawl_sids() is None
+    for sid in saved:
+        assert datasheet_hits(cehq_server, sid) == 1
+
+
+def test_fetch_database_async(tmp_path, http_cache_dir, monkeypatch):
+    """
+    Test that the datasheets are fetched in the running event loop, that
+    the datasheets that could not be fetched are reported and that only
+    these are fetched when the crawl is resumed.
+    """
+    async def run():
+        routes = create_routes(SIDS)
+        routes[DATASHEET_PATH.format('000005')] = 500
+        async with LocalAsyncHTTPServer(routes) as server:
+            monkeypatch.setattr(read_mddelcc_cehq, 'CEHQ_URL', server.root)
+            reader = MDDELCC_CEHQ_Reader(str(tmp_path), offline=True)
+
+            failures = await reader.fetch_database_async()
+            assert list(failures) == ['000005']
+            assert len(reader.station_ids()) == len(SIDS) - 1
+            assert reader._pending_crawl_sids() == ['000005']
+
+            routes[DATASHEET_PATH.format('000005')] = (
+                create_datasheet_html('000005'))
+            failures = await reader.fetch_database_async(resume=True)
+            assert failures == {}
+            assert sorted(reader.station_ids()) == SIDS
+            assert reader._pending_crawl_sids() is None
+            assert server.hits[STATIONS_PATH] == 1
+            for sid in SIDS:
+                assert server.hits[DATASHEET_PATH.format(sid)] == (
+                    2 if sid == '000005' else 1)
+
+    asyncio.run(run())
+
+
+def test_iter_stations_async(tmp_path, http_cache_dir, monkeypatch):
+    """
+    Test that the daily data of the stations are fetched in the running
+    event loop and saved in the local database, including the stations
+    that have no daily data file.
+    """
+    async def run():
+        sids = ['000001', '000002']
+        routes = create_routes(sids)
+        routes[DLYFILE_PATH.format('000001', 'Q')] = create_dlyfile(
+            '000001', ['1.5', '2.5', '3.5'])
+        routes[DLYFILE_PATH.format('000001', 'N')] = create_dlyfile(
+            '000001', ['10.25', '10.5'])
+        async with LocalAsyncHTTPServer(routes) as server:
+            monkeypatch.setattr(read_mddelcc_cehq, 'CEHQ_URL', server.root)
+            reader = MDDELCC_CEHQ_Reader(str(tmp_path), offline=True)
+            await reader.fetch_database_async()
+
+            failures = {}
+            results = {sid: station async for sid, station in
+                       reader.iter_stations_async(failures=failures)}
+            assert failures == {}
+            assert sorted(results) == sids
+
+            station = reader.get_station_data('000001')
+            assert station['Elevation'] == 12.5
+            assert np.array_equal(station['Day'], [1, 2, 3])
+            assert np.array_equal(station['Flow'], [1.5, 2.5, 3.5])
+            assert np.array_equal(
+                station['Level'], [10.25, 10.5, np.nan], equal_nan=True)
+
+            # The station without daily data file is remembered, so that
+            # it is not fetched again from the offline reader.
+            station = reader.get_station_data('000002')
+            assert len(station['Time']) == 0
+            assert server.hits[DLYFILE_PATH.format('000002', 'Q')] == 1
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:32:33 2026
+@author: jsgosselin
+
+Tests for the MDDELCC_RSESQ_Reader, with the data files of the stations
+served by a local HTTP server.
+"""
+
+# ---- Standard library imports
+import asyncio
+import os.path as osp
+
+# ---- Third party imports
+import pandas as pd
+import pytest
+
+# ---- Local imports
+from data_readers.http_cache import get_http_cache
+from data_readers.read_mddelcc_rses import MDDELCC_RSESQ_Reader
+from data_readers.tests.conftest import (
+    LocalAsyncHTTPServer, read_test_data)
+
+
+GOOD_SIDS = ['03020001', '03020002', '03020003']
+FAILING_SID = '03020004'
+NODATA_SID = '03020005'
+
+
+def create_station_routes():
+    """
+    Create the routes of the data files of the stations, with a route that
+    fails for the data file of FAILING_SID.
+    """
+    content = read_test_data('rsesq_station.xls')
+    routes = {'/xls/{}.xls'.format(sid): content for sid in GOOD_SIDS}
+    routes['/xls/{}.xls'.format(FAILING_SID)] = 500
+    return routes
+
+
+def create_station_database(server):
+    """
+    Create a station table whose data files are served by the specified
+    local server.
+    """
+    db = {}
+    for sid in GOOD_SIDS + [FAILING_SID, NODATA_SID]:
+        db[sid] = {'ID': sid, 'Name': 'Puits {}'.format(sid),
+                   'Latitude': '45.5', 'Longitude': '-72.5',
+                   'Nappe': 'Libre', 'Influenced': 'Non',
+                   'Last': '2019-01-02',
+                   'url data': server.url('xls/{}.xls'.format(sid))}
+    db[NODATA_SID]['url data'] = None
+    return db
+
+
+@pytest.fixture
+def rsesq_reader(tmp_path, http_server, http_cache_dir):
+    """
+    A RSESQ reader with a station table of three stations whose data file
+    is served by the local server, one station whose data file cannot be
+    downloaded and one station without a data file.
+    """
+    http_server.routes.update(create_station_routes())
+    reader = MDDELCC_RSESQ_Reader(str(tmp_path), lazy=True)
+    reader._set_database(create_station_database(http_server))
+    return reader
+
+
+def test_fetch_all_stations_wldata(rsesq_reader, http_server):
+    """
+    Test that the data of all the stations are fetched concurrently and
+    that the stations that failed are reported.
+    """
+    results, failures = rsesq_reader.fetch_all_stations_wldata(
+        max_workers=4, verbose=False)
+
+    assert sorted(failures) == [FAILING_SID]
+    assert sorted(results) == sorted(GOOD_SIDS + [NODATA_SID])
+    assert results[NODATA_SID] is None
+    for sid in GOOD_SIDS:
+        assert results[sid].shape == (48, 2)
+        assert results[sid]['Water Level (masl)'].iloc[-1] == 100.47
+        assert http_server.hits['/xls/{}.xls'.format(sid)] == 1
+
+
+def test_fetch_all_stations_wldata_uses_cache(rsesq_reader, http_server):
+    """
+    Test that the stations that were fetched successfully are loaded from
+    the local cache afterwards, unless force is True.
+    """
+    rsesq_reader.fetch_all_stations_wldata(max_workers=4, verbose=False)
+    results, failures = rsesq_reader.fetch_all_stations_wldata(
+        GOOD_SIDS, max_workers=4, verbose=False)
+    assert failures == {}
+    for sid in GOOD_SIDS:
+        assert len(results[sid]) == 48
+        assert http_server.hits['/xls/{}.xls'.format(sid)] == 1
+
+    rsesq_reader.fetch_all_stations_wldata(
+        GOOD_SIDS, max_workers=4, force=True, verbose=False)
+    for sid in GOOD_SIDS:
+        assert http_server.hits['/xls/{}.xls'.format(sid)] == 2
+
+
+def test_force_revalidates_data_files(rsesq_reader, http_server):
+    """
+    Test that forcing the fetch of the data of the stations revalidates
+    their data file with the server, even within the ttl of the HTTP cache.
+    """
+    get_http_cache().ttl = 3600
+    sid = GOOD_SIDS[0]
+    rsesq_reader.get_station_data(sid)
+    rsesq_reader.get_station_data(sid)
+    assert http_server.hits['/xls/{}.xls'.format(sid)] == 1
+
+    rsesq_reader.get_station_data(sid, force=True)
+    assert http_server.hits['/xls/{}.xls'.format(sid)] == 2
+    assert http_server.not_modified['/xls/{}.xls'.format(sid)] == 1
+
+    rsesq_reader.fetch_all_stations_wldata(
+        GOOD_SIDS, max_workers=4, force=True, verbose=False)
+    assert http_server.hits['/xls/{}.xls'.format(sid)] == 3
+    for sid in GOOD_SIDS[1:]:
+        assert http_server.hits['/xls/{}.xls'.format(sid)] == 1
+
+
+def test_fetch_all_stations_wldata_retry(rsesq_reader, http_server):
+    """
+    Test that the stations that failed can be fetched again once their
+    data file is available.
+    """
+    results, failures = rsesq_reader.fetch_all_stations_wldata(
+        max_workers=4, verbose=False)
+    assert list(failures) == [FAILING_SID]
+
+    http_server.routes['/xls/{}.xls'.format(FAILING_SID)] = read_test_data(
+        'rsesq_station.xls')
+    results, failures = rsesq_reader.fetch_all_stations_wldata(
+        list(failures), max_workers=4, verbose=False)
+    assert failures == {}
+    assert len(results[FAILING_SID]) == 48
+
+
+def test_dwnld_all_raw_xls_datafiles(rsesq_reader, tmp_path):
+    """
+    Test that the data files of all the stations are downloaded
+    concurrently in the specified directory.
+    """
+    dirname = str(tmp_path / 'xls')
+    results, failures = rsesq_reader.dwnld_all_raw_xls_datafiles(
+        dirname, max_workers=4, verbose=False)
+
+    assert sorted(failures) == [FAILING_SID]
+    assert results[NODATA_SID] is None
+    for sid in GOOD_SIDS:
+        assert results[sid] == osp.join(dirname, '{}.xls'.format(sid))
+        with open(results[sid], 'rb') as f:
+            assert f.read() == read_test_data('rsesq_station.xls')
+    assert not osp.exists(osp.join(dirname, '{}.xls'.format(FAILING_SID)))
+
+
+def test_sync(rsesq_reader, http_server):
+    """
+    Test that the stations that are not cached are planned for download
+    and that they are skipped once they are synced.
+    """
+    plan = rsesq_reader.plan_sync()
+    assert list(plan.loc[GOOD_SIDS + [FAILING_SID], 'Action'].unique()) == [
+        'download']
+    assert plan.at[NODATA_SID, 'Action'] == 'skip'
+
+    results, failures = rsesq_reader.sync(max_workers=4, verbose=False)
+    assert sorted(failures) == [FAILING_SID]
+    assert results == {sid: 48 for sid in GOOD_SIDS}
+
+    plan = rsesq_reader.plan_sync()
+    assert list(plan.loc[GOOD_SIDS, 'Action'].unique()) == ['skip']
+    assert plan.at[FAILING_SID, 'Action'] == 'download'
+    for sid in GOOD_SIDS:
+        assert plan.at[sid, 'Stored'] == pd.Timestamp('2019-01-02 23:00')
+        assert http_server.hits['/xls/{}.xls'.format(sid)] == 1
+
+
+def test_sync_appends_new_readings(rsesq_reader, http_server):
+    """
+    Test that only the readings more recent than the cached ones are added
+    to the cache when the station table lists new readings, even if the
+    data file is still in the HTTP cache.
+    """
+    get_http_cache().ttl = 3600
+    sid = GOOD_SIDS[0]
+    rsesq_reader.sync([sid], verbose=False)
+
+    http_server.routes['/xls/{}.xls'.format(sid)] = read_test_data(
+        'rsesq_station_update.xls')
+    rsesq_reader._db[sid]['Last'] = '2019-01-03'
+    plan = rsesq_reader.plan_sync([sid])
+    assert plan.at[sid, 'Action'] == 'append'
+
+    results, failures = rsesq_reader.sync([sid], verbose=False)
+    assert results == {sid: 24}
+    assert http_server.hits['/xls/{}.xls'.format(sid)] == 2
+    assert rsesq_reader._cache.get_attrs(sid)['version'] == '2019-01-03'
+    assert rsesq_reader.plan_sync([sid]).at[sid, 'Action'] == 'skip'
+
+    data = rsesq_reader.get_station_data(sid)
+    assert len(data) == 72
+    assert data['Water Level (masl)'].iloc[-1] == 100.71
+    assert http_server.hits['/xls/{}.xls'.format(sid)] == 2
+
+
+def test_sync_waits_for_new_readings(rsesq_reader, http_server):
+    """
+    Test that a station is not marked as up to date when its data file
+    does not have the readings listed in the station table yet.
+    """
+    sid = GOOD_SIDS[0]
+    rsesq_reader.sync([sid], verbose=False)
+    rsesq_reader._db[sid]['Last'] = '2019-01-03'
+
+    results, failures = rsesq_reader.sync([sid], verbose=False)
+    assert results == {sid: 0}
+    assert rsesq_reader._cache.get_attrs(sid)['version'] == ''
+    assert rsesq_reader.plan_sync([sid]).at[sid, 'Action'] == 'append'
+
+    http_server.routes['/xls/{}.xls'.format(sid)] = read_test_data(
+        'rsesq_station_update.xls')
+    results, failures = rsesq_reader.sync([sid], verbose=False)
+    assert results == {sid: 24}
+    assert rsesq_reader._cache.get_attrs(sid)['version'] == '2019-01-03'
+    assert rsesq_reader.plan_sync([sid]).at[sid, 'Action'] == 'skip'
+
+
+def test_fetch_station_async(tmp_path, http_cache_dir):
+    """
+    Test that the data of a station are fetched in the running event loop
+    and are loaded from the local cache afterwards.
+    """
+    import aiohttp
+
+    async def run():
+        async with LocalAsyncHTTPServer(create_station_routes()) as server:
+            reader = MDDELCC_RSESQ_Reader(str(tmp_path), lazy=True)
+            reader._set_database(create_station_database(server))
+
+            data = await reader.fetch_station_async(GOOD_SIDS[0])
+            assert data.shape == (48, 2)
+            assert data['Water Level (masl)'].iloc[-1] == 100.47
+
+            data = await reader.fetch_station_async(GOOD_SIDS[0])
+            assert len(data) == 48
+            assert server.hits['/xls/{}.xls'.format(GOOD_SIDS[0])] == 1
+
+            # The data file is revalidated with the server when forced, even
+            # within the ttl of the HTTP cache.
+            get_http_cache().ttl = 3600
+            data = await reader.fetch_station_async(GOOD_SIDS[0], force=True)
+            assert len(data) == 48
+            assert server.hits['/xls/{}.xls'.format(GOOD_SIDS[0])] == 2
+
+            assert await reader.fetch_station_async(NODATA_SID) is None
+            with pytest.raises(aiohttp.ClientResponseError):
+                await reader.fetch_station_async(FAILING_SID)
+
+    asyncio.run(run())
+
+
+def test_fetch_station_async_offline(tmp_path, http_cache_dir):
+    """
+    Test that an offline reader returns the data of the local cache in the
+    running event loop without accessing the network.
+    """
+    async def run():
+        async with LocalAsyncHTTPServer(create_station_routes()) as server:
+            reader = MDDELCC_RSESQ_Reader(str(tmp_path), lazy=True)
+            reader._set_database(create_station_database(server))
+            await reader.fetch_station_async(GOOD_SIDS[0])
+
+            reader.offline = True
+            data = await reader.fetch_station_async(GOOD_SIDS[0], force=True)
+            assert len(data) == 48
+            with pytest.raises(FileNotFoundError):
+                await reader.fetch_station_async(GOOD_SIDS[1])
+            assert server.hits['/xls/{}.xls'.format(GOOD_SIDS[0])] == 1
+            assert server.hits['/xls/{}.xls'.format(GOOD_SIDS[1])] == 0
+
+    asyncio.run(run())
+
+
+def test_iter_stations_async(tmp_path, http_cache_dir):
+    """
+    Test that the data of the stations are yielded as soon as they are
+    fetched in the running event loop and that the stations that failed are
+    stored in the failures dictionary or raised.
+    """
+    import aiohttp
+
+    async def run():
+        async with LocalAsyncHTTPServer(create_station_routes()) as server:
+            reader = MDDELCC_RSESQ_Reader(str(tmp_path), lazy=True)
+            reader._set_database(create_station_database(server))
+
+            failures = {}
+            results = {sid: data async for sid, data in
+                       reader.iter_stations_async(failures=failures)}
+            assert sorted(failures) == [FAILING_SID]
+            assert isinstance(failures[FAILING_SID],
+                              aiohttp.ClientResponseError)
+            assert sorted(results) == sorted(GOOD_SIDS + [NODATA_SID])
+            assert results[NODATA_SID] is None
+            for sid in GOOD_SIDS:
+                assert len(results[sid]) == 48
+
+            with pytest.raises(aiohttp.ClientResponseError):
+                async for sid, data in reader.iter_stations_async(
+                        [FAILING_SID]):
+                    pass
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
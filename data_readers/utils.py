@@ -6,11 +6,121 @@ Created on Mon Oct 23 09:22:27 2017
 
 # ---- Standard library imports
 import urllib
+import os
+import os.path as osp
 import re
+import sys
 import numpy as np
 import csv
 
 
+# The origin of the 1900-based Excel date system. It is set to 1899-12-30
+# instead of 1899-12-31 to account for the fictitious 1900-02-29 that is
+# counted by Excel, so that it is valid for all dates after 1900-03-01.
+XLDATE_ORIGIN = np.datetime64('1899-12-30T00:00:00', 's')
+
+# The number of rows that are formatted and written at once by
+# save_series_to_csv.
+CSV_CHUNKSIZE = 10000
+
+# The time in seconds after which a HTTP request is abandoned.
+HTTP_TIMEOUT = 300
+
+
+def xldates_to_datetime64(xldates):
+    """
+    Convert an array of Excel serial dates (1900-based date system) to an
+    array of numpy datetime64 values rounded to the nearest second.
+
+    This is the vectorized equivalent of calling
+    datetime(*xlrd.xldate_as_tuple(xldate, 0)) on each value. NaN values are
+    converted to NaT.
+    """
+    xldates = np.asarray(xldates, dtype=float)
+    isnan = np.isnan(xldates)
+    xldates = np.where(isnan, 0, xldates)
+
+    days = np.floor(xldates)
+    seconds = days * 86400 + np.round((xldates - days) * 86400)
+    dates = XLDATE_ORIGIN + seconds.astype('int64').astype('timedelta64[s]')
+    dates = dates.astype('datetime64[ns]')
+    dates[isnan] = np.datetime64('NaT')
+    return dates
+
+
+def datetime64_to_xldates(dates):
+    """
+    Convert an array of numpy datetime64 values to an array of Excel serial
+    dates (1900-based date system). NaT values are converted to NaN.
+    """
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    xldates = (dates - XLDATE_ORIGIN) / np.timedelta64(1, 'D')
+    xldates[np.isnat(dates)] = np.nan
+    return xldates
+
+
+def xldate_window(start=None, end=None):
+    """
+    Return the Excel serial dates of the start and end of a time window
+    given as anything numpy can convert to a datetime64. The bounds that are
+    not specified are returned as -inf and inf.
+    """
+    xlstart, xlend = datetime64_to_xldates([
+        np.datetime64('NaT' if start is None else start, 'ns'),
+        np.datetime64('NaT' if end is None else end, 'ns')])
+    return (-np.inf if start is None else float(xlstart),
+            np.inf if end is None else float(xlend))
+
+
+def slice_dly_series(data, start=None, end=None):
+    """
+    Return the daily series between the start and end dates inclusively.
+    The series are given in a dictionary of arrays with a 'Time' array of
+    Excel serial dates, like the ones of the CEHQ and HYDAT readers.
+    """
+    if start is None and end is None:
+        return data
+    xlstart, xlend = xldate_window(start, end)
+    mask = (data['Time'] >= xlstart) & (data['Time'] <= xlend)
+    return {key: values[mask] for key, values in data.items()}
+
+
+def bisect_sorted(items, value, key, side='left'):
+    """
+    Find the index where value should be inserted in the list of items,
+    which is sorted according to key, to keep it sorted. The key is only
+    computed for the items visited by the search.
+    """
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        item = key(items[mid])
+        if item < value or (side == 'right' and item == value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def xldates_from_ymd(years, months, days):
+    """
+    Return an array of Excel serial dates (1900-based date system) from
+    arrays of years, months and days.
+
+    This is the vectorized equivalent of calling
+    xlrd.xldate.xldate_from_date_tuple((year, month, day), 0) on each date.
+    """
+    years = np.asarray(years, dtype='int64')
+    months = np.asarray(months, dtype='int64')
+    days = np.asarray(days, dtype='int64')
+
+    dates = (
+        (years - 1970).astype('datetime64[Y]').astype('datetime64[M]') +
+        (months - 1).astype('timedelta64[M]')
+        ).astype('datetime64[D]') + (days - 1).astype('timedelta64[D]')
+    return (dates - XLDATE_ORIGIN.astype('datetime64[D]')).astype(float)
+
+
 def dms2decdeg(coord):
     """
     Convert decimal, minute, second format lat/lon coordinate to
@@ -68,6 +178,105 @@ def format_url_to_ascii(url):
     return url
 
 
+def get_user_cache_dir():
+    """
+    Return the directory where the data readers save their cached data
+    by default, in the cache directory of the user.
+    """
+    if os.name == 'nt':
+        root = os.environ.get('LOCALAPPDATA') or osp.expanduser('~')
+    elif sys.platform == 'darwin':
+        root = osp.expanduser('~/Library/Caches')
+    else:
+        root = os.environ.get('XDG_CACHE_HOME') or osp.expanduser('~/.cache')
+    return osp.join(root, 'data_readers')
+
+
+def create_http_session(pool_maxsize=10):
+    """
+    Create a HTTP session that keeps up to pool_maxsize connections alive
+    so that it can be shared between the threads of a pool.
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_maxsize, pool_maxsize=pool_maxsize,
+        max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def create_async_http_session(limit=10):
+    """
+    Create an aiohttp session that opens at most limit connections at a
+    time, so that it can be shared between the tasks of an event loop.
+    """
+    import aiohttp
+
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=limit),
+        timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+
+
+def run_in_thread_pool(func, items, max_workers=8, verbose=True,
+                       callback=None):
+    """
+    Call func on each item using a pool of at most max_workers threads.
+
+    If a callback is provided, it is called in the calling thread with each
+    item and its result as soon as the item is completed successfully, and
+    the value it returns is kept as the result of the item.
+
+    Return a dictionary with the result obtained for each item and a
+    dictionary with the exception raised for each item that failed.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    results = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+        for i, future in enumerate(as_completed(futures)):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as error:
+                failures[item] = error
+            else:
+                if callback is not None:
+                    results[item] = callback(item, results[item])
+            if verbose:
+                print("\r%d of %d (%d failed)" % (
+                      i + 1, len(futures), len(failures)), end="          ")
+    if verbose:
+        print()
+    return results, failures
+
+
+def imap_in_thread_pool(func, items, max_workers=8):
+    """
+    Yield the result of func called on each item, in the order of the items,
+    using a pool of at most max_workers threads.
+
+    At most two results per thread are computed ahead of the one that is
+    yielded, so that the results do not pile up in memory when they are
+    consumed more slowly than they are computed.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def save_content_to_csv(fname, fcontent, mode='w', delimiter=',',
                         encoding='utf8'):
     """
@@ -77,3 +286,87 @@ def save_content_to_csv(fname, fcontent, mode='w', delimiter=',',
     with open(fname, mode, encoding='utf8') as csvfile:
         writer = csv.writer(csvfile, delimiter=delimiter, lineterminator='\n')
         writer.writerows(fcontent)
+
+
+def quote_csv_field(string, delimiter=','):
+    """
+    Quote a field of a csv file if it contains the delimiter, a quote or
+    a line break.
+    """
+    if any(char in string for char in (delimiter, '"', '\n', '\r')):
+        return '"' + string.replace('"', '""') + '"'
+    return string
+
+
+def format_csv_column(values, fmt='%s', na_rep='', delimiter=','):
+    """
+    Format a 1D array of values with the specified printf-style format and
+    return the results in an array of strings. Missing values are replaced
+    by na_rep, datetime64 values are formatted as YYYY-MM-DD hh:mm:ss and
+    strings are quoted like the csv module does when needed.
+
+    Floats formatted with '%r' are written with the shortest repr that
+    reads back as the same value, like the csv module writes them.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        missing = np.isnat(values)
+        strings = np.char.replace(
+            np.datetime_as_string(values, unit='s'), 'T', ' ').astype(object)
+    elif values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        strings = np.empty(len(values), dtype=object)
+        if fmt == '%r':
+            strings[~missing] = values[~missing].astype(str)
+        else:
+            strings[~missing] = np.char.mod(fmt, values[~missing])
+    elif values.dtype.kind == 'O':
+        import pandas as pd
+        missing = np.asarray(pd.isna(values), dtype=bool)
+        strings = np.empty(len(values), dtype=object)
+        strings[~missing] = [
+            quote_csv_field(string, delimiter) for string in
+            np.char.mod(fmt, values[~missing])]
+    else:
+        missing = np.zeros(len(values), dtype=bool)
+        strings = np.char.mod(fmt, values).astype(object)
+        if values.dtype.kind in 'SU':
+            strings = np.array(
+                [quote_csv_field(string, delimiter) for string in strings],
+                dtype=object)
+    strings[missing] = na_rep
+    return strings
+
+
+def save_series_to_csv(filepath, header, columns, data, fmt='%s', na_rep='',
+                       delimiter=',', encoding='utf8',
+                       chunksize=CSV_CHUNKSIZE):
+    """
+    Save the time series of a station in a csv file in a single pass.
+
+    The header rows with the metadata of the station are written first,
+    followed by the names of the columns and the data. The data are given as
+    a list of 1D arrays, one per column, that are formatted with the
+    printf-style format of their column and written by chunks of chunksize
+    rows, without building a list of the rows of the whole file.
+    """
+    if isinstance(fmt, str):
+        fmt = [fmt] * len(data)
+    data = [np.asarray(values) for values in data]
+    nrows = len(data[0]) if len(data) else 0
+
+    # Create the destination directory if it doesn't exist.
+    filepath = os.path.abspath(filepath)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    with open(filepath, 'w', encoding=encoding, newline='') as csvfile:
+        writer = csv.writer(csvfile, delimiter=delimiter, lineterminator='\n')
+        writer.writerows(header)
+        writer.writerow(columns)
+        for i in range(0, nrows, chunksize):
+            strings = [
+                format_csv_column(
+                    values[i:i + chunksize], col_fmt, na_rep, delimiter)
+                for values, col_fmt in zip(data, fmt)]
+            csvfile.write(''.join(
+                delimiter.join(row) + '\n' for row in zip(*strings)))
@@ -16,9 +16,10 @@ import matplotlib.pyplot as plt
 from gwhat.projet.reader_projet import ProjetReader
 from matplotlib.transforms import ScaledTranslation
 from matplotlib.backends.backend_pdf import PdfPages
-from xlrd import xldate_as_tuple
 import datetime
 
+from data_readers.utils import xldates_to_datetime64
+
 import matplotlib
 matplotlib.rcParams['axes.unicode_minus'] = False
 
@@ -54,8 +55,7 @@ for wldset in project.wldsets[:]:
     fs = 1/(time[1] - time[0])  # sample spacing in days
     N = len(time)  # number of samples
 
-    datetimes = [datetime.datetime(*xldate_as_tuple(xldate, 0)) for
-                 xldate in time]
+    datetimes = xldates_to_datetime64(time)
 
     lg_lines = []
     lg_labels = []
@@ -18,6 +18,7 @@ import matplotlib.pyplot as plt
 from matplotlib.transforms import ScaledTranslation
 from matplotlib.backends.backend_pdf import PdfPages
 from itertools import product
+from data_readers.align import align_series
 
 
 class InfoClimatGridReader:
@@ -257,17 +258,13 @@ for period in periods:
                               labelpad=10, fontsize=14)
 
             # Prepare the data.
-            sta_precip = sta_datastack[i][['Ptot']]
-            grid_precip = precip[[(sta_lats[i], sta_lons[i])]]
-            join_precip = (
-                sta_precip.copy()
-                .join(grid_precip, how='left', sort=True)
-                .dropna(axis=0, how='any')
-                )
+            join_precip = align_series(
+                {'sta_ptot': sta_datastack[i]['Ptot'],
+                 'grid_ptot': precip[(sta_lats[i], sta_lons[i])]},
+                how='inner').dropna(axis=0, how='any')
             year_min = join_precip.index[0].year
             year_max = join_precip.index[-1].year
             year_range = (year_max - year_min) + 1
-            join_precip.columns = ['sta_ptot', 'grid_ptot']
             if period == 'monthly':
                 join_precip = join_precip.groupby(
                     [join_precip.index.year, join_precip.index.month]).sum()
@@ -414,17 +411,13 @@ for j in range(npage):
             ax.set_ylabel('Probabilité', labelpad=10, fontsize=14)
 
         # Prepare the data.
-        sta_precip = sta_datastack[i][['Ptot']]
-        grid_precip = precip[(sta_lats[i], sta_lons[i])]
-        join_precip = (
-            sta_datastack[i][['Ptot']].copy()
-            .join(precip[[(sta_lats[i], sta_lons[i])]], how='left', sort=True)
-            .dropna(axis=0, how='any')
-            )
+        join_precip = align_series(
+            {'sta_ptot': sta_datastack[i]['Ptot'],
+             'grid_ptot': precip[(sta_lats[i], sta_lons[i])]},
+            how='inner').dropna(axis=0, how='any')
         year_min = join_precip.index[0].year
         year_max = join_precip.index[-1].year
         year_range = (year_max - year_min) + 1
-        join_precip.columns = ['sta_ptot', 'grid_ptot']
 
         # Plot the data.
         c1, c2 = '#6495ED', 'red'
@@ -549,20 +542,17 @@ for var in ['tamin', 'tamax']:
                 ax.set_ylabel(ylabel, labelpad=10, fontsize=14)
 
             # Prepare the data.
-            sta_temp = sta_datastack[i][['Tmin' if var == 'tamin' else 'Tmax']]
+            sta_temp = sta_datastack[i]['Tmin' if var == 'tamin' else 'Tmax']
             grid_temp = (
                 (tasmin if var == 'tamin' else tasmax)
-                [[(sta_lats[i], sta_lons[i])]]
-                )
-            join_temp = (
-                sta_temp.copy()
-                .join(grid_temp, how='left', sort=True)
-                .dropna(axis=0, how='any')
+                [(sta_lats[i], sta_lons[i])]
                 )
+            join_temp = align_series(
+                {'sta_temp': sta_temp, 'grid_temp': grid_temp},
+                how='inner').dropna(axis=0, how='any')
             year_min = join_temp.index[0].year
             year_max = join_temp.index[-1].year
             year_range = (year_max - year_min) + 1
-            join_temp.columns = ['sta_temp', 'grid_temp']
 
             # Plot the data.
             l1, = ax.plot(join_temp['sta_temp'], join_temp['grid_temp'],
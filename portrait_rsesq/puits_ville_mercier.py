@@ -7,11 +7,12 @@ import os.path as osp
 import sys
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, Polygon
+from shapely.geometry import Polygon
 import matplotlib.pyplot as plt
-import datetime
 import numpy as np
-import xlrd
+
+from data_readers.catalog import RSESQ_CATALOG_SCHEMA, build_station_catalog
+from data_readers.utils import xldates_to_datetime64
 
 # Note: On 2021-09-21, ther was no binary wheel of Fiona available on Pypi
 # for Windows. Fiona is a dependency of Geopandas.
@@ -48,21 +49,16 @@ rsesq_data['03097082']['Temperature'] = data['Water temperature (degC)'].values
 
 # %%
 
-geometry = []
-stations = pd.DataFrame([])
-for sid, station_info in rsesq_data.items():
-    station_info = {
-        'Station ID': station_info['ID'],
-        'Station Name': station_info['Name'],
-        'Lon_ddeg': float(station_info['Longitude']),
-        'Lat_ddeg': float(station_info['Latitude']),
-        'Nappe': station_info['Nappe'],
-        'Influenced': station_info['Influenced'],
-        }
-    stations = stations.append(station_info, ignore_index=True)
-    geometry.append(Point(
-        (station_info['Lon_ddeg'], station_info['Lat_ddeg'])
-        ))
+catalog = build_station_catalog(rsesq_data, RSESQ_CATALOG_SCHEMA)
+stations = pd.DataFrame({
+    'Station ID': catalog['ID'].values,
+    'Station Name': catalog['Name'].values,
+    'Lon_ddeg': catalog['Longitude'].values,
+    'Lat_ddeg': catalog['Latitude'].values,
+    'Nappe': catalog['Nappe'].astype(object).values,
+    'Influenced': catalog['Influenced'].astype(object).values,
+    })
+geometry = gpd.points_from_xy(stations['Lon_ddeg'], stations['Lat_ddeg'])
 
 crs = "+proj=longlat +ellps=GRS80 +datum=NAD83 +towgs84=0,0,0,0,0,0,0 +no_defs"
 sta_gdf = gpd.GeoDataFrame(stations, crs=crs, geometry=geometry)
@@ -87,14 +83,14 @@ before_2010 = []
 start_date = []
 for i, sid in enumerate(sids):
     xlsdates = rsesq_data[sid].get('Time', [])
-    dtimes = [datetime.datetime(*xlrd.xldate_as_tuple(t, 0)) for t in xlsdates]
+    dtimes = xldates_to_datetime64(xlsdates)
     l, = plt.plot(dtimes, [i] * len(dtimes), 's', ms=1, color='blue', mew=0)
     l.set_rasterized(True)
     if not len(dtimes):
         continue
-    if np.min(dtimes) <= datetime.datetime(2000, 1, 1):
+    if np.min(dtimes) <= np.datetime64('2000-01-01'):
         before_2000.append(sid)
-    if np.min(dtimes) <= datetime.datetime(2010, 1, 1):
+    if np.min(dtimes) <= np.datetime64('2010-01-01'):
         before_2010.append(sid)
     start_date.append(np.min(dtimes))
 
@@ -12,22 +12,15 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.transforms as transforms
 
+from data_readers import MDDELCC_CEHQ_Reader, MDDELCC_RSESQ_Reader
+from data_readers.spatial import load_spatial_index
+
 workdir = "D:/Projets/pacc-inrs/portrait_rsesq"
 
 
 def read_rsesq_coord():
-    rsesq_data = np.load(
-        osp.join(workdir, 'mddelcc_rsesq_database.npy'),
-        allow_pickle=True).item()
-
-    stn_coord = pd.DataFrame([], columns=['lat_dd', 'lon_dd'])
-    for stn_id, stn_data in rsesq_data.items():
-        stn_coord.loc[stn_id, 'lat_dd'] = stn_data['Latitude']
-        stn_coord.loc[stn_id, 'lon_dd'] = stn_data['Longitude']
-    stn_coord['lat_dd'] = stn_coord['lat_dd'].astype('float')
-    stn_coord['lon_dd'] = stn_coord['lon_dd'].astype('float')
-
-    return stn_coord
+    return MDDELCC_RSESQ_Reader().get_station_coords().rename(
+        columns={'Latitude': 'lat_dd', 'Longitude': 'lon_dd'})
 
 
 def read_climstn_coord():
@@ -60,68 +53,37 @@ def read_climstn_coord():
 
 
 def read_cehq_coord():
-    cehq_data = np.load(
-        osp.join(workdir, 'mddelcc_cehq_database.npy'),
-        allow_pickle=True).item()
-
-    stn_coord = pd.DataFrame([], columns=['lat_dd', 'lon_dd'])
-    for stn_id, stn_data in cehq_data.items():
-        stn_coord.loc[stn_id, 'lat_dd'] = float(stn_data['Latitude'])
-        stn_coord.loc[stn_id, 'lon_dd'] = float(stn_data['Longitude'])
-        stn_coord.loc[stn_id, 'active'] = (
-            stn_data['Status'] == 'Station ouverte')
-
-    stn_coord['lat_dd'] = stn_coord['lat_dd'].astype('float')
-    stn_coord['lon_dd'] = stn_coord['lon_dd'].astype('float')
+    catalog = MDDELCC_CEHQ_Reader().catalog()
+    stn_coord = catalog[['Latitude', 'Longitude']].rename(
+        columns={'Latitude': 'lat_dd', 'Longitude': 'lon_dd'})
+    stn_coord['active'] = catalog['Status'] == 'Station ouverte'
 
     return stn_coord
 
 
-def find_closest_location(lat1, lon1, lat2, lon2):
-    """
-    Compute the minimum horizontal distance between a location in radians and
-    a set of locations also in radians.
-    """
-    r = 6373  # r is the Earth radius in km
-
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = np.sin(dlat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
-    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-    min_dist = np.min(r * c)
-
-    return min_dist
-
-
 def calc_rsesq_dist_to_climate_and_hydro():
     """
     Compute the distance between each piezometric station of the RSESQ
     and the nearest climatic and hydrometric station.
     """
     climstn_data = read_climstn_coord()
-    lat2 = np.radians(
-        climstn_data[climstn_data['active'] == True]['lat_dd'].values)
-    lon2 = np.radians(
-        climstn_data[climstn_data['active'] == True]['lon_dd'].values)
-    dist_to_climstn = []
-    
     cehq_coord = read_cehq_coord()
-    lat3 = np.radians(
-        cehq_coord[cehq_coord['active'] == True]['lat_dd'].values)
-
-    lon3 = np.radians(
-        cehq_coord[cehq_coord['active'] == True]['lon_dd'].values)
-    dist_to_hydstn = []
-
     rsesq_coord = read_rsesq_coord()
-    for stn_idx, stn_data in rsesq_coord.iterrows():
-        lat1 = np.radians(stn_data['lat_dd'])
-        lon1 = np.radians(stn_data['lon_dd'])
 
-        dist_to_climstn.append(find_closest_location(lat1, lon1, lat2, lon2))
-        dist_to_hydstn.append(find_closest_location(lat1, lon1, lat3, lon3))
+    # The spatial index of the active stations is saved in the workdir and
+    # is only rebuilt when the station catalogs change.
+    index = load_spatial_index(
+        osp.join(workdir, 'stations_spatial_index.pkl'),
+        {'climate': climstn_data[climstn_data['active'] == True],
+         'cehq': cehq_coord[cehq_coord['active'] == True]},
+        latcol='lat_dd', loncol='lon_dd')
+
+    dist_to_climstn, _ = index.query(
+        'climate', rsesq_coord['lat_dd'].values, rsesq_coord['lon_dd'].values)
+    dist_to_hydstn, _ = index.query(
+        'cehq', rsesq_coord['lat_dd'].values, rsesq_coord['lon_dd'].values)
 
-    return np.array(dist_to_climstn), np.array(dist_to_hydstn)
+    return dist_to_climstn[:, 0], dist_to_hydstn[:, 0]
 
 
 def plot_bar_diagram(dist1, dist2):
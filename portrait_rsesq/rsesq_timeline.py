@@ -7,8 +7,8 @@ import pandas as pd
 import os.path as osp
 import numpy as np
 import matplotlib.pyplot as plt
-from datetime import datetime
-import xlrd
+
+from data_readers.utils import xldates_to_datetime64
 
 
 workdir = "D:/Projets/pacc-inrs/portrait_rsesq"
@@ -34,8 +34,7 @@ def read_rsesq_data():
             stn_data['Water Level'], errors='coerce')
         stn_readings['Temperature (degC)'] = pd.to_numeric(
             stn_data['Temperature'], errors='coerce')
-        stn_readings.index = [
-            datetime(*xlrd.xldate_as_tuple(t, 0)) for t in stn_data['Time']]
+        stn_readings.index = xldates_to_datetime64(stn_data['Time'])
 
         rsesq_data[stn_id] = stn_readings
 
@@ -47,8 +46,7 @@ def read_rsesq_data():
 
     stn_readings = stn_data[
         ['Time', 'Water level (masl)', 'Water temperature (degC)']].copy()
-    stn_readings.index = [
-        datetime(*xlrd.xldate_as_tuple(t, 0)) for t in stn_data['Time']]
+    stn_readings.index = xldates_to_datetime64(stn_data['Time'].values)
     stn_readings = stn_readings.drop('Time', axis=1)
 
     return rsesq_data